@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import CityPack
+
+
+@admin.register(CityPack)
+class CityPackAdmin(admin.ModelAdmin):
+    list_display = ("city", "version", "size", "generated_at")
+    search_fields = ("city__name", "version")
+    readonly_fields = ("version", "file", "size", "generated_at", "content_version")
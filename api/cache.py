@@ -0,0 +1,154 @@
+"""
+Response cache for public GraphQL queries.
+
+Responses are stored in Django's cache under a key derived from the
+normalized query, its variables, the active language and the host. Every key
+embeds a generation number; saving or deleting public content bumps the
+generation, which invalidates all cached responses at once.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from graphql import FieldNode, OperationDefinitionNode, OperationType, parse, print_ast
+from graphql.error import GraphQLError
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "graphql:response:generation"
+
+# Root query fields whose result only depends on public guard content.
+CACHEABLE_FIELDS = {
+    "locations",
+    "location",
+    "locationCategories",
+    "events",
+    "event",
+    "eventCategories",
+    "hikings",
+    "hiking",
+    "locationsNear",
+    "locationsInBox",
+    "eventsNear",
+    "eventsInBox",
+    "hikingsNear",
+    "hikingsInBox",
+    "locationsConnection",
+    "hikingsConnection",
+    "eventsConnection",
+    "tipsConnection",
+    "publicTransportsConnection",
+    "tips",
+    "publicTransports",
+    "publicTransport",
+    "publicTransportTypes",
+    "partners",
+    "sponsors",
+    "sponsor",
+}
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def generation():
+    """Current content generation; it changes whenever public content does."""
+    return _generation()
+
+
+def invalidate():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, None)
+
+
+def _request_data(request):
+    if request.method == "GET":
+        variables = request.GET.get("variables")
+        return {
+            "query": request.GET.get("query"),
+            "variables": json.loads(variables) if variables else None,
+            "operationName": request.GET.get("operationName"),
+        }
+    if request.method == "POST" and request.content_type == "application/json":
+        data = json.loads(request.body)
+        return data if isinstance(data, dict) else None
+    return None
+
+
+def _cacheable_operation(document, operation_name):
+    operations = [
+        definition
+        for definition in document.definitions
+        if isinstance(definition, OperationDefinitionNode)
+    ]
+    if operation_name:
+        operations = [
+            operation
+            for operation in operations
+            if operation.name and operation.name.value == operation_name
+        ]
+    if len(operations) != 1:
+        return False
+
+    operation = operations[0]
+    if operation.operation != OperationType.QUERY:
+        return False
+    return all(
+        isinstance(selection, FieldNode) and selection.name.value in CACHEABLE_FIELDS
+        for selection in operation.selection_set.selections
+    )
+
+
+def response_cache_key(request):
+    """Return the cache key for ``request``, or None if it must not be cached."""
+    if getattr(settings, "GRAPHQL_RESPONSE_CACHE_TIMEOUT", 0) <= 0:
+        return None
+    user = getattr(request, "user", None)
+    if (user and user.is_authenticated) or "HTTP_AUTHORIZATION" in request.META:
+        return None
+
+    try:
+        data = _request_data(request)
+        if not data or not data.get("query"):
+            return None
+        document = parse(data["query"])
+    except (ValueError, GraphQLError):
+        return None
+
+    operation_name = data.get("operationName")
+    if not _cacheable_operation(document, operation_name):
+        return None
+
+    payload = json.dumps(
+        {
+            "query": print_ast(document),
+            "variables": data.get("variables") or {},
+            "operationName": operation_name,
+            "language": translation.get_language(),
+            "host": request.build_absolute_uri("/"),
+        },
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    return f"graphql:response:{_generation()}:{digest}"
+
+
+def get_response(key):
+    return cache.get(key)
+
+
+def set_response(key, content, content_type):
+    cache.set(
+        key, (content, content_type), settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT
+    )
@@ -0,0 +1,148 @@
+"""
+Per-request batch loaders for the nested GraphQL resolvers.
+
+The GraphQL view is synchronous, so instead of the async DataLoader that ships
+with Strawberry we batch "lazily": list resolvers prime the loaders with the
+ids of the rows they return, and the first ``load()`` for any of those ids
+fetches the relation for all of them with a single ``IN (...)`` query.
+"""
+
+from collections import defaultdict
+
+from guard.models import (
+    Location,
+    HikingLocation,
+    ImageAd,
+    ImageEvent,
+    ImageHiking,
+    ImageLocation,
+    PublicTransportTime,
+)
+
+
+def group_by(rows, attname):
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[getattr(row, attname)].append(row)
+    return grouped
+
+
+class RelationLoader:
+    """Batch loader for a to-many relation, keyed by parent id."""
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self._pending = set()
+        self._cache = {}
+
+    def prime(self, keys):
+        self._pending.update(key for key in keys if key not in self._cache)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._pending.add(key)
+            keys = list(self._pending)
+            self._pending.clear()
+            rows = self.fetch(keys)
+            for pending_key in keys:
+                self._cache[pending_key] = rows.get(pending_key, [])
+        return self._cache[key]
+
+
+class Loaders:
+    """The set of relation loaders attached to one GraphQL request."""
+
+    def __init__(self):
+        self.location_images = RelationLoader(self._fetch_location_images)
+        self.location_closed_days = RelationLoader(self._fetch_location_closed_days)
+        self.hiking_images = RelationLoader(self._fetch_hiking_images)
+        self.hiking_locations = RelationLoader(self._fetch_hiking_locations)
+        self.event_images = RelationLoader(self._fetch_event_images)
+        self.ad_images = RelationLoader(self._fetch_ad_images)
+        self.public_transport_times = RelationLoader(
+            self._fetch_public_transport_times
+        )
+
+    def prime_locations(self, ids):
+        ids = [pk for pk in ids if pk is not None]
+        self.location_images.prime(ids)
+        self.location_closed_days.prime(ids)
+
+    def prime_hikings(self, ids):
+        ids = list(ids)
+        self.hiking_images.prime(ids)
+        self.hiking_locations.prime(ids)
+
+    def prime_events(self, events):
+        events = list(events)
+        self.event_images.prime(event.pk for event in events)
+        self.prime_locations(
+            event.location_id
+            for event in events
+            if "location_id" not in event.get_deferred_fields()
+        )
+
+    def prime_ads(self, ids):
+        self.ad_images.prime(ids)
+
+    def prime_public_transports(self, ids):
+        self.public_transport_times.prime(ids)
+
+    def _fetch_location_images(self, ids):
+        return group_by(
+            ImageLocation.objects.filter(location_id__in=ids), "location_id"
+        )
+
+    def _fetch_location_closed_days(self, ids):
+        through = Location.closedDays.through.objects.filter(
+            location_id__in=ids
+        ).select_related("weekday")
+        grouped = defaultdict(list)
+        for row in sorted(through, key=lambda row: row.weekday.day):
+            grouped[row.location_id].append(row.weekday)
+        return grouped
+
+    def _fetch_hiking_images(self, ids):
+        return group_by(ImageHiking.objects.filter(hiking_id__in=ids), "hiking_id")
+
+    def _fetch_hiking_locations(self, ids):
+        rows = list(
+            HikingLocation.objects.filter(hiking_id__in=ids)
+            .select_related("location")
+            .order_by("order")
+        )
+        self.prime_locations(row.location_id for row in rows)
+        return group_by(rows, "hiking_id")
+
+    def _fetch_event_images(self, ids):
+        return group_by(ImageEvent.objects.filter(event_id__in=ids), "event_id")
+
+    def _fetch_ad_images(self, ids):
+        return group_by(ImageAd.objects.filter(ad_id__in=ids), "ad_id")
+
+    def _fetch_public_transport_times(self, ids):
+        return group_by(
+            PublicTransportTime.objects.filter(publicTransport_id__in=ids),
+            "publicTransport_id",
+        )
+
+
+def get_loaders(info):
+    return getattr(info.context, "loaders", None)
+
+
+def load_related(info, root, relation, loader_name):
+    """
+    Resolve a to-many relation of ``root``.
+
+    Rows prefetched on the instance win; otherwise the request's loader
+    batches the lookup, and outside a request we fall back to the manager.
+    """
+    prefetched = getattr(root, "_prefetched_objects_cache", {})
+    if relation in prefetched:
+        return list(prefetched[relation])
+
+    loaders = get_loaders(info)
+    if loaders is None:
+        return list(getattr(root, relation).all())
+    return getattr(loaders, loader_name).load(root.pk)
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.9 on 2026-10-16 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_delete_page"),
+        ("cities_light", "0012_city_translations_country_translations_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CityPack",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.CharField(max_length=64, verbose_name="Version")),
+                ("file", models.FileField(upload_to="packs/", verbose_name="File")),
+                ("size", models.PositiveIntegerField(default=0, verbose_name="Size")),
+                ("generated_at", models.DateTimeField(verbose_name="Generated at")),
+                (
+                    "generation",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Content generation"
+                    ),
+                ),
+                (
+                    "city",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pack",
+                        to="cities_light.city",
+                        verbose_name="City",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "City pack",
+                "verbose_name_plural": "City packs",
+            },
+        ),
+    ]
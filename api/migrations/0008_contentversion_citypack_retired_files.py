@@ -0,0 +1,64 @@
+# Generated by Django 5.2.9 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+def create_content_version(apps, schema_editor):
+    ContentVersion = apps.get_model("api", "ContentVersion")
+    ContentVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_citypack"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Version"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Content version",
+                "verbose_name_plural": "Content versions",
+            },
+        ),
+        migrations.RunPython(create_content_version, migrations.RunPython.noop),
+        migrations.RenameField(
+            model_name="citypack",
+            old_name="generation",
+            new_name="content_version",
+        ),
+        migrations.AlterField(
+            model_name="citypack",
+            name="content_version",
+            field=models.PositiveBigIntegerField(
+                default=0, verbose_name="Content version"
+            ),
+        ),
+        migrations.AddField(
+            model_name="citypack",
+            name="retired_files",
+            field=models.JSONField(
+                blank=True, default=list, verbose_name="Retired files"
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import models
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+
+
+class ContentVersion(models.Model):
+    """
+    Counter bumped whenever public content changes. Unlike the response
+    cache generation it lives in the database, so every process (web
+    workers, cron commands) reads the same value.
+    """
+
+    version = models.PositiveBigIntegerField(default=0, verbose_name=_("Version"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
+
+    class Meta:
+        verbose_name = _("Content version")
+        verbose_name_plural = _("Content versions")
+
+    def __str__(self):
+        return str(self.version)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=F("version") + 1):
+            cls.objects.get_or_create(pk=1, defaults={"version": 1})
+
+
+class CityPack(models.Model):
+    """
+    Offline bundle of one city's content, built by ``api.packs``.
+
+    ``version`` is a hash of the content, so it only changes, and clients
+    only download again, when the content does.
+    """
+
+    city = models.OneToOneField(
+        "cities_light.City",
+        on_delete=models.CASCADE,
+        related_name="pack",
+        verbose_name=_("City"),
+    )
+    version = models.CharField(max_length=64, verbose_name=_("Version"))
+    file = models.FileField(upload_to="packs/", verbose_name=_("File"))
+    size = models.PositiveIntegerField(default=0, verbose_name=_("Size"))
+    generated_at = models.DateTimeField(verbose_name=_("Generated at"))
+    # ContentVersion the pack was built from
+    content_version = models.PositiveBigIntegerField(
+        default=0, verbose_name=_("Content version")
+    )
+    # Files of previous versions, deleted once clients had time to fetch
+    # them: [{"name": ..., "retired_at": ...}]
+    retired_files = models.JSONField(
+        default=list, blank=True, verbose_name=_("Retired files")
+    )
+
+    class Meta:
+        verbose_name = _("City pack")
+        verbose_name_plural = _("City packs")
+
+    def __str__(self):
+        return f"{self.city} ({self.version})"
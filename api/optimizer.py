@@ -0,0 +1,205 @@
+"""
+Translate a GraphQL selection set into ``only()``, ``select_related()`` and
+``Prefetch()`` calls so list queries load just the columns and relations the
+client asked for.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Set
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from strawberry.types.nodes import SelectedField
+from strawberry.utils.str_converters import to_snake_case
+
+from shared.models import IMAGE_METADATA
+
+# Models whose columns are restricted to the selection. Any other model
+# reached through a relation (cities, countries, ...) is loaded in full,
+# because its GraphQL type is mostly made of computed fields.
+RESTRICTED_MODELS = {
+    "guard.Location",
+    "guard.LocationCategory",
+    "guard.Event",
+    "guard.EventCategory",
+    "guard.Hiking",
+    "guard.HikingLocation",
+    "guard.ImageLocation",
+    "guard.ImageEvent",
+    "guard.ImageHiking",
+    "guard.Weekday",
+}
+
+# GraphQL fields backed by a custom resolver, mapped to the model relation
+# the resolver reads.
+FIELD_HINTS = {
+    "guard.Hiking": {"locations": "hikinglocation"},
+    "cities_light.City": {
+        "region": "region",
+        "regionEn": "region",
+        "regionFr": "region",
+        "regionAr": "region",
+        "country": "country",
+        "countryEn": "country",
+        "countryFr": "country",
+        "countryAr": "country",
+    },
+}
+
+
+# Columns a model field's resolver reads besides the field itself
+FIELD_DEPENDENCIES = {
+    label: {
+        "image": (
+            "variants",
+            *(f"image_{column}" for column in IMAGE_METADATA),
+        ),
+        # imageMobile falls back to the original while it is processed
+        "image_mobile": (
+            "image",
+            "variants",
+            *(f"image_{column}" for column in IMAGE_METADATA),
+            *(f"image_mobile_{column}" for column in IMAGE_METADATA),
+        ),
+    }
+    for label in ("guard.ImageLocation", "guard.ImageEvent", "guard.ImageHiking")
+}
+
+
+@dataclass
+class QueryPlan:
+    only: Set[str] = field(default_factory=set)
+    select_related: Set[str] = field(default_factory=set)
+    prefetch: List[Prefetch] = field(default_factory=list)
+
+
+def _flatten(selections):
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            yield selection
+        else:
+            # Fragment spreads and inline fragments
+            yield from _flatten(selection.selections)
+
+
+def _model_field(model, name):
+    for candidate in (name, to_snake_case(name)):
+        try:
+            return model._meta.get_field(candidate)
+        except FieldDoesNotExist:
+            continue
+    return None
+
+
+def _translation_fields(model, name):
+    from modeltranslation.translator import translator, NotRegistered
+
+    try:
+        options = translator.get_options_for_model(model)
+    except NotRegistered:
+        return []
+    # all_fields maps each field to its translations; older releases
+    # named it fields
+    fields = getattr(options, "all_fields", options.fields)
+    return [translated.name for translated in fields.get(name, ())]
+
+
+def _plan(model, selections, plan, prefix="", restrict=True):
+    label = model._meta.label
+    # Once a relation path goes through an unrestricted model, everything
+    # below it must stay unrestricted too, or Django would defer its columns.
+    restricted = restrict and label in RESTRICTED_MODELS
+    hints = FIELD_HINTS.get(label, {})
+    dependencies = FIELD_DEPENDENCIES.get(label, {})
+
+    if restricted:
+        plan.only.add(prefix + model._meta.pk.name)
+
+    to_many = {}
+    for selection in _flatten(selections):
+        model_field = _model_field(model, hints.get(selection.name, selection.name))
+        if model_field is None:
+            continue
+
+        if not model_field.is_relation:
+            if restricted:
+                plan.only.add(prefix + model_field.name)
+                for name in _translation_fields(model, model_field.name):
+                    plan.only.add(prefix + name)
+                for name in dependencies.get(model_field.name, ()):
+                    plan.only.add(prefix + name)
+            continue
+
+        if model_field.concrete and (
+            model_field.many_to_one or model_field.one_to_one
+        ):
+            path = prefix + model_field.name
+            if restricted:
+                plan.only.add(path)
+            plan.select_related.add(path)
+            _plan(
+                model_field.related_model,
+                selection.selections,
+                plan,
+                path + "__",
+                restricted,
+            )
+            continue
+
+        # To-many relation: merge aliased selections into a single prefetch
+        _, child_selections = to_many.setdefault(
+            model_field.name, (model_field, [])
+        )
+        child_selections.extend(selection.selections)
+
+    for model_field, child_selections in to_many.values():
+        related_model = model_field.related_model
+        child_plan = QueryPlan()
+        _plan(related_model, child_selections, child_plan)
+        if child_plan.only and not model_field.concrete:
+            # Reverse foreign key: keep the column Django matches rows on
+            child_plan.only.add(model_field.field.name)
+        if model_field.concrete:
+            accessor = model_field.name
+        else:
+            accessor = model_field.get_accessor_name()
+        plan.prefetch.append(
+            Prefetch(
+                prefix + accessor,
+                queryset=apply_plan(related_model._default_manager.all(), child_plan),
+            )
+        )
+
+
+def apply_plan(queryset, plan):
+    if plan.only:
+        queryset = queryset.only(*sorted(plan.only))
+    if plan.select_related:
+        queryset = queryset.select_related(*sorted(plan.select_related))
+    if plan.prefetch:
+        queryset = queryset.prefetch_related(*plan.prefetch)
+    return queryset
+
+
+def _descend(selections, name):
+    for selection in _flatten(selections):
+        if selection.name == name:
+            yield from selection.selections
+
+
+def optimize(queryset, info, path=()):
+    """
+    Restrict ``queryset`` to what the current field's selection set needs.
+
+    ``path`` locates the model's selection below the field, e.g.
+    ``("edges", "node")`` for a connection.
+    """
+    selections = []
+    for selected_field in info.selected_fields:
+        selections.extend(selected_field.selections)
+    for name in path:
+        selections = list(_descend(selections, name))
+
+    plan = QueryPlan()
+    _plan(queryset.model, selections, plan)
+    return apply_plan(queryset, plan)
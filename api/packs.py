@@ -0,0 +1,252 @@
+"""
+Offline content packs: everything the mobile app shows for one city, in
+one gzip-compressed JSON file.
+
+The pack is built by running ``PACK_QUERY`` against the GraphQL schema, so
+its ``data`` has exactly the shape of the regular query responses. The
+version is a hash of the content: rebuilding unchanged content keeps the
+version, file and URL. A pack is stale once public content changed (the
+``ContentVersion`` counter moved on) or on the next day, when expired events
+must drop out; stale packs are still served while a rebuild runs in the
+background. Files of replaced versions are kept for ``RETIRED_FILE_GRACE``,
+so clients that just received their URL can still download them.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .loaders import Loaders
+from .models import CityPack, ContentVersion
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the layout of the pack file changes
+PACK_FORMAT = 1
+
+# Upper bound for one build; the rebuild lock expires after it
+BUILD_TIMEOUT = 60 * 5
+
+# How long the file of a replaced version stays downloadable
+RETIRED_FILE_GRACE = timedelta(hours=6)
+
+IMAGE_FIELDS = """
+    url
+    webpUrl
+    name
+    width
+    height
+    mimeType
+    placeholder
+"""
+
+PACK_QUERY = f"""
+query CityPack($cityId: Int!) {{
+  locationCategories {{ id name nameEn nameFr }}
+  eventCategories {{ id name nameEn nameFr }}
+  publicTransportTypes {{ id name nameEn nameFr }}
+  locations(cityId: $cityId) {{
+    id createdAt name nameEn nameFr longitude latitude isActiveAds
+    story storyEn storyFr openFrom openTo admissionFee
+    category {{ id }}
+    closedDays {{ id day }}
+    images {{
+      id
+      image {{ {IMAGE_FIELDS} }}
+      imageMobile {{ {IMAGE_FIELDS} }}
+    }}
+  }}
+  hikings(cityId: $cityId) {{
+    id createdAt updatedAt name nameEn nameFr
+    description descriptionEn descriptionFr latitude longitude
+    locations {{ order location {{ id }} }}
+    images {{
+      id
+      image {{ {IMAGE_FIELDS} }}
+      imageMobile {{ {IMAGE_FIELDS} }}
+    }}
+  }}
+  events(cityId: $cityId) {{
+    id createdAt name nameEn nameFr startDate endDate time price
+    link shortLink boost description descriptionEn descriptionFr
+    category {{ id }}
+    location {{ id }}
+    images {{
+      id
+      image {{ {IMAGE_FIELDS} }}
+      imageMobile {{ {IMAGE_FIELDS} }}
+    }}
+  }}
+  tips(cityId: $cityId) {{
+    id createdAt updatedAt description descriptionEn descriptionFr
+  }}
+  publicTransports(cityId: $cityId) {{
+    id busNumber
+    publicTransportType {{ id }}
+    fromRegion fromRegionEn fromRegionFr fromRegionAr
+    toRegion toRegionEn toRegionFr toRegionAr
+    times {{ id time }}
+  }}
+}}
+"""
+
+
+class PackRequest:
+    """Stands in for the HTTP request when resolvers build absolute URLs."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def build_absolute_uri(self, location):
+        return urljoin(self.base_url, location)
+
+
+def _translated(entity, language):
+    names = getattr(entity, "translations", {}).get(language, [])
+    return names[0] if names else entity.name
+
+
+def city_payload(city):
+    return {
+        "id": city.pk,
+        "name": city.name,
+        "nameEn": _translated(city, "en"),
+        "nameFr": _translated(city, "fr"),
+        "nameAr": _translated(city, "ar"),
+        "latitude": city.latitude,
+        "longitude": city.longitude,
+    }
+
+
+def collect(city):
+    """Content of the pack for ``city``, as the GraphQL API returns it."""
+    from .schema import schema
+    from .views import APIContext
+
+    context = APIContext(
+        request=PackRequest(getattr(settings, "SITE_URL", "")),
+        response=None,
+        loaders=Loaders(),
+    )
+    result = schema.execute_sync(
+        PACK_QUERY, variable_values={"cityId": city.pk}, context_value=context
+    )
+    if result.errors:
+        raise RuntimeError(f"City pack query failed: {result.errors}")
+    return {"city": city_payload(city), "data": result.data}
+
+
+def build(city):
+    """Build the pack of ``city``; unchanged content keeps the current file."""
+    content_version = ContentVersion.current()
+    content = collect(city)
+    canonical = json.dumps(
+        content, sort_keys=True, separators=(",", ":"), cls=DjangoJSONEncoder
+    )
+    version = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+    now = timezone.now()
+
+    pack = CityPack.objects.filter(city=city).first()
+    if pack is not None and pack.version == version:
+        pack.generated_at = now
+        pack.content_version = content_version
+        purge_retired_files(pack, now)
+        pack.save(update_fields=["generated_at", "content_version", "retired_files"])
+        return pack
+
+    body = json.dumps(
+        {
+            "format": PACK_FORMAT,
+            "version": version,
+            "generatedAt": now.isoformat(),
+            **content,
+        },
+        separators=(",", ":"),
+        cls=DjangoJSONEncoder,
+    )
+    if pack is None:
+        pack = CityPack(city=city)
+    elif pack.file:
+        pack.retired_files.append(
+            {"name": pack.file.name, "retired_at": now.isoformat()}
+        )
+    pack.version = version
+    pack.generated_at = now
+    pack.content_version = content_version
+    compressed = gzip.compress(body.encode("utf-8"), compresslevel=9, mtime=0)
+    pack.size = len(compressed)
+    pack.file.save(
+        f"city-{city.pk}-{version}.json.gz", ContentFile(compressed), save=False
+    )
+    purge_retired_files(pack, now)
+    pack.save()
+    return pack
+
+
+def purge_retired_files(pack, now=None):
+    """Delete the retired files of ``pack`` whose grace period is over."""
+    now = now or timezone.now()
+    kept = []
+    for retired in pack.retired_files:
+        name = retired["name"]
+        if name == pack.file.name:
+            # The content went back to this version
+            continue
+        if parse_datetime(retired["retired_at"]) > now - RETIRED_FILE_GRACE:
+            kept.append(retired)
+            continue
+        try:
+            pack.file.storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Error deleting old pack file {name}: {e}")
+    pack.retired_files = kept
+
+
+def is_stale(pack):
+    return (
+        pack.content_version != ContentVersion.current()
+        or timezone.localdate(pack.generated_at) != timezone.localdate()
+    )
+
+
+def _rebuild_in_background(city):
+    lock_key = f"city_pack_build:{city.pk}"
+    if not cache.add(lock_key, 1, BUILD_TIMEOUT):
+        return
+
+    def run():
+        close_old_connections()
+        try:
+            build(city)
+        except Exception as e:
+            logger.error(f"Error building pack for city {city.pk}: {e}", exc_info=True)
+        finally:
+            cache.delete(lock_key)
+            close_old_connections()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_pack(city_id):
+    """
+    Current pack of a city, or None until ``build_city_packs`` built one. A
+    stale pack is returned as is and rebuilt in the background.
+    """
+    pack = CityPack.objects.select_related("city").filter(city_id=city_id).first()
+    if pack is None:
+        return None
+    if is_stale(pack):
+        _rebuild_in_background(pack.city)
+    return pack
@@ -2,8 +2,8 @@ import strawberry
 import strawberry_django
 from strawberry import auto
 from typing import List, Optional
-import math
 from django.db.models import Q
+from django.urls import reverse
 from django.utils import timezone
 import datetime
 import uuid
@@ -34,8 +34,59 @@ from guard.models import (
 )
 
 from cities_light.models import City, Country
+from shared import resizer
 from shared.models import Page, UserPreference
 
+from . import packs
+from .loaders import get_loaders, load_related
+from .models import CityPack
+from .optimizer import optimize
+from .pagination import Connection, paginate
+from .spatial import city_index, in_box, nearby
+
+
+def image_metadata(root, key):
+    """Metadata stored on the row next to an image field, without file access."""
+    if not root:
+        return None
+    return getattr(root.instance, f"{root.field.name}_{key}", None)
+
+
+def variant_url(info, root, fmt) -> Optional[str]:
+    """Absolute URL of another encoding of an image, when one was generated."""
+    if not root:
+        return None
+    variants = getattr(root.instance, "variants", None) or {}
+    name = variants.get(root.field.name, {}).get(fmt)
+    if not name:
+        return None
+    url = root.storage.url(name)
+    try:
+        return info.context.request.build_absolute_uri(url)
+    except Exception:
+        return url
+
+
+def image_srcset(info, root, fmt=None) -> str:
+    """``srcset`` value listing the resize endpoint at every allowed width."""
+    if not root:
+        return ""
+    if fmt is not None and fmt not in resizer.allowed_formats():
+        raise ValueError(f"Unsupported image format: {fmt}")
+    image_width = image_metadata(root, "width")
+    widths = resizer.allowed_widths()
+    if image_width:
+        # The endpoint never upscales; wider entries would repeat the original
+        widths = [width for width in widths if width <= image_width] or widths[:1]
+
+    base = reverse("shared:resize_image", kwargs={"path": root.name})
+    try:
+        base = info.context.request.build_absolute_uri(base)
+    except Exception:
+        pass
+    suffix = f"&fmt={fmt}" if fmt else ""
+    return ", ".join(f"{base}?w={width}{suffix} {width}w" for width in widths)
+
 
 @strawberry.type
 class ImageFieldType:
@@ -48,6 +99,18 @@ class ImageFieldType:
         except Exception:
             return root.url
 
+    @strawberry.field(name="webpUrl")
+    def webp_url(self, info, root) -> Optional[str]:
+        return variant_url(info, root, "webp")
+
+    @strawberry.field(name="avifUrl")
+    def avif_url(self, info, root) -> Optional[str]:
+        return variant_url(info, root, "avif")
+
+    @strawberry.field
+    def srcset(self, info, root, format: Optional[str] = None) -> str:
+        return image_srcset(info, root, format)
+
     @strawberry.field
     def name(self, root) -> str:
         return root.name if root else ""
@@ -58,21 +121,23 @@ class ImageFieldType:
 
     @strawberry.field
     def size(self, root) -> int:
-        return root.size if root and hasattr(root, "size") else 0
+        return image_metadata(root, "size") or 0
 
     @strawberry.field
     def width(self, root) -> Optional[int]:
-        try:
-            return root.width if root and hasattr(root, "width") else None
-        except Exception:
-            return None
+        return image_metadata(root, "width")
 
     @strawberry.field
     def height(self, root) -> Optional[int]:
-        try:
-            return root.height if root and hasattr(root, "height") else None
-        except Exception:
-            return None
+        return image_metadata(root, "height")
+
+    @strawberry.field(name="mimeType")
+    def mime_type(self, root) -> Optional[str]:
+        return image_metadata(root, "mime") or None
+
+    @strawberry.field
+    def placeholder(self, root) -> Optional[str]:
+        return image_metadata(root, "placeholder") or None
 
 
 @strawberry_django.type(Page)
@@ -131,7 +196,8 @@ class ImageLocationType:
 
     @strawberry.field(name="imageMobile")
     def image_mobile(self, root) -> Optional[ImageFieldType]:
-        return root.image_mobile
+        # The original stands in until the mobile version is processed
+        return root.image_mobile or root.image
 
 
 @strawberry_django.type(LocationCategory)
@@ -164,12 +230,17 @@ class LocationType:
     category: Optional[LocationCategoryType]
 
     @strawberry.field
-    def images(self, root) -> List[ImageLocationType]:
-        return root.images.all()
+    def images(self, info, root) -> List[ImageLocationType]:
+        return load_related(info, root, "images", "location_images")
+
+    @strawberry.field
+    def closed_days(self, info, root) -> List[WeekdayType]:
+        return load_related(info, root, "closedDays", "location_closed_days")
 
     @strawberry.field
-    def closed_days(self, root) -> List[WeekdayType]:
-        return root.closedDays.all()
+    def distance_km(self, root) -> Optional[float]:
+        # Set by the spatial queries (locationsNear, ...)
+        return getattr(root, "distance_km", None)
 
 
 @strawberry_django.type(ImageHiking)
@@ -183,7 +254,8 @@ class ImageHikingType:
 
     @strawberry.field(name="imageMobile")
     def image_mobile(self, root) -> Optional[ImageFieldType]:
-        return root.image_mobile
+        # The original stands in until the mobile version is processed
+        return root.image_mobile or root.image
 
 
 @strawberry_django.type(HikingLocation)
@@ -209,13 +281,18 @@ class HikingType:
     longitude: Optional[float]
 
     @strawberry.field
-    def images(self, root) -> List[ImageHikingType]:
-        return root.images.all()
+    def images(self, info, root) -> List[ImageHikingType]:
+        return load_related(info, root, "images", "hiking_images")
 
     @strawberry.field
-    def locations(self, root) -> List[HikingLocationType]:
+    def locations(self, info, root) -> List[HikingLocationType]:
         # Fetch directly from the through model to get the 'order' field
-        return root.hikinglocation_set.all().order_by("order")
+        return load_related(info, root, "hikinglocation_set", "hiking_locations")
+
+    @strawberry.field
+    def distance_km(self, root) -> Optional[float]:
+        # Set by the spatial queries (hikingsNear, ...)
+        return getattr(root, "distance_km", None)
 
 
 @strawberry_django.type(EventCategory)
@@ -239,7 +316,8 @@ class ImageEventType:
 
     @strawberry.field(name="imageMobile")
     def image_mobile(self, root) -> Optional[ImageFieldType]:
-        return root.image_mobile
+        # The original stands in until the mobile version is processed
+        return root.image_mobile or root.image
 
 
 @strawberry_django.type(Event)
@@ -265,8 +343,13 @@ class EventType:
     location: Optional[LocationType]
 
     @strawberry.field
-    def images(self, root) -> List[ImageEventType]:
-        return root.images.all()
+    def images(self, info, root) -> List[ImageEventType]:
+        return load_related(info, root, "images", "event_images")
+
+    @strawberry.field
+    def distance_km(self, root) -> Optional[float]:
+        # Set by the spatial queries (eventsNear, ...)
+        return getattr(root, "distance_km", None)
 
 
 @strawberry_django.type(ImageAd)
@@ -280,7 +363,8 @@ class ImageAdType:
 
     @strawberry.field(name="imageMobile")
     def image_mobile(self, root) -> Optional[ImageFieldType]:
-        return root.image_mobile
+        # The original stands in until the mobile version is processed
+        return root.image_mobile or root.image
 
 
 @strawberry_django.type(Country)
@@ -314,8 +398,8 @@ class AdType:
         return root.image_tablet
 
     @strawberry.field
-    def images(self, root) -> List[ImageAdType]:
-        return root.images.all() if hasattr(root, "images") else []
+    def images(self, info, root) -> List[ImageAdType]:
+        return load_related(info, root, "images", "ad_images")
 
 
 @strawberry_django.type(Tip)
@@ -410,6 +494,21 @@ class CityType:
         return ar_names[0] if ar_names else root.country.name
 
 
+@strawberry_django.type(CityPack)
+class CityPackType:
+    version: auto
+    size: auto
+    generated_at: auto
+
+    @strawberry.field
+    def city_id(self, root) -> int:
+        return root.city_id
+
+    @strawberry.field
+    def url(self, info, root) -> str:
+        return info.context.request.build_absolute_uri(root.file.url)
+
+
 @strawberry_django.type(PublicTransportType)
 class PublicTransportTypeType:
     id: auto
@@ -495,8 +594,78 @@ class PublicTransportNodeType:
         return names[0] if names else root.toRegion.name
 
     @strawberry.field
-    def times(self, root) -> List[PublicTransportTimeType]:
-        return root.publicTransportTimes.all()
+    def times(self, info, root) -> List[PublicTransportTimeType]:
+        return load_related(
+            info, root, "publicTransportTimes", "public_transport_times"
+        )
+
+
+def upcoming_events():
+    # Filter out expired events (keep for 1 day after ending)
+    yesterday = timezone.now().date() - datetime.timedelta(days=1)
+    return Event.objects.filter(endDate__gte=yesterday)
+
+
+def filter_locations(city_id=None, category_id=None):
+    qs = Location.objects.all()
+    if city_id is not None:
+        qs = qs.filter(city_id=city_id)
+    if category_id is not None:
+        qs = qs.filter(category_id=category_id)
+    return qs
+
+
+def filter_hikings(city_id=None):
+    qs = Hiking.objects.all()
+    if city_id is not None:
+        qs = qs.filter(city_id=city_id)
+    return qs
+
+
+def filter_events(city_id=None, category_id=None, boost=None):
+    qs = upcoming_events()
+    if city_id is not None:
+        qs = qs.filter(city_id=city_id)
+    if category_id is not None:
+        qs = qs.filter(category_id=category_id)
+    if boost is not None:
+        qs = qs.filter(boost=boost)
+    return qs
+
+
+def filter_ads(city_id=None, country_id=None, is_active=None):
+    qs = Ad.objects.select_related("city", "country", "client")
+    if city_id is not None:
+        qs = qs.filter(city_id=city_id)
+    if country_id is not None:
+        qs = qs.filter(country_id=country_id)
+    if is_active is not None:
+        qs = qs.filter(is_active=is_active)
+    return qs
+
+
+def filter_tips(city_id=None):
+    qs = Tip.objects.select_related("city")
+    if city_id is not None:
+        qs = qs.filter(city_id=city_id)
+    return qs
+
+
+def filter_public_transports(
+    city_id=None, type_id=None, from_region_id=None, to_region_id=None
+):
+    qs = PublicTransport.objects.select_related(
+        "city", "publicTransportType", "fromRegion", "toRegion"
+    )
+    if city_id is not None:
+        qs = qs.filter(city_id=city_id)
+    if type_id is not None:
+        qs = qs.filter(publicTransportType_id=type_id)
+    if from_region_id is not None:
+        qs = qs.filter(fromRegion_id=from_region_id)
+    if to_region_id is not None:
+        qs = qs.filter(toRegion_id=to_region_id)
+    return qs
 
 
 @strawberry.type
@@ -519,27 +688,25 @@ class Query:
     @strawberry.field
     def locations(
         self,
+        info,
         city_id: Optional[int] = None,
         category_id: Optional[int] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = 0,
     ) -> List[LocationType]:
-        qs = Location.objects.select_related(
-            "city", "country", "category"
-        ).prefetch_related("images")
-        if city_id is not None:
-            qs = qs.filter(city_id=city_id)
-        if category_id is not None:
-            qs = qs.filter(category_id=category_id)
-
+        qs = optimize(filter_locations(city_id, category_id), info)
         if limit is not None:
             qs = qs[offset : offset + limit]
 
-        return qs
+        locations = list(qs)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_locations(location.pk for location in locations)
+        return locations
 
     @strawberry.field
-    def location(self, id: strawberry.ID) -> Optional[LocationType]:
-        return Location.objects.prefetch_related("images").filter(pk=id).first()
+    def location(self, info, id: strawberry.ID) -> Optional[LocationType]:
+        return optimize(Location.objects.filter(pk=id), info).first()
 
     @strawberry.field
     def location_categories(self) -> List[LocationCategoryType]:
@@ -548,62 +715,48 @@ class Query:
     @strawberry.field
     def hikings(
         self,
+        info,
         city_id: Optional[int] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = 0,
     ) -> List[HikingType]:
-        qs = Hiking.objects.select_related("city").prefetch_related(
-            "images", "locations"
-        )
-        if city_id is not None:
-            qs = qs.filter(city_id=city_id)
-
+        qs = optimize(filter_hikings(city_id), info)
         if limit is not None:
             qs = qs[offset : offset + limit]
 
-        return qs
+        hikings = list(qs)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_hikings(hiking.pk for hiking in hikings)
+        return hikings
 
     @strawberry.field
-    def hiking(self, id: strawberry.ID) -> Optional[HikingType]:
-        return (
-            Hiking.objects.prefetch_related("images", "locations").filter(pk=id).first()
-        )
+    def hiking(self, info, id: strawberry.ID) -> Optional[HikingType]:
+        return optimize(Hiking.objects.filter(pk=id), info).first()
 
     @strawberry.field
     def events(
         self,
+        info,
         city_id: Optional[int] = None,
         category_id: Optional[int] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = 0,
         boost: Optional[bool] = None,
     ) -> List[EventType]:
-        qs = Event.objects.select_related(
-            "city", "category", "client", "location"
-        ).prefetch_related("images")
-        if city_id is not None:
-            qs = qs.filter(city_id=city_id)
-        if category_id is not None:
-            qs = qs.filter(category_id=category_id)
-        if boost is not None:
-            qs = qs.filter(boost=boost)
-
-        # Filter out expired events (keep for 1 day after ending)
-        yesterday = timezone.now().date() - datetime.timedelta(days=1)
-        qs = qs.filter(endDate__gte=yesterday)
-
+        qs = optimize(filter_events(city_id, category_id, boost), info)
         if limit is not None:
             qs = qs[offset : offset + limit]
 
-        return qs
+        events = list(qs)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_events(events)
+        return events
 
     @strawberry.field
-    def event(self, id: strawberry.ID) -> Optional[EventType]:
-        return (
-            Event.objects.prefetch_related("images", "location", "category")
-            .filter(pk=id)
-            .first()
-        )
+    def event(self, info, id: strawberry.ID) -> Optional[EventType]:
+        return optimize(Event.objects.filter(pk=id), info).first()
 
     @strawberry.field
     def event_categories(self) -> List[EventCategoryType]:
@@ -612,24 +765,22 @@ class Query:
     @strawberry.field
     def ads(
         self,
+        info,
         city_id: Optional[int] = None,
         country_id: Optional[int] = None,
         is_active: Optional[bool] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = 0,
     ) -> List[AdType]:
-        qs = Ad.objects.select_related("city", "country", "client")
-        if city_id is not None:
-            qs = qs.filter(city_id=city_id)
-        if country_id is not None:
-            qs = qs.filter(country_id=country_id)
-        if is_active is not None:
-            qs = qs.filter(is_active=is_active)
-
+        qs = filter_ads(city_id, country_id, is_active)
         if limit is not None:
             qs = qs[offset : offset + limit]
 
-        return qs
+        ads = list(qs)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_ads(ad.pk for ad in ads)
+        return ads
 
     @strawberry.field
     def ad(self, id: strawberry.ID) -> Optional[AdType]:
@@ -642,10 +793,7 @@ class Query:
         limit: Optional[int] = None,
         offset: Optional[int] = 0,
     ) -> List[TipType]:
-        qs = Tip.objects.select_related("city")
-        if city_id is not None:
-            qs = qs.filter(city_id=city_id)
-
+        qs = filter_tips(city_id)
         if limit is not None:
             qs = qs[offset : offset + limit]
 
@@ -654,6 +802,7 @@ class Query:
     @strawberry.field
     def public_transports(
         self,
+        info,
         city_id: Optional[int] = None,
         type_id: Optional[int] = None,
         from_region_id: Optional[int] = None,
@@ -661,22 +810,15 @@ class Query:
         limit: Optional[int] = None,
         offset: Optional[int] = 0,
     ) -> List[PublicTransportNodeType]:
-        qs = PublicTransport.objects.select_related(
-            "city", "publicTransportType", "fromRegion", "toRegion"
-        ).prefetch_related("publicTransportTimes")
-        if city_id is not None:
-            qs = qs.filter(city_id=city_id)
-        if type_id is not None:
-            qs = qs.filter(publicTransportType_id=type_id)
-        if from_region_id is not None:
-            qs = qs.filter(fromRegion_id=from_region_id)
-        if to_region_id is not None:
-            qs = qs.filter(toRegion_id=to_region_id)
-
+        qs = filter_public_transports(city_id, type_id, from_region_id, to_region_id)
         if limit is not None:
             qs = qs[offset : offset + limit]
 
-        return qs
+        transports = list(qs)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_public_transports(transport.pk for transport in transports)
+        return transports
 
     @strawberry.field
     def public_transport(self, id: strawberry.ID) -> Optional[PublicTransportNodeType]:
@@ -693,46 +835,244 @@ class Query:
     def public_transport_types(self) -> List[PublicTransportTypeType]:
         return PublicTransportType.objects.all()
 
+    @strawberry.field
+    def locations_connection(
+        self,
+        info,
+        city_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Connection[LocationType]:
+        qs = optimize(filter_locations(city_id, category_id), info, ("edges", "node"))
+        locations, connection = paginate(qs, first, after)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_locations(location.pk for location in locations)
+        return connection
+
+    @strawberry.field
+    def hikings_connection(
+        self,
+        info,
+        city_id: Optional[int] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Connection[HikingType]:
+        qs = optimize(filter_hikings(city_id), info, ("edges", "node"))
+        hikings, connection = paginate(qs, first, after)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_hikings(hiking.pk for hiking in hikings)
+        return connection
+
+    @strawberry.field
+    def events_connection(
+        self,
+        info,
+        city_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        boost: Optional[bool] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Connection[EventType]:
+        qs = optimize(
+            filter_events(city_id, category_id, boost), info, ("edges", "node")
+        )
+        events, connection = paginate(qs, first, after)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_events(events)
+        return connection
+
+    @strawberry.field
+    def ads_connection(
+        self,
+        info,
+        city_id: Optional[int] = None,
+        country_id: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Connection[AdType]:
+        ads, connection = paginate(
+            filter_ads(city_id, country_id, is_active), first, after
+        )
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_ads(ad.pk for ad in ads)
+        return connection
+
+    @strawberry.field
+    def tips_connection(
+        self,
+        city_id: Optional[int] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Connection[TipType]:
+        _, connection = paginate(filter_tips(city_id), first, after)
+        return connection
+
+    @strawberry.field
+    def public_transports_connection(
+        self,
+        info,
+        city_id: Optional[int] = None,
+        type_id: Optional[int] = None,
+        from_region_id: Optional[int] = None,
+        to_region_id: Optional[int] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Connection[PublicTransportNodeType]:
+        qs = filter_public_transports(city_id, type_id, from_region_id, to_region_id)
+        transports, connection = paginate(qs, first, after)
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_public_transports(transport.pk for transport in transports)
+        return connection
+
     @strawberry.field
     def nearest_city(
         self, lat: float, lon: float, max_distance_km: Optional[float] = None
     ) -> Optional[CityType]:
-        def haversine(lat1, lon1, lat2, lon2):
-            R = 6371  # Earth radius in km
-            phi1 = math.radians(lat1)
-            phi2 = math.radians(lat2)
-            dphi = math.radians(lat2 - lat1)
-            dlambda = math.radians(lon2 - lon1)
-            a = (
-                math.sin(dphi / 2) ** 2
-                + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-            )
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-            return R * c
+        match = city_index.nearest(lat, lon, max_distance_km)
+        if match is None:
+            return None
+
+        city_id, _ = match
+        return (
+            City.objects.select_related("region", "country").filter(pk=city_id).first()
+        )
+
+    @strawberry.field
+    def locations_near(
+        self,
+        info,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        limit: Optional[int] = 50,
+    ) -> List[LocationType]:
+        locations = nearby(
+            optimize(Location.objects.all(), info), lat, lon, radius_km, limit
+        )
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_locations(location.pk for location in locations)
+        return locations
 
-        candidates = (
-            City.objects.exclude(latitude__isnull=True)
-            .exclude(longitude__isnull=True)
-            .values("id", "name", "latitude", "longitude")
+    @strawberry.field
+    def locations_in_box(
+        self,
+        info,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        limit: Optional[int] = None,
+    ) -> List[LocationType]:
+        locations = in_box(
+            optimize(Location.objects.all(), info),
+            min_lat,
+            min_lon,
+            max_lat,
+            max_lon,
+            limit,
         )
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_locations(location.pk for location in locations)
+        return locations
 
-        nearest = None
-        nearest_distance = None
+    @strawberry.field
+    def events_near(
+        self,
+        info,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        limit: Optional[int] = 50,
+    ) -> List[EventType]:
+        events = nearby(
+            optimize(upcoming_events(), info),
+            lat,
+            lon,
+            radius_km,
+            limit,
+            prefix="location__",
+        )
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_events(events)
+        return events
 
-        for city in candidates:
-            distance = haversine(
-                lat, lon, float(city["latitude"]), float(city["longitude"])
-            )
-            if max_distance_km is not None and distance > max_distance_km:
-                continue
-            if nearest_distance is None or distance < nearest_distance:
-                nearest_distance = distance
-                nearest = city["id"]
+    @strawberry.field
+    def events_in_box(
+        self,
+        info,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        limit: Optional[int] = None,
+    ) -> List[EventType]:
+        events = in_box(
+            optimize(upcoming_events(), info),
+            min_lat,
+            min_lon,
+            max_lat,
+            max_lon,
+            limit,
+            prefix="location__",
+        )
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_events(events)
+        return events
 
-        if nearest is None:
-            return None
+    @strawberry.field
+    def hikings_near(
+        self,
+        info,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        limit: Optional[int] = 50,
+    ) -> List[HikingType]:
+        hikings = nearby(
+            optimize(Hiking.objects.all(), info), lat, lon, radius_km, limit
+        )
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_hikings(hiking.pk for hiking in hikings)
+        return hikings
 
-        return City.objects.filter(pk=nearest).first()
+    @strawberry.field
+    def hikings_in_box(
+        self,
+        info,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        limit: Optional[int] = None,
+    ) -> List[HikingType]:
+        hikings = in_box(
+            optimize(Hiking.objects.all(), info),
+            min_lat,
+            min_lon,
+            max_lat,
+            max_lon,
+            limit,
+        )
+        loaders = get_loaders(info)
+        if loaders:
+            loaders.prime_hikings(hiking.pk for hiking in hikings)
+        return hikings
+
+    @strawberry.field
+    def city_pack(self, city_id: int) -> Optional[CityPackType]:
+        return packs.get_pack(city_id)
 
     @strawberry.field
     def partners(self) -> List[PartnerType]:
@@ -799,6 +1139,7 @@ class Mutation:
         type: str,  # 'android' or 'ios'
         name: Optional[str] = None,
         user_uid: Optional[uuid.UUID] = None,
+        city_id: Optional[int] = None,
     ) -> RegisterDevicePayload:
         """
         Register an FCM device token for push notifications.
@@ -807,10 +1148,14 @@ class Mutation:
             registration_id: FCM token from the mobile app
             type: Device type - 'android' or 'ios'
             name: Optional device name/identifier
-            user_uid: Optional user UUID to associate device with user
+            user_uid: Optional user UUID; the device then receives notifications
+                matching the user's interests
+            city_id: Optional city the user follows; the device then only
+                receives notifications about that city
         """
         try:
             from fcm_django.models import FCMDevice
+            from guard.segments import update_segment
 
             # Validate device type
             if type not in ["android", "ios", "web"]:
@@ -837,16 +1182,10 @@ class Mutation:
                     device.name = name
                 device.save()
 
-            # Optionally associate with user if user_uid provided
-            if user_uid:
-                try:
-                    user_pref = UserPreference.objects.get(user_uid=user_uid)
-                    # Note: FCMDevice.user is a ForeignKey to User model
-                    # If you want to associate with UserPreference, you'd need to adjust this
-                    # For now, we just store the registration_id
-                    pass
-                except UserPreference.DoesNotExist:
-                    pass
+            # Link the device to the user's preferences and city for targeting
+            if city_id is not None and not City.objects.filter(pk=city_id).exists():
+                city_id = None
+            update_segment(device, user_uid, city_id)
 
             return RegisterDevicePayload(
                 ok=True,
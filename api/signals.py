@@ -0,0 +1,87 @@
+from cities_light.models import City
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from guard.models import (
+    Location,
+    LocationCategory,
+    Event,
+    EventCategory,
+    Hiking,
+    HikingLocation,
+    Tip,
+    PublicTransport,
+    PublicTransportType,
+    PublicTransportTime,
+    ImageLocation,
+    ImageEvent,
+    ImageHiking,
+    Partner,
+    Sponsor,
+)
+
+from . import cache as response_cache
+from .models import ContentVersion
+from .spatial import city_index
+
+# Models whose content is served by the cacheable public queries
+PUBLIC_CONTENT_MODELS = (
+    Location,
+    LocationCategory,
+    Event,
+    EventCategory,
+    Hiking,
+    HikingLocation,
+    Tip,
+    PublicTransport,
+    PublicTransportType,
+    PublicTransportTime,
+    ImageLocation,
+    ImageEvent,
+    ImageHiking,
+    Partner,
+    Sponsor,
+)
+
+
+def content_changed():
+    """Record a change of public content for packs and cached responses."""
+    ContentVersion.bump()
+    response_cache.invalidate()
+
+
+def invalidate_response_cache(sender, **kwargs):
+    # Bumped after commit: a request served before then still reads the old
+    # rows and must not cache them under the new generation
+    transaction.on_commit(content_changed)
+
+
+for model in PUBLIC_CONTENT_MODELS:
+    post_save.connect(
+        invalidate_response_cache,
+        sender=model,
+        dispatch_uid=f"graphql_cache_save_{model._meta.label_lower}",
+    )
+    post_delete.connect(
+        invalidate_response_cache,
+        sender=model,
+        dispatch_uid=f"graphql_cache_delete_{model._meta.label_lower}",
+    )
+
+m2m_changed.connect(
+    invalidate_response_cache,
+    sender=Location.closedDays.through,
+    dispatch_uid="graphql_cache_location_closed_days",
+)
+
+
+def invalidate_city_index(sender, **kwargs):
+    city_index.invalidate()
+
+
+post_save.connect(
+    invalidate_city_index, sender=City, dispatch_uid="city_index_save"
+)
+post_delete.connect(
+    invalidate_city_index, sender=City, dispatch_uid="city_index_delete"
+)
@@ -0,0 +1,171 @@
+"""
+Spatial lookups for the GraphQL API.
+
+``CityIndex`` is an in-process k-d tree of cities for nearest-city lookups.
+It is built lazily on first use; a version number kept in Django's cache is
+bumped whenever a City changes, so every worker process rebuilds its tree on
+the next lookup.
+
+``nearby`` and ``in_box`` narrow content rows with the geohash and
+coordinate indexes before computing exact distances in Python.
+"""
+
+import threading
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from shared.geo import (
+    KDTree,
+    bounding_box,
+    chord_to_km,
+    geohash_cells_for_radius,
+    haversine_km,
+    km_to_chord,
+    unit_vector,
+)
+
+MAX_SPATIAL_RESULTS = 500
+
+VERSION_KEY = "geo:city_index:version"
+
+
+class CityIndex:
+    def __init__(self):
+        self._tree = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        from cities_light.models import City
+
+        rows = (
+            City.objects.exclude(latitude__isnull=True)
+            .exclude(longitude__isnull=True)
+            .values_list("id", "latitude", "longitude")
+        )
+        return KDTree(
+            [
+                (unit_vector(float(latitude), float(longitude)), city_id)
+                for city_id, latitude, longitude in rows
+            ]
+        )
+
+    def _current_tree(self):
+        # invalidate() may reset self._tree at any time, so the tree is read
+        # once and the local reference returned
+        version = cache.get(VERSION_KEY, 0)
+        tree = self._tree
+        if tree is None or self._version != version:
+            with self._lock:
+                tree = self._tree
+                if tree is None or self._version != version:
+                    tree = self._build()
+                    self._tree = tree
+                    self._version = version
+        return tree
+
+    def nearest(self, lat, lon, max_distance_km=None):
+        """Return ``(city_id, distance_km)`` of the nearest city, or None."""
+        max_chord = None if max_distance_km is None else km_to_chord(max_distance_km)
+        match = self._current_tree().nearest(unit_vector(lat, lon), max_chord)
+        if match is None:
+            return None
+        city_id, chord = match
+        return city_id, chord_to_km(chord)
+
+    def invalidate(self):
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, None)
+        self._tree = None
+
+
+city_index = CityIndex()
+
+
+def _box_filter(min_lat, min_lon, max_lat, max_lon, prefix=""):
+    condition = Q(
+        **{
+            f"{prefix}latitude__gte": min_lat,
+            f"{prefix}latitude__lte": max_lat,
+        }
+    )
+    if min_lon <= max_lon:
+        return condition & Q(
+            **{
+                f"{prefix}longitude__gte": min_lon,
+                f"{prefix}longitude__lte": max_lon,
+            }
+        )
+    # The box crosses the antimeridian
+    return condition & (
+        Q(**{f"{prefix}longitude__gte": min_lon})
+        | Q(**{f"{prefix}longitude__lte": max_lon})
+    )
+
+
+def result_limit(limit):
+    """Cap ``limit`` at ``MAX_SPATIAL_RESULTS``; None means the cap."""
+    if limit is None:
+        return MAX_SPATIAL_RESULTS
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return min(limit, MAX_SPATIAL_RESULTS)
+
+
+def _fetch_in_order(queryset, matches):
+    rows = queryset.in_bulk([pk for pk, _ in matches])
+    ordered = []
+    for pk, distance in matches:
+        row = rows.get(pk)
+        if row is not None:
+            row.distance_km = distance
+            ordered.append(row)
+    return ordered
+
+
+def nearby(queryset, lat, lon, radius_km, limit=None, prefix=""):
+    """
+    Return the rows of ``queryset`` within ``radius_km`` of a point, nearest
+    first, each annotated with ``distance_km``.
+
+    ``prefix`` points at the model holding the coordinates, e.g.
+    ``"location__"`` for events.
+    """
+    limit = result_limit(limit)
+    candidates = queryset.prefetch_related(None).filter(
+        _box_filter(*bounding_box(lat, lon, radius_km), prefix=prefix)
+    )
+    cells = geohash_cells_for_radius(lat, lon, radius_km)
+    if cells:
+        geohash_filter = Q()
+        for cell in cells:
+            geohash_filter |= Q(**{f"{prefix}geohash__startswith": cell})
+        candidates = candidates.filter(geohash_filter)
+
+    matches = []
+    for pk, latitude, longitude in candidates.values_list(
+        "pk", f"{prefix}latitude", f"{prefix}longitude"
+    ):
+        if latitude is None or longitude is None:
+            continue
+        distance = haversine_km(lat, lon, float(latitude), float(longitude))
+        if distance <= radius_km:
+            matches.append((distance, pk))
+    matches.sort()
+
+    return _fetch_in_order(
+        queryset, [(pk, distance) for distance, pk in matches[:limit]]
+    )
+
+
+def in_box(queryset, min_lat, min_lon, max_lat, max_lon, limit=None, prefix=""):
+    """Return the rows of ``queryset`` whose coordinates lie inside a box."""
+    limit = result_limit(limit)
+    return list(
+        queryset.filter(_box_filter(min_lat, min_lon, max_lat, max_lon, prefix))[
+            :limit
+        ]
+    )
@@ -1,3 +1,482 @@
-from django.test import TestCase
+import base64
+import datetime
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from cities_light.models import City, Country
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image as PilImage
+
+from guard.models import (
+    Hiking,
+    HikingLocation,
+    ImageLocation,
+    Location,
+    LocationCategory,
+    Tip,
+    Weekday,
+)
+
+from . import cache as response_cache
+from . import packs
+from .pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, paginate
+from .spatial import (
+    MAX_SPATIAL_RESULTS,
+    CityIndex,
+    in_box,
+    nearby,
+    result_limit,
+)
+
+
+class CursorTests(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        created_at = datetime.datetime(2026, 3, 1, 12, 30, tzinfo=datetime.timezone.utc)
+        cursor = encode_cursor(SimpleNamespace(created_at=created_at, pk=42))
+        self.assertEqual(decode_cursor(cursor), (created_at, 42))
+
+    def test_invalid_cursor(self):
+        bad_id = base64.urlsafe_b64encode(b"2026-03-01|x").decode()
+        for cursor in ("not a cursor", "", bad_id):
+            with self.assertRaisesMessage(ValueError, "Invalid cursor"):
+                decode_cursor(cursor)
+
+
+class PaginateTests(TestCase):
+    def setUp(self):
+        self.tips = [Tip.objects.create(description=f"Tip {i}") for i in range(5)]
+
+    def pages(self, first):
+        ids, after = [], None
+        while True:
+            rows, connection = paginate(Tip.objects.all(), first, after)
+            ids.extend(row.pk for row in rows)
+            if not connection.page_info.has_next_page:
+                return ids
+            after = connection.page_info.end_cursor
+
+    def test_pages_walk_every_row_newest_first(self):
+        ids = self.pages(first=2)
+        self.assertEqual(ids, sorted((tip.pk for tip in self.tips), reverse=True))
+
+    def test_ties_on_created_at_are_ordered_by_id(self):
+        Tip.objects.update(created_at=timezone.now())
+        ids = self.pages(first=2)
+        self.assertEqual(ids, sorted((tip.pk for tip in self.tips), reverse=True))
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        rows, connection = paginate(Tip.objects.all(), 2)
+        Tip.objects.create(description="Added while scrolling")
+        next_rows, _ = paginate(Tip.objects.all(), 2, connection.page_info.end_cursor)
+        self.assertEqual(
+            [row.pk for row in next_rows], [self.tips[2].pk, self.tips[1].pk]
+        )
+
+    def test_page_size_is_capped(self):
+        rows, connection = paginate(Tip.objects.all(), MAX_PAGE_SIZE + 50)
+        self.assertEqual(len(rows), 5)
+        self.assertFalse(connection.page_info.has_next_page)
+        self.assertEqual(connection.page_info.end_cursor, encode_cursor(rows[-1]))
+
+
+class SpatialTests(TestCase):
+    def setUp(self):
+        def location(name, latitude, longitude):
+            return Location.objects.create(
+                name=name,
+                latitude=Decimal(latitude),
+                longitude=Decimal(longitude),
+                story="",
+            )
+
+        # Around Tunis, then Sfax about 230 km south
+        self.medina = location("Medina", "36.798800", "10.171400")
+        self.carthage = location("Carthage", "36.852800", "10.323300")
+        self.sidi_bou_said = location("Sidi Bou Said", "36.870800", "10.341600")
+        self.sfax = location("Sfax", "34.740600", "10.760300")
+
+    def test_nearby_returns_rows_in_radius_nearest_first(self):
+        rows = nearby(Location.objects.all(), 36.8, 10.17, 25)
+        self.assertEqual(rows, [self.medina, self.carthage, self.sidi_bou_said])
+        self.assertLess(rows[0].distance_km, 1)
+        self.assertEqual(
+            [row.distance_km for row in rows],
+            sorted(row.distance_km for row in rows),
+        )
+
+    def test_nearby_limit(self):
+        rows = nearby(Location.objects.all(), 36.8, 10.17, 25, limit=1)
+        self.assertEqual(rows, [self.medina])
+
+    def test_in_box(self):
+        rows = in_box(Location.objects.all(), 36.8, 10.3, 36.9, 10.4)
+        self.assertEqual(set(rows), {self.carthage, self.sidi_bou_said})
+
+    def test_result_limit(self):
+        self.assertEqual(result_limit(None), MAX_SPATIAL_RESULTS)
+        self.assertEqual(result_limit(MAX_SPATIAL_RESULTS + 1), MAX_SPATIAL_RESULTS)
+        self.assertEqual(result_limit(3), 3)
+        for limit in (0, -1):
+            with self.assertRaises(ValueError):
+                result_limit(limit)
+            with self.assertRaises(ValueError):
+                in_box(Location.objects.all(), 36.8, 10.3, 36.9, 10.4, limit)
+
+
+class CityIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        country = Country.objects.create(name="Tunisia")
+        self.sousse = City.objects.create(
+            name="Sousse",
+            country=country,
+            latitude=Decimal("35.8256"),
+            longitude=Decimal("10.6084"),
+        )
+
+    def test_nearest(self):
+        city_id, distance_km = CityIndex().nearest(35.83, 10.64)
+        self.assertEqual(city_id, self.sousse.pk)
+        self.assertLess(distance_km, 5)
+        self.assertIsNone(CityIndex().nearest(36.8, 10.18, max_distance_km=50))
+
+    def test_invalidate_during_build(self):
+        class RacingIndex(CityIndex):
+            def __setattr__(self, name, value):
+                super().__setattr__(name, value)
+                if name == "_version" and value is not None:
+                    # A City saved on another thread right after the build
+                    self.invalidate()
+
+        city_id, _ = RacingIndex().nearest(35.83, 10.64)
+        self.assertEqual(city_id, self.sousse.pk)
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE_TIMEOUT=0)
+class QueryCountTests(TestCase):
+    """Nested relations are batched, whatever the number of rows."""
+
+    def setUp(self):
+        category = LocationCategory.objects.create(name="Museum")
+        weekdays = list(Weekday.objects.filter(day__in=(1, 2)))
+        self.locations = []
+        for index in range(5):
+            location = Location.objects.create(
+                name=f"Location {index}",
+                category=category,
+                latitude=Decimal("36.8"),
+                longitude=Decimal("10.17"),
+                story="",
+            )
+            location.closedDays.set(weekdays)
+            # Already stored files: nothing to process
+            ImageLocation.objects.create(location=location, image=f"images/{index}.jpg")
+            self.locations.append(location)
+
+    def post(self, query):
+        response = self.client.post(
+            "/graphql", {"query": query}, content_type="application/json"
+        )
+        self.assertNotIn(b'"errors"', response.content)
+        return response.json()["data"]
+
+    def test_locations_with_images_closed_days_and_category(self):
+        query = """
+            { locations {
+                id name
+                images { id image { url } }
+                closedDays { day }
+                category { name }
+            } }
+        """
+        # Locations with their category, then one query per to-many relation
+        with self.assertNumQueries(3):
+            data = self.post(query)
+        self.assertEqual(len(data["locations"]), 5)
+        self.assertTrue(all(len(row["images"]) == 1 for row in data["locations"]))
+        self.assertTrue(all(len(row["closedDays"]) == 2 for row in data["locations"]))
+
+    def test_hikings_with_locations(self):
+        for index in range(3):
+            hiking = Hiking.objects.create(name=f"Hiking {index}", description="")
+            for order, location in enumerate(self.locations):
+                HikingLocation.objects.create(
+                    hiking=hiking, location=location, order=order
+                )
+
+        query = "{ hikings { id locations { order location { id name } } } }"
+        # Hikings, then their stops with the stop locations
+        with self.assertNumQueries(2):
+            data = self.post(query)
+        self.assertEqual(len(data["hikings"]), 3)
+        self.assertTrue(all(len(row["locations"]) == 5 for row in data["hikings"]))
+
+
+def use_shared_cache(test):
+    """Run ``test`` on a file-based cache, shared like redis in production."""
+    location = tempfile.TemporaryDirectory()
+    test.addCleanup(location.cleanup)
+    shared = override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": location.name,
+            }
+        },
+        GRAPHQL_RESPONSE_CACHE_TIMEOUT=60 * 15,
+    )
+    shared.enable()
+    test.addCleanup(shared.disable)
+
+
+class ResponseCacheTests(TestCase):
+    query = "{ locations { id name } }"
+
+    def setUp(self):
+        use_shared_cache(self)
+        self.location = Location.objects.create(
+            name="Medina",
+            latitude=Decimal("36.8"),
+            longitude=Decimal("10.17"),
+            story="",
+        )
+
+    def post(self, query, **extra):
+        return self.client.post(
+            "/graphql", {"query": query}, content_type="application/json", **extra
+        )
+
+    def test_repeated_query_is_served_from_cache(self):
+        first = self.post(self.query)
+        second = self.post(self.query)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.content, second.content)
+
+    def test_saving_content_invalidates_after_commit(self):
+        self.post(self.query)
+        generation = response_cache.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.location.name = "Old Medina"
+            self.location.save()
+            # Not bumped until the transaction commits
+            self.assertEqual(response_cache.generation(), generation)
+
+        response = self.post(self.query)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn(b"Old Medina", response.content)
+
+    def test_invalidation_reaches_other_cache_clients(self):
+        # Another process (a worker, a command) has its own cache client
+        other_process = caches.create_connection("default")
+        self.post(self.query)
+        generation = other_process.get(response_cache.GENERATION_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Location.objects.create(
+                name="Kasbah",
+                latitude=Decimal("36.8"),
+                longitude=Decimal("10.16"),
+                story="",
+            )
+        self.assertEqual(
+            other_process.get(response_cache.GENERATION_KEY), generation + 1
+        )
+
+    def test_authenticated_requests_are_not_cached(self):
+        user = get_user_model().objects.create_user("editor", password="secret")
+        self.client.force_login(user)
+        self.post(self.query)
+        self.assertNotIn("X-Cache", self.post(self.query))
+
+    def test_mutations_are_not_cached(self):
+        mutation = (
+            'mutation { forgetMe(userUid: "6f1c2a8e-3b1d-4c8e-9a55-0d3f7b2e9c41") '
+            "{ ok } }"
+        )
+        self.post(mutation)
+        self.assertNotIn("X-Cache", self.post(mutation))
+
+    def test_error_responses_are_not_cached(self):
+        query = '{ location(id: "not-a-number") { id } }'
+        response = self.post(query)
+        self.assertIn(b'"errors"', response.content)
+        self.assertNotIn("X-Cache", response)
+        self.assertNotIn("X-Cache", self.post(query))
+
+
+class CityPackTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        country = Country.objects.create(name="Tunisia")
+        self.city = City.objects.create(name="Sousse", country=country)
+        self.location = Location.objects.create(
+            name_en="Ribat",
+            name_fr="Ribat",
+            story_en="",
+            story_fr="",
+            city=self.city,
+            latitude=Decimal("35.8278"),
+            longitude=Decimal("10.6387"),
+        )
+
+    def test_no_pack_until_built(self):
+        self.assertIsNone(packs.get_pack(self.city.pk))
+        self.assertFalse(packs.CityPack.objects.exists())
+
+    def test_version_is_stable_for_unchanged_content(self):
+        pack = packs.build(self.city)
+        rebuilt = packs.build(self.city)
+        self.assertEqual(rebuilt.version, pack.version)
+        self.assertEqual(rebuilt.file.name, pack.file.name)
+        self.assertEqual(packs.get_pack(self.city.pk), pack)
+
+    def test_pack_is_stale_after_content_save(self):
+        pack = packs.build(self.city)
+        self.assertFalse(packs.is_stale(pack))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.location.name_en = "Ribat of Sousse"
+            self.location.save()
+        pack.refresh_from_db()
+        self.assertTrue(packs.is_stale(pack))
+
+        rebuilt = packs.build(self.city)
+        self.assertNotEqual(rebuilt.version, pack.version)
+        self.assertFalse(packs.is_stale(rebuilt))
+
+    def test_staleness_does_not_depend_on_the_cache(self):
+        pack = packs.build(self.city)
+        # The web process does not share the cache of the cron process
+        cache.clear()
+        self.assertFalse(packs.is_stale(pack))
+
+    def test_replaced_files_are_kept_for_a_grace_period(self):
+        old = packs.build(self.city)
+        old_name = old.file.name
+
+        self.location.name_en = "Ribat of Sousse"
+        self.location.save()
+        rebuilt = packs.build(self.city)
+        self.assertNotEqual(rebuilt.file.name, old_name)
+        # Clients that just received the old URL can still download it
+        self.assertTrue(default_storage.exists(old_name))
+
+        later = timezone.now() + packs.RETIRED_FILE_GRACE + datetime.timedelta(hours=1)
+        with mock.patch("api.packs.timezone.now", return_value=later):
+            call_command("build_city_packs", "--stale", stdout=StringIO())
+        rebuilt.refresh_from_db()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(rebuilt.file.name))
+        self.assertEqual(rebuilt.retired_files, [])
+
+
+def jpeg(size, exif=None):
+    output = BytesIO()
+    PilImage.new("RGB", size, "red").save(output, "JPEG", exif=exif or b"")
+    return output.getvalue()
+
+
+class ImageFieldTests(TestCase):
+    fields = "url webpUrl avifUrl width height size mimeType placeholder"
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(
+            MEDIA_ROOT=media_root.name,
+            IMAGE_PROCESSING_MODE="sync",
+            # No AVIF variant is generated
+            IMAGE_VARIANT_FORMATS=["webp"],
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+        self.location = Location.objects.create(
+            name="Ribat", latitude=Decimal("35.8"), longitude=Decimal("10.6"), story=""
+        )
+
+    def images(self):
+        query = f"{{ locations {{ images {{ image {{ {self.fields} }} }} }} }}"
+        response = self.client.post(
+            "/graphql", {"query": query}, content_type="application/json"
+        )
+        self.assertNotIn(b'"errors"', response.content)
+        (location,) = response.json()["data"]["locations"]
+        return [row["image"] for row in location["images"]]
+
+    def test_processed_upload(self):
+        ImageLocation.objects.create(
+            location=self.location,
+            image=SimpleUploadedFile("photo.jpg", jpeg((64, 48))),
+        )
+        (image,) = self.images()
+        self.assertTrue(image["url"].startswith("http://testserver/"))
+        self.assertTrue(image["webpUrl"].startswith("http://testserver/"))
+        self.assertTrue(image["webpUrl"].endswith(".webp"))
+        self.assertIsNone(image["avifUrl"])
+        self.assertEqual((image["width"], image["height"]), (64, 48))
+        self.assertEqual(image["mimeType"], "image/jpeg")
+        self.assertGreater(image["size"], 0)
+        self.assertTrue(image["placeholder"].startswith("data:image/jpeg;base64,"))
+        thumbnail = PilImage.open(
+            BytesIO(base64.b64decode(image["placeholder"].split(",", 1)[1]))
+        )
+        self.assertEqual(thumbnail.size, (16, 12))
+
+    def test_image_without_variants_or_metadata(self):
+        # Stored before variants and metadata columns existed
+        ImageLocation.objects.create(location=self.location, image="images/old.jpg")
+        (image,) = self.images()
+        self.assertTrue(image["url"].endswith("/images/old.jpg"))
+        for field in ("webpUrl", "avifUrl", "width", "height", "mimeType"):
+            self.assertIsNone(image[field], field)
+        self.assertIsNone(image["placeholder"])
+        self.assertEqual(image["size"], 0)
+
+    def test_backfill_image_metadata(self):
+        # A phone portrait stored sideways, uploaded before the columns existed
+        exif = PilImage.Exif()
+        exif[0x0112] = 6
+        name = default_storage.save("images/old.jpg", ContentFile(jpeg((80, 40), exif)))
+        old = ImageLocation.objects.create(location=self.location, image=name)
+        missing = ImageLocation.objects.create(
+            location=self.location, image="images/missing.jpg"
+        )
+
+        out, err = StringIO(), StringIO()
+        call_command("backfill_image_metadata", stdout=out, stderr=err)
+        self.assertIn("guard.ImageLocation.image: 1 row(s)", out.getvalue())
+        self.assertIn(f"guard.ImageLocation {missing.pk}:", err.getvalue())
+
+        old.refresh_from_db()
+        self.assertEqual((old.image_width, old.image_height), (40, 80))
+        self.assertEqual(old.image_mime, "image/jpeg")
+        self.assertTrue(old.image_placeholder.startswith("data:image/jpeg;base64,"))
+        filled = ImageLocation.objects.values().get(pk=old.pk)
+
+        # Filled rows are not read again; the missing file is only retried
+        out = StringIO()
+        with mock.patch(
+            "guard.management.commands.backfill_image_metadata."
+            "image_metadata_columns"
+        ) as columns:
+            call_command("backfill_image_metadata", stdout=out, stderr=StringIO())
+        self.assertNotIn("row(s)", out.getvalue())
+        columns.assert_not_called()
+        self.assertEqual(ImageLocation.objects.values().get(pk=old.pk), filled)
@@ -1,7 +1,7 @@
 from django.urls import path
 from django.conf import settings
-from strawberry.django.views import GraphQLView
 from .schema import schema
+from .views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 
 urlpatterns = [
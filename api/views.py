@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field
+
+from django.http import HttpResponse
+from strawberry.django.context import StrawberryDjangoContext
+from strawberry.django.views import GraphQLView as BaseGraphQLView
+
+from . import cache as response_cache
+from .loaders import Loaders
+
+
+@dataclass
+class APIContext(StrawberryDjangoContext):
+    loaders: Loaders = field(default_factory=Loaders)
+
+
+class GraphQLView(BaseGraphQLView):
+    def get_context(self, request, response):
+        return APIContext(request=request, response=response, loaders=Loaders())
+
+    def dispatch(self, request, *args, **kwargs):
+        key = response_cache.response_cache_key(request)
+        if key:
+            cached = response_cache.get_response(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response["X-Cache"] = "HIT"
+                return response
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        if (
+            key
+            and not response.streaming
+            and response.status_code == 200
+            and response.get("Content-Type", "").startswith("application/json")
+            and b'"errors"' not in response.content
+        ):
+            response_cache.set_response(
+                key, response.content, response["Content-Type"]
+            )
+            response["X-Cache"] = "MISS"
+        return response
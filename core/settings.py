@@ -1,5 +1,6 @@
 from pathlib import Path
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env()
@@ -98,6 +99,36 @@ MEDIA_ROOT = BASE_DIR / "upload"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Use a shared backend (e.g. redis://) in production so cache invalidation
+# reaches every worker process.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Process-local caches never see the invalidations made by other processes
+# (workers, management commands), so responses are only cached by default
+# with a shared backend, and enabling them on a process-local one is an error.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Seconds an anonymous GraphQL query response stays cached (0 disables it)
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = env.int(
+    "GRAPHQL_RESPONSE_CACHE_TIMEOUT",
+    default=(
+        0
+        if CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHE_BACKENDS
+        else 60 * 15
+    ),
+)
+if (
+    GRAPHQL_RESPONSE_CACHE_TIMEOUT > 0
+    and CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHE_BACKENDS
+):
+    raise ImproperlyConfigured(
+        "GRAPHQL_RESPONSE_CACHE_TIMEOUT needs a shared cache: point CACHE_URL "
+        "at e.g. redis:// or set GRAPHQL_RESPONSE_CACHE_TIMEOUT=0."
+    )
+
 CORS_ALLOW_CREDENTIALS = True
 CORS_PREFLIGHT_MAX_AGE = 86400
 CORS_ALLOW_HEADERS = [
@@ -186,9 +217,32 @@ else:
 
 
 PUBLIC_GROQ_API_KEI = env("PUBLIC_GROQ_API_KEI")
+# Translations kept in memory per process in front of the TranslationMemory table
+TRANSLATION_MEMORY_SIZE = env.int("TRANSLATION_MEMORY_SIZE", default=2048)
+# Parallel Groq requests when translating the segments of an HTML document
+TRANSLATION_MAX_CONCURRENCY = env.int("TRANSLATION_MAX_CONCURRENCY", default=4)
+# "sync" resizes uploads inside the request, "async" stores them as is and
+# leaves the resizing to the process_images worker (see shared/images.py)
+IMAGE_PROCESSING_MODE = env("IMAGE_PROCESSING_MODE", default="sync")
+# Worker processes used by process_images
+IMAGE_PROCESSING_WORKERS = env.int("IMAGE_PROCESSING_WORKERS", default=2)
+# Encodings stored next to the JPEG derivatives ("webp", "avif"); formats the
+# installed Pillow cannot write are skipped
+IMAGE_VARIANT_FORMATS = env.list("IMAGE_VARIANT_FORMATS", default=["webp"])
+# On-demand resizing served under /img/<path>?w= (see shared/resizer.py)
+IMAGE_RESIZE_WIDTHS = [320, 480, 640, 768, 1024, 1280, 1600, 1920]
+IMAGE_RESIZE_QUALITIES = [60, 80]
+IMAGE_RESIZE_CACHE_DIR = BASE_DIR / "image_cache"
+IMAGE_RESIZE_CACHE_MAX_BYTES = env.int(
+    "IMAGE_RESIZE_CACHE_MAX_BYTES", default=1024 * 1024 * 1024
+)
 PUBLIC_SHORT_API = env("PUBLIC_SHORT_API")
 SHORT_IO_DOMAIN = env("SHORT_IO_DOMAIN")
 SHORT_IO_FOLDER_ID = env("SHORT_IO_FOLDER_ID")
+# Connection pool size and parallel statistics requests for Short.io
+SHORT_IO_MAX_CONCURRENCY = env.int("SHORT_IO_MAX_CONCURRENCY", default=8)
+# Seconds before a Short.io request gives up
+SHORT_IO_TIMEOUT = env.float("SHORT_IO_TIMEOUT", default=10)
 DJANGO_ADMIN_URL = env("DJANGO_ADMIN_URL")
 
 # Firebase Cloud Messaging (FCM) Configuration
@@ -207,6 +261,16 @@ FCM_DJANGO_SETTINGS = {
     "APP_VERBOSE_NAME": "FielMedina",
 }
 
+# Push notification delivery (see guard/outbox.py)
+# "firebase" sends through FCM, "stub" only logs (local development)
+NOTIFICATION_TRANSPORT = env("NOTIFICATION_TRANSPORT", default="firebase")
+NOTIFICATION_MAX_ATTEMPTS = env.int("NOTIFICATION_MAX_ATTEMPTS", default=5)
+# Concurrent 500-token multicast batches per notification
+NOTIFICATION_FANOUT_WORKERS = env.int("NOTIFICATION_FANOUT_WORKERS", default=4)
+# "tokens" sends multicast batches to each targeted device, "topics" publishes
+# one message per notification to FCM topics (see guard/segments.py)
+NOTIFICATION_DELIVERY = env("NOTIFICATION_DELIVERY", default="tokens")
+
 # Firebase Client Configuration (for mobile/web apps)
 # These values are used by client-side apps (iOS/Android/Web) to connect to Firebase
 # You can expose these via your API/GraphQL if needed
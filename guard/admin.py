@@ -17,6 +17,7 @@ from .models import (
     PublicTransportType,
     Partner,
     Sponsor,
+    NotificationOutbox,
 )
 from modeltranslation.admin import TranslationAdmin
 
@@ -268,3 +269,20 @@ class SponsorAdmin(admin.ModelAdmin):
             {"fields": ("name", "image", "link")},
         ),
     )
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = [
+        "kind",
+        "object_id",
+        "status",
+        "attempts",
+        "success_count",
+        "failure_count",
+        "pruned_count",
+        "created_at",
+        "sent_at",
+    ]
+    list_filter = ["status", "kind"]
+    readonly_fields = ["created_at", "updated_at", "locked_at", "sent_at"]
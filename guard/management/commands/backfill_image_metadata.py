@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from guard.models import Ad, Partner, Sponsor
+from shared.images import image_models
+from shared.models import image_metadata_columns, image_metadata_fields
+
+
+def image_fields():
+    models = {model: ["image", "image_mobile"] for model in image_models()}
+    models[Ad] = ["image_mobile", "image_tablet"]
+    models[Partner] = ["image"]
+    models[Sponsor] = ["image"]
+    return models
+
+
+class Command(BaseCommand):
+    help = (
+        "Store width, height, byte size, MIME type and placeholder of images "
+        "uploaded before these columns existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows saved per bulk update.",
+        )
+
+    def handle(self, *args, **options):
+        for model, field_names in image_fields().items():
+            for field_name in field_names:
+                updated = self.backfill(model, field_name, options["batch_size"])
+                if updated:
+                    self.stdout.write(
+                        f"{model._meta.label}.{field_name}: {updated} row(s)"
+                    )
+        self.stdout.write(self.style.SUCCESS("Image metadata backfilled"))
+
+    def backfill(self, model, field_name, batch_size):
+        columns = image_metadata_fields(field_name)
+        rows = (
+            model._default_manager.filter(
+                Q(**{f"{field_name}_width__isnull": True})
+                | Q(**{f"{field_name}_placeholder": ""})
+            )
+            .exclude(Q(**{f"{field_name}__isnull": True}) | Q(**{field_name: ""}))
+            .only("pk", field_name, *columns)
+        )
+
+        updated = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            file = getattr(row, field_name)
+            try:
+                with file.open("rb"):
+                    values = image_metadata_columns(field_name, file)
+            except Exception as e:
+                self.stderr.write(f"{model._meta.label} {row.pk}: {e}")
+                continue
+            for column, value in values.items():
+                setattr(row, column, value)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                model._default_manager.bulk_update(batch, columns)
+                updated += len(batch)
+                batch = []
+        if batch:
+            model._default_manager.bulk_update(batch, columns)
+            updated += len(batch)
+        return updated
@@ -0,0 +1,88 @@
+import time
+from io import BytesIO
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image as PilImage
+from PIL import ImageDraw
+
+from shared.utils import build_derivatives
+
+# Typical phone camera resolutions used when no fixture is given
+SYNTHETIC_SIZES = [(4032, 3024), (4000, 3000), (3024, 4032), (2560, 1920)]
+
+
+def synthetic_fixture(width, height):
+    """JPEG with gradients and shapes, so it does not compress trivially."""
+    img = PilImage.linear_gradient("L").resize((width, height))
+    img = PilImage.merge("RGB", (img, img.rotate(90).resize((width, height)), img))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, width, max(1, width // 40)):
+        draw.ellipse((i, i % height, i + width // 10, i % height + height // 10), "red")
+    output = BytesIO()
+    img.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full and the draft/reduce image processing paths on a "
+        "set of fixture images (synthetic camera-sized JPEGs by default)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="Image files or directories.")
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per image and path; the fastest one counts.",
+        )
+
+    def fixtures(self, paths):
+        if not paths:
+            return [
+                (f"synthetic {width}x{height}", synthetic_fixture(width, height))
+                for width, height in SYNTHETIC_SIZES
+            ]
+
+        files = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                files.extend(sorted(p for p in path.iterdir() if p.is_file()))
+            elif path.is_file():
+                files.append(path)
+            else:
+                raise CommandError(f"No such file or directory: {path}")
+        return [(file.name, file.read_bytes()) for file in files]
+
+    def measure(self, data, fast, repeat):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            build_derivatives(data, fast=fast)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        totals = {False: 0.0, True: 0.0}
+        for name, data in self.fixtures(options["paths"]):
+            timings = {
+                fast: self.measure(data, fast, options["repeat"])
+                for fast in (False, True)
+            }
+            for fast, elapsed in timings.items():
+                totals[fast] += elapsed
+            self.stdout.write(
+                f"{name}: full {timings[False] * 1000:.0f} ms, "
+                f"fast {timings[True] * 1000:.0f} ms "
+                f"({timings[False] / timings[True]:.1f}x)"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Total: full {totals[False]:.2f} s, fast {totals[True]:.2f} s "
+                f"({totals[False] / totals[True]:.1f}x)"
+            )
+        )
@@ -0,0 +1,51 @@
+from cities_light.models import City
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api import packs
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the offline content packs of the cities that have content. "
+        "Run it daily (e.g. from cron) so expired events drop out."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--city",
+            type=int,
+            action="append",
+            help="Only build the pack of this city id (repeatable).",
+        )
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            help="Only rebuild packs that are missing or out of date.",
+        )
+
+    def handle(self, *args, **options):
+        if options["city"]:
+            cities = City.objects.filter(pk__in=options["city"])
+        else:
+            cities = City.objects.filter(
+                Q(locations__isnull=False)
+                | Q(events__isnull=False)
+                | Q(hikings__isnull=False)
+            ).distinct()
+
+        built = 0
+        for city in cities.select_related("pack"):
+            pack = getattr(city, "pack", None)
+            if options["stale"] and pack is not None and not packs.is_stale(pack):
+                if pack.retired_files:
+                    packs.purge_retired_files(pack)
+                    pack.save(update_fields=["retired_files"])
+                continue
+            previous = pack.version if pack is not None else None
+            pack = packs.build(city)
+            built += 1
+            state = "unchanged" if pack.version == previous else "new version"
+            self.stdout.write(f"{city}: {pack.version} ({state}, {pack.size} bytes)")
+
+        self.stdout.write(self.style.SUCCESS(f"Built {built} pack(s)"))
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.signals import content_changed
+from shared import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the resized versions of images uploaded while "
+        "IMAGE_PROCESSING_MODE is 'async'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the images that are pending now and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Images claimed per model and batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "IMAGE_PROCESSING_WORKERS", 2),
+            help="Processes decoding and encoding images.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when no image is pending.",
+        )
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=max(1, options["workers"])) as executor:
+            while True:
+                handled = images.process(executor, options["batch_size"])
+                if handled:
+                    # Derivatives are written with update(), which sends no signals
+                    content_changed()
+                    self.stdout.write(f"Processed {handled} image(s)")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from guard import outbox
+from guard.notifications import NotificationService
+
+
+class Command(BaseCommand):
+    help = "Deliver queued push notifications from the notification outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the rows that are due now and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Number of rows claimed per batch.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--stub",
+            action="store_true",
+            help="Log notifications instead of sending them to FCM.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stub"]:
+            settings.NOTIFICATION_TRANSPORT = "stub"
+
+        while True:
+            # New registrations must hold their topics before content is
+            # published to them
+            if getattr(settings, "NOTIFICATION_DELIVERY", "tokens") == "topics":
+                NotificationService.sync_topic_subscriptions()
+            handled = outbox.process(options["batch_size"])
+            if handled:
+                self.stdout.write(f"Processed {handled} notification(s)")
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
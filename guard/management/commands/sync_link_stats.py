@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from guard.models import Ad, Event
+from shared import link_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Pull Short.io statistics for every ad and event link into the local "
+        "store and refresh Ad.clicks. Run it periodically (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            action="append",
+            choices=link_stats.PERIODS,
+            help="Only sync these periods (repeatable). Defaults to all.",
+        )
+
+    def handle(self, *args, **options):
+        periods = options["period"] or link_stats.PERIODS
+        short_ids = set(
+            Ad.objects.exclude(short_id__isnull=True)
+            .exclude(short_id="")
+            .values_list("short_id", flat=True)
+        ) | set(
+            Event.objects.exclude(short_id__isnull=True)
+            .exclude(short_id="")
+            .values_list("short_id", flat=True)
+        )
+
+        clicks = link_stats.sync(short_ids, periods)
+
+        changed = []
+        ads = Ad.objects.filter(short_id__in=clicks).only("pk", "short_id", "clicks")
+        for ad in ads:
+            if ad.clicks != clicks[ad.short_id]:
+                ad.clicks = clicks[ad.short_id]
+                changed.append(ad)
+        Ad.objects.bulk_update(changed, ["clicks"], batch_size=500)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synced {len(short_ids)} link(s), "
+                f"updated clicks on {len(changed)} ad(s)"
+            )
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from guard.models import DeviceSegment
+from guard.notifications import FIREBASE_AVAILABLE, NotificationService
+from guard.segments import update_segment
+
+
+class Command(BaseCommand):
+    help = (
+        "Subscribe devices to the FCM topics matching their city and "
+        "interests (topic delivery mode)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help=(
+                "Resync every active device, creating segments for devices "
+                "registered before segments existed."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if not FIREBASE_AVAILABLE:
+            self.stderr.write("firebase_admin or fcm_django is not installed.")
+            return
+
+        if options["all"]:
+            devices = NotificationService.get_all_active_devices().filter(
+                segment__isnull=True
+            )
+            for device in devices.iterator():
+                update_segment(device)
+            DeviceSegment.objects.update(topics_dirty=True)
+
+        total = 0
+        while synced := NotificationService.sync_topic_subscriptions():
+            total += synced
+        self.stdout.write(self.style.SUCCESS(f"Synced {total} device(s)"))
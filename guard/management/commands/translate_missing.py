@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.db.models import Q
+from modeltranslation.translator import translator as registry
+from modeltranslation.utils import build_localized_fieldname
+from tinymce.models import HTMLField
+
+from api.signals import content_changed
+from shared.translator import get_translator
+
+
+class Command(BaseCommand):
+    help = (
+        "Translate empty modeltranslation fields from the source language. "
+        "Each chunk is saved as soon as it is translated, so an interrupted "
+        "run resumes where it stopped when started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            default=settings.LANGUAGE_CODE,
+            help="Language translated from. Defaults to LANGUAGE_CODE.",
+        )
+        parser.add_argument(
+            "--target",
+            action="append",
+            help="Language to fill (repeatable). Defaults to every other language.",
+        )
+        parser.add_argument(
+            "--model",
+            action="append",
+            help="Only this model, as app_label.ModelName (repeatable).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Rows translated and saved per chunk.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "TRANSLATION_MAX_CONCURRENCY", 4),
+            help="Concurrent translation requests.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many values are missing.",
+        )
+
+    def handle(self, *args, **options):
+        languages = [code for code, _ in settings.LANGUAGES]
+        source = options["source"]
+        targets = options["target"] or [code for code in languages if code != source]
+        for language in [source, *targets]:
+            if language not in languages:
+                raise CommandError(f"Unknown language: {language}")
+
+        translatable = self.translatable_fields(options["model"])
+        translator = None if options["dry_run"] else get_translator()
+
+        total = 0
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as executor:
+            for model, field, preserve_html in translatable:
+                for target in targets:
+                    if target == source:
+                        continue
+                    total += self.fill(
+                        executor,
+                        translator,
+                        model,
+                        field,
+                        preserve_html,
+                        source,
+                        target,
+                        options,
+                    )
+
+        if options["dry_run"]:
+            self.stdout.write(f"{total} value(s) would be translated")
+            return
+
+        if total:
+            content_changed()
+        self.stdout.write(self.style.SUCCESS(f"Translated {total} value(s)"))
+
+    def translatable_fields(self, labels):
+        wanted = {label.lower() for label in labels or []}
+        fields = []
+        for model in registry.get_registered_models(abstract=False):
+            if wanted and model._meta.label_lower not in wanted:
+                continue
+            for name in registry.get_options_for_model(model).get_field_names():
+                field = model._meta.get_field(name)
+                # Slugs are identifiers, not prose
+                if isinstance(field, models.SlugField):
+                    continue
+                fields.append((model, name, isinstance(field, HTMLField)))
+        return fields
+
+    def fill(
+        self, executor, translator, model, field, preserve_html, source, target, options
+    ):
+        source_column = build_localized_fieldname(field, source)
+        target_column = build_localized_fieldname(field, target)
+        missing = (
+            model._default_manager.filter(
+                Q(**{f"{target_column}__isnull": True}) | Q(**{target_column: ""})
+            )
+            .exclude(Q(**{f"{source_column}__isnull": True}) | Q(**{source_column: ""}))
+            .order_by("pk")
+        )
+        label = f"{model._meta.label}.{target_column}"
+
+        if options["dry_run"]:
+            count = missing.count()
+            if count:
+                self.stdout.write(f"{label}: {count} missing")
+            return count
+
+        translated = 0
+        last_pk = None
+        while True:
+            chunk = missing
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            rows = list(
+                chunk.only("pk", source_column, target_column)[: options["batch_size"]]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+
+            results = executor.map(
+                lambda row: translator.translate(
+                    getattr(row, source_column), source, target, preserve_html
+                ),
+                rows,
+            )
+            changed = []
+            for row, text in zip(rows, results):
+                if text:
+                    setattr(row, target_column, text)
+                    changed.append(row)
+            model._default_manager.bulk_update(changed, [target_column])
+
+            translated += len(changed)
+            failed = len(rows) - len(changed)
+            self.stdout.write(
+                f"{label}: saved {len(changed)} row(s) up to pk {last_pk}"
+                + (f", {failed} failed" if failed else "")
+            )
+        return translated
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.9 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+from shared.geo import geohash_encode
+
+
+def populate_geohashes(apps, schema_editor):
+    for model_name in ("Location", "Hiking"):
+        model = apps.get_model("guard", model_name)
+        rows = model.objects.exclude(latitude__isnull=True).exclude(
+            longitude__isnull=True
+        )
+        for row in rows.only("pk", "latitude", "longitude").iterator():
+            row.geohash = geohash_encode(float(row.latitude), float(row.longitude))
+            row.save(update_fields=["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0055_event_boost"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="location",
+            name="geohash",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=12
+            ),
+        ),
+        migrations.AddField(
+            model_name="hiking",
+            name="geohash",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=12
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="location_lat_lon_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="hiking",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="hiking_lat_lon_idx"
+            ),
+        ),
+        migrations.RunPython(populate_geohashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.9 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0056_location_geohash_hiking_geohash_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="location_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(
+                fields=["city", "-created_at", "-id"], name="location_city_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="hiking",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="hiking_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="hiking",
+            index=models.Index(
+                fields=["city", "-created_at", "-id"], name="hiking_city_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="event_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["city", "-created_at", "-id"], name="event_city_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tip",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="tip_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tip",
+            index=models.Index(
+                fields=["city", "-created_at", "-id"], name="tip_city_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="ad_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["city", "-created_at", "-id"], name="ad_city_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="publictransport",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="transport_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="publictransport",
+            index=models.Index(
+                fields=["city", "-created_at", "-id"], name="transport_city_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-16 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0058_notificationoutbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationoutbox",
+            name="success_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Successful sends"
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationoutbox",
+            name="failure_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Failed sends"),
+        ),
+        migrations.AddField(
+            model_name="notificationoutbox",
+            name="pruned_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Deactivated devices"
+            ),
+        ),
+    ]
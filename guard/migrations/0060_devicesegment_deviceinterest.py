@@ -0,0 +1,105 @@
+# Generated by Django 5.2.9 on 2026-10-16 11:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cities_light", "0012_city_translations_country_translations_and_more"),
+        ("fcm_django", "__first__"),
+        ("guard", "0059_notificationoutbox_counters"),
+        ("shared", "0003_userpreference"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeviceSegment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "city",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="device_segments",
+                        to="cities_light.city",
+                        verbose_name="City",
+                    ),
+                ),
+                (
+                    "device",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="segment",
+                        to="fcm_django.fcmdevice",
+                        verbose_name="Device",
+                    ),
+                ),
+                (
+                    "preference",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="device_segments",
+                        to="shared.userpreference",
+                        verbose_name="User preference",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Device segment",
+                "verbose_name_plural": "Device segments",
+            },
+        ),
+        migrations.CreateModel(
+            name="DeviceInterest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("interest", models.SlugField(verbose_name="Interest")),
+                (
+                    "segment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="interests",
+                        to="guard.devicesegment",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Device interest",
+                "verbose_name_plural": "Device interests",
+                "indexes": [
+                    models.Index(
+                        fields=["interest", "segment"],
+                        name="device_interest_lookup_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("segment", "interest"), name="unique_device_interest"
+                    )
+                ],
+            },
+        ),
+    ]
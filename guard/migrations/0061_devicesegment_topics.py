@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-16 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0060_devicesegment_deviceinterest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="devicesegment",
+            name="topics",
+            field=models.JSONField(blank=True, default=list, verbose_name="Topics"),
+        ),
+        migrations.AddField(
+            model_name="devicesegment",
+            name="topics_dirty",
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+    ]
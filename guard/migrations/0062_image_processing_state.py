@@ -0,0 +1,133 @@
+# Generated by Django 5.2.9 on 2026-10-16 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0061_devicesegment_topics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imagead",
+            name="processing_claimed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Processing claimed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="processing_error",
+            field=models.TextField(
+                blank=True, default="", verbose_name="Processing error"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="processing_state",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="ready",
+                max_length=20,
+                verbose_name="Processing state",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="processing_claimed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Processing claimed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="processing_error",
+            field=models.TextField(
+                blank=True, default="", verbose_name="Processing error"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="processing_state",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="ready",
+                max_length=20,
+                verbose_name="Processing state",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="processing_claimed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Processing claimed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="processing_error",
+            field=models.TextField(
+                blank=True, default="", verbose_name="Processing error"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="processing_state",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="ready",
+                max_length=20,
+                verbose_name="Processing state",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="processing_claimed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Processing claimed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="processing_error",
+            field=models.TextField(
+                blank=True, default="", verbose_name="Processing error"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="processing_state",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="ready",
+                max_length=20,
+                verbose_name="Processing state",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-16 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0062_image_processing_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imagead",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, verbose_name="Variants"),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, verbose_name="Variants"),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, verbose_name="Variants"),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, verbose_name="Variants"),
+        ),
+    ]
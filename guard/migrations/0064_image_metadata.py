@@ -0,0 +1,415 @@
+# Generated by Django 5.2.9 on 2026-10-16 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0063_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="image_mobile_height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Mobile image height",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_mobile_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Mobile image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_mobile_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_mobile_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_tablet_height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Tablet image height",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_tablet_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Tablet image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_tablet_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Tablet image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_tablet_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Tablet image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_mobile_height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Mobile image height",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_mobile_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Mobile image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_mobile_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_mobile_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_mobile_height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Mobile image height",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_mobile_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Mobile image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_mobile_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_mobile_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_mobile_height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Mobile image height",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_mobile_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Mobile image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_mobile_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_mobile_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_mobile_height",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Mobile image height",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_mobile_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Mobile image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_mobile_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_mobile_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Mobile image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="partner",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="partner",
+            name="image_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="partner",
+            name="image_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="partner",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image width"
+            ),
+        ),
+        migrations.AddField(
+            model_name="sponsor",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="sponsor",
+            name="image_mime",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Image MIME type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sponsor",
+            name="image_size",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image size"
+            ),
+        ),
+        migrations.AddField(
+            model_name="sponsor",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Image width"
+            ),
+        ),
+    ]
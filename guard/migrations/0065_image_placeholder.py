@@ -0,0 +1,133 @@
+# Generated by Django 5.2.9 on 2026-10-16 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0064_image_metadata"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="image_mobile_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Mobile image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="image_tablet_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Tablet image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagead",
+            name="image_mobile_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Mobile image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="image_mobile_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Mobile image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="image_mobile_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Mobile image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="image_mobile_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Mobile image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="partner",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Image placeholder",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sponsor",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Image placeholder",
+            ),
+        ),
+    ]
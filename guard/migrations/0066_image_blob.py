@@ -0,0 +1,67 @@
+# Generated by Django 5.2.9 on 2026-10-16 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0065_image_placeholder"),
+        ("shared", "0006_imageblob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imagead",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="shared.imageblob",
+                verbose_name="Blob",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imageevent",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="shared.imageblob",
+                verbose_name="Blob",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagehiking",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="shared.imageblob",
+                verbose_name="Blob",
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagelocation",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="shared.imageblob",
+                verbose_name="Blob",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:40
+
+from django.db import migrations, models
+
+
+def copy_user_uids(apps, schema_editor):
+    DeviceSegment = apps.get_model("guard", "DeviceSegment")
+    UserPreference = apps.get_model("shared", "UserPreference")
+    DeviceSegment.objects.filter(preference__isnull=False).update(
+        user_uid=models.Subquery(
+            UserPreference.objects.filter(pk=models.OuterRef("preference_id")).values(
+                "user_uid"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("guard", "0066_image_blob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="devicesegment",
+            name="user_uid",
+            field=models.UUIDField(
+                blank=True, db_index=True, null=True, verbose_name="User UID"
+            ),
+        ),
+        migrations.RunPython(copy_user_uids, migrations.RunPython.noop),
+    ]
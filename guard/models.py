@@ -7,13 +7,15 @@ from django.db import models
 from django.db.models.signals import post_delete
 from django.db.models import FileField
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from tinymce.models import HTMLField
 from django.core.files.uploadedfile import UploadedFile
 from django.core.files.base import ContentFile
 from shared.models import OptimizedImageModel
 from shared.utils import optimize_image
-from shared.models import UserProfile
+from shared.geo import geohash_encode
+from shared.models import UserProfile, UserPreference, update_image_metadata
 from PIL import Image as PilImage
 from PIL import ImageOps
 
@@ -33,6 +35,22 @@ def hiking_image_path(instance, filename):
     return f"hikings/{instance.hiking.id}/{name}.jpg"
 
 
+def compute_geohash(latitude, longitude):
+    if latitude is None or longitude is None:
+        return ""
+    return geohash_encode(float(latitude), float(longitude))
+
+
+def include_geohash(update_fields):
+    """Make sure a partial save touching coordinates also writes the geohash."""
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    if update_fields & {"latitude", "longitude"}:
+        update_fields.add("geohash")
+    return update_fields
+
+
 def ad_image_path(instance, filename):
     name, ext = os.path.splitext(filename)
     return f"ads/{instance.ad.id}/{name}.jpg"
@@ -162,6 +180,9 @@ class Location(models.Model):
     )
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    geohash = models.CharField(
+        max_length=12, blank=True, default="", db_index=True, editable=False
+    )
     is_active_ads = models.BooleanField(default=False, verbose_name=_("Active Ads"))
     story = HTMLField(verbose_name=_("Story"))
     openFrom = models.TimeField(
@@ -194,6 +215,19 @@ class Location(models.Model):
     class Meta:
         verbose_name = _("Location")
         verbose_name_plural = _("Locations")
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="location_lat_lon_idx"),
+            models.Index(fields=["-created_at", "-id"], name="location_created_idx"),
+            models.Index(
+                fields=["city", "-created_at", "-id"], name="location_city_created_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.geohash = compute_geohash(self.latitude, self.longitude)
+        if "update_fields" in kwargs:
+            kwargs["update_fields"] = include_geohash(kwargs["update_fields"])
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -235,10 +269,26 @@ class Hiking(models.Model):
     longitude = models.DecimalField(
         max_digits=9, decimal_places=6, null=True, blank=True
     )
+    geohash = models.CharField(
+        max_length=12, blank=True, default="", db_index=True, editable=False
+    )
 
     class Meta:
         verbose_name = _("Hiking")
         verbose_name_plural = _("Hikings")
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="hiking_lat_lon_idx"),
+            models.Index(fields=["-created_at", "-id"], name="hiking_created_idx"),
+            models.Index(
+                fields=["city", "-created_at", "-id"], name="hiking_city_created_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.geohash = compute_geohash(self.latitude, self.longitude)
+        if "update_fields" in kwargs:
+            kwargs["update_fields"] = include_geohash(kwargs["update_fields"])
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -305,6 +355,12 @@ class Event(models.Model):
     class Meta:
         verbose_name = _("Event")
         verbose_name_plural = _("Events")
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="event_created_idx"),
+            models.Index(
+                fields=["city", "-created_at", "-id"], name="event_city_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -326,6 +382,12 @@ class Tip(models.Model):
     class Meta:
         verbose_name = _("Tip")
         verbose_name_plural = _("Tips")
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="tip_created_idx"),
+            models.Index(
+                fields=["city", "-created_at", "-id"], name="tip_city_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.city.name
@@ -375,6 +437,50 @@ class Ad(models.Model):
         null=True,
         blank=True,
     )
+    image_mobile_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Mobile image width")
+    )
+    image_mobile_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Mobile image height")
+    )
+    image_mobile_size = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Mobile image size")
+    )
+    image_mobile_mime = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Mobile image MIME type"),
+    )
+    image_mobile_placeholder = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Mobile image placeholder"),
+    )
+    image_tablet_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Tablet image width")
+    )
+    image_tablet_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Tablet image height")
+    )
+    image_tablet_size = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Tablet image size")
+    )
+    image_tablet_mime = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Tablet image MIME type"),
+    )
+    image_tablet_placeholder = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Tablet image placeholder"),
+    )
     link = models.URLField()
     short_link = models.URLField(blank=True, null=True)
     short_id = models.CharField(max_length=50, blank=True, null=True)
@@ -384,6 +490,12 @@ class Ad(models.Model):
     class Meta:
         verbose_name = _("Ad")
         verbose_name_plural = _("Ads")
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="ad_created_idx"),
+            models.Index(
+                fields=["city", "-created_at", "-id"], name="ad_city_created_idx"
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.name:
@@ -401,6 +513,7 @@ class Ad(models.Model):
                     content.name = unique_filename
                     setattr(self, field_name, content)
 
+        update_image_metadata(self, "image_mobile", "image_tablet")
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -476,6 +589,12 @@ class PublicTransport(models.Model):
     class Meta:
         verbose_name = _("Public Transport")
         verbose_name_plural = _("Public Transports")
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="transport_created_idx"),
+            models.Index(
+                fields=["city", "-created_at", "-id"], name="transport_city_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.city.name
@@ -529,6 +648,25 @@ class Partner(models.Model):
     name = models.CharField(max_length=255, verbose_name=_("Name"))
     image = models.ImageField(upload_to="partners/", verbose_name=_("Image"))
     link = models.URLField(verbose_name=_("Link"))
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image width")
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image height")
+    )
+    image_size = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image size")
+    )
+    image_mime = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Image MIME type"),
+    )
+    image_placeholder = models.TextField(
+        blank=True, default="", editable=False, verbose_name=_("Image placeholder")
+    )
 
     class Meta:
         verbose_name = _("Partner")
@@ -542,6 +680,7 @@ class Partner(models.Model):
                 name, content = processed
                 content.name = name
                 self.image = content
+        update_image_metadata(self, "image")
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -552,6 +691,25 @@ class Sponsor(models.Model):
     name = models.CharField(max_length=255, verbose_name=_("Name"))
     image = models.ImageField(upload_to="sponsors/", verbose_name=_("Image"))
     link = models.URLField(verbose_name=_("Link"))
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image width")
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image height")
+    )
+    image_size = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image size")
+    )
+    image_mime = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Image MIME type"),
+    )
+    image_placeholder = models.TextField(
+        blank=True, default="", editable=False, verbose_name=_("Image placeholder")
+    )
 
     class Meta:
         verbose_name = _("sponsor")
@@ -564,12 +722,143 @@ class Sponsor(models.Model):
                 name, content = processed
                 content.name = name
                 self.image = content
+        update_image_metadata(self, "image")
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
 
+class NotificationOutbox(models.Model):
+    """
+    Push notification waiting to be delivered by the ``send_notifications``
+    worker. Rows are written in the same transaction as the content they
+    announce, so the worker only sees them once that content is committed.
+    """
+
+    class Kind(models.TextChoices):
+        LOCATION = "location", _("Location")
+        EVENT = "event", _("Event")
+        HIKING = "hiking", _("Hiking")
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        PROCESSING = "processing", _("Processing")
+        SENT = "sent", _("Sent")
+        FAILED = "failed", _("Failed")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name=_("Kind"))
+    object_id = models.PositiveBigIntegerField(verbose_name=_("Object ID"))
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name=_("Status"),
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_("Attempts"))
+    available_at = models.DateTimeField(
+        default=timezone.now, verbose_name=_("Available at")
+    )
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Sent at"))
+    last_error = models.TextField(blank=True, default="", verbose_name=_("Last error"))
+    success_count = models.PositiveIntegerField(
+        default=0, verbose_name=_("Successful sends")
+    )
+    failure_count = models.PositiveIntegerField(
+        default=0, verbose_name=_("Failed sends")
+    )
+    pruned_count = models.PositiveIntegerField(
+        default=0, verbose_name=_("Deactivated devices")
+    )
+
+    class Meta:
+        verbose_name = _("Notification outbox entry")
+        verbose_name_plural = _("Notification outbox")
+        indexes = [
+            models.Index(
+                fields=["status", "available_at"], name="outbox_status_available_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id} ({self.status})"
+
+
+class DeviceSegment(models.Model):
+    """
+    Targeting data for one FCM device: the app user it belongs to and the
+    city they follow. ``DeviceInterest`` rows mirror the user's interests so
+    notifications can be matched with indexed lookups.
+    """
+
+    device = models.OneToOneField(
+        "fcm_django.FCMDevice",
+        on_delete=models.CASCADE,
+        related_name="segment",
+        verbose_name=_("Device"),
+    )
+    # Kept apart from ``preference`` so a device registered before its
+    # user's first preference sync is linked once the preference is created
+    user_uid = models.UUIDField(
+        null=True, blank=True, db_index=True, verbose_name=_("User UID")
+    )
+    preference = models.ForeignKey(
+        UserPreference,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="device_segments",
+        verbose_name=_("User preference"),
+    )
+    city = models.ForeignKey(
+        "cities_light.City",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="device_segments",
+        verbose_name=_("City"),
+    )
+    # FCM topics the device is subscribed to, and whether they need syncing
+    # with the segment (only used in topic delivery mode)
+    topics = models.JSONField(default=list, blank=True, verbose_name=_("Topics"))
+    topics_dirty = models.BooleanField(default=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Device segment")
+        verbose_name_plural = _("Device segments")
+
+    def __str__(self):
+        return f"{self.device} ({self.city or _('all cities')})"
+
+
+class DeviceInterest(models.Model):
+    segment = models.ForeignKey(
+        DeviceSegment, on_delete=models.CASCADE, related_name="interests"
+    )
+    interest = models.SlugField(max_length=50, verbose_name=_("Interest"))
+
+    class Meta:
+        verbose_name = _("Device interest")
+        verbose_name_plural = _("Device interests")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["segment", "interest"], name="unique_device_interest"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["interest", "segment"], name="device_interest_lookup_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.interest
+
+
 @receiver(post_delete, sender=Partner)
 @receiver(post_delete, sender=Sponsor)
 def cleanup_all_files(sender, instance, **kwargs):
@@ -2,20 +2,151 @@
 Push notification service for sending FCM notifications
 when new locations, events, or hikings are created.
 """
+from __future__ import annotations
+
 import logging
-from typing import List, Optional
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
 from django.conf import settings
 
+from guard.models import DeviceSegment
+from guard.segments import (
+    content_interests,
+    segment_topics,
+    target_devices,
+    topic_condition,
+)
+
 logger = logging.getLogger(__name__)
 
 try:
-    from firebase_admin import messaging
+    from firebase_admin import exceptions, messaging
     from fcm_django.models import FCMDevice
     FIREBASE_AVAILABLE = True
 except ImportError:
     FIREBASE_AVAILABLE = False
     logger.warning("firebase_admin or fcm_django not available. Push notifications will be disabled.")
 
+# FCM rejects multicast messages with more than 500 tokens
+MAX_MULTICAST_TOKENS = 500
+
+# Rows fetched per database round trip while streaming tokens
+TOKEN_CHUNK_SIZE = 2000
+
+# FCM accepts at most 1000 tokens per topic (un)subscribe call
+MAX_TOPIC_TOKENS = 1000
+
+# Per-token topic errors meaning the token itself is dead
+DEAD_TOPIC_TOKEN_REASONS = {"NOT_FOUND", "INVALID_ARGUMENT"}
+
+
+class FirebaseTransport:
+    """Sends messages through the Firebase Admin SDK"""
+
+    def send_multicast(self, message):
+        # send_multicast is deprecated (and backed by a retired batch API)
+        # in recent firebase_admin releases
+        send = getattr(messaging, "send_each_for_multicast", None) or messaging.send_multicast
+        return send(message)
+
+    def send(self, message):
+        return messaging.send(message)
+
+    def subscribe(self, tokens, topic):
+        return messaging.subscribe_to_topic(tokens, topic)
+
+    def unsubscribe(self, tokens, topic):
+        return messaging.unsubscribe_from_topic(tokens, topic)
+
+
+class StubTransport:
+    """Logs messages instead of sending them, for local development"""
+
+    def send_multicast(self, message):
+        logger.info(
+            f"[stub FCM] {message.notification.title!r} to {len(message.tokens)} devices"
+        )
+        return messaging.BatchResponse(
+            [
+                messaging.SendResponse({"name": f"stub/{i}"}, None)
+                for i in range(len(message.tokens))
+            ]
+        )
+
+    def send(self, message):
+        logger.info(f"[stub FCM] {message.notification.title!r} to {message.condition}")
+        return "stub/0"
+
+    def subscribe(self, tokens, topic):
+        logger.info(f"[stub FCM] subscribe {len(tokens)} devices to {topic}")
+
+    def unsubscribe(self, tokens, topic):
+        logger.info(f"[stub FCM] unsubscribe {len(tokens)} devices from {topic}")
+
+
+TRANSPORTS = {
+    "firebase": FirebaseTransport,
+    "stub": StubTransport,
+}
+
+
+def get_transport():
+    """Return the transport selected by the NOTIFICATION_TRANSPORT setting"""
+    name = getattr(settings, "NOTIFICATION_TRANSPORT", "firebase")
+    return TRANSPORTS[name]()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most ``size`` items"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@dataclass
+class FanoutResult:
+    """Aggregated outcome of sending one notification to every batch"""
+
+    batches: int = 0
+    success_count: int = 0
+    failure_count: int = 0
+    failed_batches: int = 0
+    pruned_count: int = 0
+
+    def add(self, tokens: List[str], response) -> None:
+        self.batches += 1
+        if response is None:
+            self.failed_batches += 1
+            self.failure_count += len(tokens)
+            return
+        self.success_count += response.success_count
+        self.failure_count += response.failure_count
+
+
+def is_invalid_token_error(error) -> bool:
+    """Whether an InvalidArgumentError is about the token, not the message"""
+    return "registration token" in str(error).lower()
+
+
+def dead_tokens(tokens: List[str], response) -> List[str]:
+    """
+    Tokens of a batch that FCM reported as unregistered or invalid.
+
+    Other InvalidArgumentErrors point at the message (e.g. a malformed image
+    URL or an oversized payload), so their tokens are kept.
+    """
+    dead = []
+    for token, send_response in zip(tokens, response.responses):
+        error = send_response.exception
+        if isinstance(error, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+            dead.append(token)
+        elif isinstance(error, exceptions.InvalidArgumentError) and is_invalid_token_error(error):
+            dead.append(token)
+    return dead
+
 
 class NotificationService:
     """Service for sending push notifications via FCM"""
@@ -36,6 +167,26 @@ class NotificationService:
             devices = NotificationService.get_all_active_devices()
         return [device.registration_id for device in devices if device.registration_id]
 
+    @staticmethod
+    def iter_tokens(devices=None) -> Iterator[str]:
+        """Stream registration tokens without loading whole device rows"""
+        if not FIREBASE_AVAILABLE:
+            return iter(())
+        if devices is None:
+            devices = NotificationService.get_all_active_devices()
+        return (
+            devices.exclude(registration_id="")
+            .values_list("registration_id", flat=True)
+            .iterator(chunk_size=TOKEN_CHUNK_SIZE)
+        )
+
+    @staticmethod
+    def deactivate_tokens(tokens: List[str]) -> int:
+        """Mark devices as inactive in a single UPDATE; return how many changed"""
+        return FCMDevice.objects.filter(registration_id__in=tokens, active=True).update(
+            active=False
+        )
+
     @staticmethod
     def build_absolute_image_url(image_field) -> Optional[str]:
         """Build absolute URL for an image field"""
@@ -46,10 +197,10 @@ class NotificationService:
             # We'll build URL using settings
             if not image_field.name:
                 return None
-                
+
             base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000').rstrip('/')
             media_url = settings.MEDIA_URL.lstrip('/')
-            
+
             # Build full URL
             return f"{base_url}/{media_url}{image_field.name}"
         except Exception as e:
@@ -57,35 +208,236 @@ class NotificationService:
             return None
 
     @staticmethod
-    def send_new_event_notification(event) -> Optional[messaging.BatchResponse]:
+    def first_image_url(instance) -> Optional[str]:
+        """Absolute URL of the first image attached to a location/event/hiking"""
+        first_image = instance.images.first()
+        if first_image and first_image.image:
+            return NotificationService.build_absolute_image_url(first_image.image)
+        return None
+
+    @staticmethod
+    def message_options(title, body, image_url, data, channel_id) -> dict:
+        """Payload shared by multicast and topic messages"""
+        return dict(
+            notification=messaging.Notification(
+                title=title,
+                body=body,
+                image=image_url,
+            ),
+            data=data,
+            apns=messaging.APNSConfig(
+                payload=messaging.APNSPayload(
+                    aps=messaging.Aps(
+                        sound='default',
+                        badge=1,
+                        mutable_content=True,
+                        alert=messaging.ApsAlert(
+                            title=title,
+                            body=body,
+                        ),
+                    )
+                )
+            ),
+            android=messaging.AndroidConfig(
+                notification=messaging.AndroidNotification(
+                    sound='default',
+                    channel_id=channel_id,
+                    priority='high',
+                )
+            ),
+        )
+
+    @staticmethod
+    def build_message(tokens, title, body, image_url, data, channel_id):
+        """Build the multicast message sent to one batch of tokens"""
+        return messaging.MulticastMessage(
+            tokens=tokens,
+            **NotificationService.message_options(
+                title, body, image_url, data, channel_id
+            ),
+        )
+
+    @staticmethod
+    def publish(condition, title, body, image_url, data, channel_id) -> FanoutResult:
+        """Send one message to the devices subscribed to a topic condition"""
+        get_transport().send(
+            messaging.Message(
+                condition=condition,
+                **NotificationService.message_options(
+                    title, body, image_url, data, channel_id
+                ),
+            )
+        )
+        return FanoutResult(batches=1, success_count=1)
+
+    @staticmethod
+    def fan_out(tokens: Iterable[str], build) -> FanoutResult:
+        """
+        Send ``build(batch)`` to every batch of at most 500 tokens.
+
+        Batches go out concurrently on a bounded thread pool. Tokens are
+        consumed lazily, so only a few batches are held in memory at once.
+        Devices whose tokens FCM reports as dead are deactivated as each
+        batch completes.
+        """
+        workers = getattr(settings, "NOTIFICATION_FANOUT_WORKERS", 4)
+        transport = get_transport()
+        result = FanoutResult()
+
+        def send(batch):
+            try:
+                return batch, transport.send_multicast(build(batch))
+            except Exception as e:
+                logger.error(
+                    f"Error sending a batch of {len(batch)} notifications: {e}",
+                    exc_info=True,
+                )
+                return batch, None
+
+        def collect(futures):
+            for future in futures:
+                batch, response = future.result()
+                result.add(batch, response)
+                if response is None:
+                    continue
+                dead = dead_tokens(batch, response)
+                if dead:
+                    result.pruned_count += NotificationService.deactivate_tokens(dead)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            for batch in batched(tokens, MAX_MULTICAST_TOKENS):
+                if len(in_flight) >= workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(send, batch))
+            collect(wait(in_flight).done)
+
+        return result
+
+    @staticmethod
+    def broadcast(
+        title, body, image_url, data, channel_id, city_id=None, interests=()
+    ) -> FanoutResult:
+        """Send a notification to the active devices of a segment"""
+        if getattr(settings, "NOTIFICATION_DELIVERY", "tokens") == "topics":
+            return NotificationService.publish(
+                topic_condition(interests, city_id),
+                title,
+                body,
+                image_url,
+                data,
+                channel_id,
+            )
+
+        devices = target_devices(
+            NotificationService.get_all_active_devices(), city_id, interests
+        )
+        result = NotificationService.fan_out(
+            NotificationService.iter_tokens(devices),
+            lambda tokens: NotificationService.build_message(
+                tokens, title, body, image_url, data, channel_id
+            ),
+        )
+        # Nothing reached FCM: raise so the outbox retries the notification.
+        # A partial failure is not retried, that would notify devices twice.
+        if result.batches and result.failed_batches == result.batches:
+            raise RuntimeError(f"All {result.batches} notification batches failed")
+        return result
+
+    @staticmethod
+    def sync_topic_subscriptions(limit: int = 5000) -> int:
+        """
+        Bring the topic subscriptions of changed device segments in line
+        with their city and interests.
+
+        Tokens are grouped per topic so each (un)subscribe call covers up to
+        1000 devices. Devices whose token FCM reports as dead are
+        deactivated; other failures leave the segment for the next sync.
+        Returns the number of segments synced.
+        """
+        segments = list(
+            DeviceSegment.objects.filter(topics_dirty=True, device__active=True)
+            .select_related("device")
+            .prefetch_related("interests")[:limit]
+        )
+        subscribe = defaultdict(list)
+        unsubscribe = defaultdict(list)
+        previous = {}
+        for segment in segments:
+            wanted = segment_topics(segment)
+            current = set(segment.topics)
+            previous[segment.pk] = segment.topics
+            token = segment.device.registration_id
+            for topic in wanted - current:
+                subscribe[topic].append(token)
+            for topic in current - wanted:
+                unsubscribe[topic].append(token)
+            segment.topics = sorted(wanted)
+            segment.topics_dirty = False
+
+        transport = get_transport()
+        dead = set()
+        failed = set()
+
+        def apply(call, topic, tokens):
+            for batch in batched(tokens, MAX_TOPIC_TOKENS):
+                try:
+                    response = call(batch, topic)
+                except Exception as e:
+                    logger.error(
+                        f"Error updating {len(batch)} subscriptions to {topic}: {e}",
+                        exc_info=True,
+                    )
+                    failed.update(batch)
+                    continue
+                for error in getattr(response, "errors", None) or ():
+                    token = batch[error.index]
+                    if error.reason in DEAD_TOPIC_TOKEN_REASONS:
+                        dead.add(token)
+                    else:
+                        failed.add(token)
+
+        for topic, tokens in unsubscribe.items():
+            apply(transport.unsubscribe, topic, tokens)
+        for topic, tokens in subscribe.items():
+            apply(transport.subscribe, topic, tokens)
+
+        # Segments with a failed call keep their old topics and are retried
+        # by the next sync; (un)subscribing again is harmless
+        retried = [
+            segment
+            for segment in segments
+            if segment.device.registration_id in failed - dead
+        ]
+        for segment in retried:
+            segment.topics = previous[segment.pk]
+            segment.topics_dirty = True
+        DeviceSegment.objects.bulk_update(segments, ["topics", "topics_dirty"])
+        if dead:
+            NotificationService.deactivate_tokens(list(dead))
+        if failed or dead:
+            logger.warning(
+                f"Topic sync: {len(retried)} device(s) left for retry, "
+                f"{len(dead)} dead token(s) deactivated"
+            )
+        return len(segments) - len(retried)
+
+    @staticmethod
+    def send_new_event_notification(event) -> Optional[FanoutResult]:
         """Send notification when a new event is added"""
         if not FIREBASE_AVAILABLE:
             logger.warning("Firebase not available, skipping notification")
             return None
 
         try:
-            # Get all active device tokens
-            tokens = NotificationService.get_user_tokens()
-            if not tokens:
-                logger.info("No active FCM devices found, skipping notification")
-                return None
-
-            # Get first image URL if available
-            image_url = None
-            first_image = event.images.first()
-            if first_image and first_image.image:
-                image_url = NotificationService.build_absolute_image_url(first_image.image)
-
             # Format event date
             start_date_str = event.startDate.strftime("%B %d, %Y") if event.startDate else ""
 
-            # Build notification message
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title='🎉 New Event Coming Up!',
-                    body=f'{event.name} - {start_date_str}',
-                    image=image_url,
-                ),
+            result = NotificationService.broadcast(
+                title='🎉 New Event Coming Up!',
+                body=f'{event.name} - {start_date_str}',
+                image_url=NotificationService.first_image_url(event),
                 data={
                     'type': 'new_event',
                     'screen': 'event_detail',
@@ -94,68 +446,33 @@ class NotificationService:
                     'city_id': str(event.city.id) if event.city else '',
                     'click_action': 'OPEN_EVENT',
                 },
-                tokens=tokens,
-                apns=messaging.APNSConfig(
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            sound='default',
-                            badge=1,
-                            mutable_content=True,
-                            alert=messaging.ApsAlert(
-                                title='🎉 New Event Coming Up!',
-                                body=f'{event.name} - {start_date_str}',
-                            ),
-                        )
-                    )
-                ),
-                android=messaging.AndroidConfig(
-                    notification=messaging.AndroidNotification(
-                        sound='default',
-                        channel_id='events',
-                        priority='high',
-                    )
-                ),
+                channel_id='events',
+                city_id=event.city_id,
+                interests=content_interests('event', event),
             )
-
-            # Send notification
-            response = messaging.send_multicast(message)
             logger.info(
-                f"Event notification sent: {response.success_count} successful, "
-                f"{response.failure_count} failed for event {event.id}"
+                f"Event notification sent: {result.success_count} successful, "
+                f"{result.failure_count} failed in {result.batches} batches for event {event.id}, "
+                f"{result.pruned_count} dead tokens deactivated"
             )
-            return response
+            return result
 
         except Exception as e:
             logger.error(f"Error sending event notification: {e}", exc_info=True)
-            return None
+            raise
 
     @staticmethod
-    def send_new_location_notification(location) -> Optional[messaging.BatchResponse]:
+    def send_new_location_notification(location) -> Optional[FanoutResult]:
         """Send notification when a new location is added"""
         if not FIREBASE_AVAILABLE:
             logger.warning("Firebase not available, skipping notification")
             return None
 
         try:
-            # Get all active device tokens
-            tokens = NotificationService.get_user_tokens()
-            if not tokens:
-                logger.info("No active FCM devices found, skipping notification")
-                return None
-
-            # Get first image URL if available
-            image_url = None
-            first_image = location.images.first()
-            if first_image and first_image.image:
-                image_url = NotificationService.build_absolute_image_url(first_image.image)
-
-            # Build notification message
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title='📍 New Place to Explore!',
-                    body=f'Check out: {location.name}',
-                    image=image_url,
-                ),
+            result = NotificationService.broadcast(
+                title='📍 New Place to Explore!',
+                body=f'Check out: {location.name}',
+                image_url=NotificationService.first_image_url(location),
                 data={
                     'type': 'new_location',
                     'screen': 'location_detail',
@@ -164,68 +481,33 @@ class NotificationService:
                     'city_id': str(location.city.id) if location.city else '',
                     'click_action': 'OPEN_LOCATION',
                 },
-                tokens=tokens,
-                apns=messaging.APNSConfig(
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            sound='default',
-                            badge=1,
-                            mutable_content=True,
-                            alert=messaging.ApsAlert(
-                                title='📍 New Place to Explore!',
-                                body=f'Check out: {location.name}',
-                            ),
-                        )
-                    )
-                ),
-                android=messaging.AndroidConfig(
-                    notification=messaging.AndroidNotification(
-                        sound='default',
-                        channel_id='locations',
-                        priority='high',
-                    )
-                ),
+                channel_id='locations',
+                city_id=location.city_id,
+                interests=content_interests('location', location),
             )
-
-            # Send notification
-            response = messaging.send_multicast(message)
             logger.info(
-                f"Location notification sent: {response.success_count} successful, "
-                f"{response.failure_count} failed for location {location.id}"
+                f"Location notification sent: {result.success_count} successful, "
+                f"{result.failure_count} failed in {result.batches} batches for location {location.id}, "
+                f"{result.pruned_count} dead tokens deactivated"
             )
-            return response
+            return result
 
         except Exception as e:
             logger.error(f"Error sending location notification: {e}", exc_info=True)
-            return None
+            raise
 
     @staticmethod
-    def send_new_hiking_notification(hiking) -> Optional[messaging.BatchResponse]:
+    def send_new_hiking_notification(hiking) -> Optional[FanoutResult]:
         """Send notification when a new hiking trail is added"""
         if not FIREBASE_AVAILABLE:
             logger.warning("Firebase not available, skipping notification")
             return None
 
         try:
-            # Get all active device tokens
-            tokens = NotificationService.get_user_tokens()
-            if not tokens:
-                logger.info("No active FCM devices found, skipping notification")
-                return None
-
-            # Get first image URL if available
-            image_url = None
-            first_image = hiking.images.first()
-            if first_image and first_image.image:
-                image_url = NotificationService.build_absolute_image_url(first_image.image)
-
-            # Build notification message
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title='🥾 New Hiking Trail!',
-                    body=f'Explore: {hiking.name}',
-                    image=image_url,
-                ),
+            result = NotificationService.broadcast(
+                title='🥾 New Hiking Trail!',
+                body=f'Explore: {hiking.name}',
+                image_url=NotificationService.first_image_url(hiking),
                 data={
                     'type': 'new_hiking',
                     'screen': 'hiking_detail',
@@ -233,37 +515,17 @@ class NotificationService:
                     'city_id': str(hiking.city.id) if hiking.city else '',
                     'click_action': 'OPEN_HIKING',
                 },
-                tokens=tokens,
-                apns=messaging.APNSConfig(
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            sound='default',
-                            badge=1,
-                            mutable_content=True,
-                            alert=messaging.ApsAlert(
-                                title='🥾 New Hiking Trail!',
-                                body=f'Explore: {hiking.name}',
-                            ),
-                        )
-                    )
-                ),
-                android=messaging.AndroidConfig(
-                    notification=messaging.AndroidNotification(
-                        sound='default',
-                        channel_id='hikings',
-                        priority='high',
-                    )
-                ),
+                channel_id='hikings',
+                city_id=hiking.city_id,
+                interests=content_interests('hiking', hiking),
             )
-
-            # Send notification
-            response = messaging.send_multicast(message)
             logger.info(
-                f"Hiking notification sent: {response.success_count} successful, "
-                f"{response.failure_count} failed for hiking {hiking.id}"
+                f"Hiking notification sent: {result.success_count} successful, "
+                f"{result.failure_count} failed in {result.batches} batches for hiking {hiking.id}, "
+                f"{result.pruned_count} dead tokens deactivated"
             )
-            return response
+            return result
 
         except Exception as e:
             logger.error(f"Error sending hiking notification: {e}", exc_info=True)
-            return None
+            raise
@@ -0,0 +1,119 @@
+"""
+Durable outbox for push notifications.
+
+Saving new content only records a ``NotificationOutbox`` row; the
+``send_notifications`` management command claims due rows and sends them
+through ``NotificationService``, so the staff request never waits on the
+device table or Firebase. Failed sends are retried with exponential backoff.
+"""
+
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from guard.models import Event, Hiking, Location, NotificationOutbox
+from guard.notifications import NotificationService
+
+logger = logging.getLogger(__name__)
+
+# A row left in PROCESSING this long belongs to a crashed worker
+STALE_AFTER = datetime.timedelta(minutes=10)
+
+MAX_BACKOFF = datetime.timedelta(hours=1)
+
+# kind -> (content model, NotificationService method)
+HANDLERS = {
+    NotificationOutbox.Kind.LOCATION: (Location, "send_new_location_notification"),
+    NotificationOutbox.Kind.EVENT: (Event, "send_new_event_notification"),
+    NotificationOutbox.Kind.HIKING: (Hiking, "send_new_hiking_notification"),
+}
+
+
+def enqueue(kind, object_id):
+    return NotificationOutbox.objects.create(kind=kind, object_id=object_id)
+
+
+def claim(limit):
+    """Lock up to ``limit`` due rows for this worker and return them."""
+    now = timezone.now()
+    due = Q(status=NotificationOutbox.Status.PENDING, available_at__lte=now) | Q(
+        status=NotificationOutbox.Status.PROCESSING, locked_at__lt=now - STALE_AFTER
+    )
+
+    with transaction.atomic():
+        entries = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("available_at", "id")[:limit]
+        )
+        NotificationOutbox.objects.filter(
+            pk__in=[entry.pk for entry in entries]
+        ).update(
+            status=NotificationOutbox.Status.PROCESSING,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    for entry in entries:
+        entry.attempts += 1
+    return entries
+
+
+def _send(entry):
+    model, method = HANDLERS[entry.kind]
+    instance = model.objects.filter(pk=entry.object_id).first()
+    if instance is None:
+        logger.info(f"{entry} skipped: content no longer exists")
+        return None
+    return getattr(NotificationService, method)(instance)
+
+
+def deliver(entry):
+    """Send one claimed row and record the outcome."""
+    try:
+        result = _send(entry)
+    except Exception as e:
+        logger.error(f"Error delivering {entry}: {e}", exc_info=True)
+        max_attempts = getattr(settings, "NOTIFICATION_MAX_ATTEMPTS", 5)
+        if entry.attempts >= max_attempts:
+            entry.status = NotificationOutbox.Status.FAILED
+        else:
+            entry.status = NotificationOutbox.Status.PENDING
+            backoff = datetime.timedelta(minutes=2 ** (entry.attempts - 1))
+            entry.available_at = timezone.now() + min(backoff, MAX_BACKOFF)
+        entry.last_error = str(e)
+        entry.save(
+            update_fields=["status", "available_at", "last_error", "updated_at"]
+        )
+        return False
+
+    entry.status = NotificationOutbox.Status.SENT
+    entry.sent_at = timezone.now()
+    entry.last_error = ""
+    if result is not None:
+        entry.success_count = result.success_count
+        entry.failure_count = result.failure_count
+        entry.pruned_count = result.pruned_count
+    entry.save(
+        update_fields=[
+            "status",
+            "sent_at",
+            "last_error",
+            "success_count",
+            "failure_count",
+            "pruned_count",
+            "updated_at",
+        ]
+    )
+    return True
+
+
+def process(limit=50):
+    """Claim and deliver one batch; return the number of rows handled."""
+    entries = claim(limit)
+    for entry in entries:
+        deliver(entry)
+    return len(entries)
@@ -0,0 +1,171 @@
+"""
+Notification segments: which devices should hear about a piece of content.
+
+A device is targeted when it follows the content's city (or no city) and
+its user has no interests or at least one interest matching the content.
+Content matches the interest named after its kind ("locations", "events",
+"hikings") and the slug of its category's English name.
+
+In topic delivery mode the same rules are expressed with FCM topics: each
+device subscribes to ``city-<id>`` (or ``all-cities``) and to
+``interest-<slug>`` per interest (or ``all-interests``), and content is
+published to a condition over those topics.
+"""
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils.text import slugify
+
+from guard.models import DeviceInterest, DeviceSegment
+from shared.models import UserPreference
+
+KIND_INTERESTS = {
+    "location": "locations",
+    "event": "events",
+    "hiking": "hikings",
+}
+
+
+def normalize_interests(interests):
+    slugs = {slugify(str(interest))[:50] for interest in interests or []}
+    slugs.discard("")
+    return slugs
+
+
+def _set_interests(segment, interests):
+    DeviceInterest.objects.filter(segment=segment).exclude(
+        interest__in=interests
+    ).delete()
+    DeviceInterest.objects.bulk_create(
+        [DeviceInterest(segment=segment, interest=interest) for interest in interests],
+        ignore_conflicts=True,
+    )
+
+
+@transaction.atomic
+def update_segment(device, user_uid=None, city_id=None):
+    """
+    Attach ``device`` to an app user and a followed city.
+
+    The user may not have synced their preferences yet; the segment keeps
+    ``user_uid`` and is linked when the preference is created.
+    """
+    preference = (
+        UserPreference.objects.filter(user_uid=user_uid).first() if user_uid else None
+    )
+    segment, _ = DeviceSegment.objects.update_or_create(
+        device=device,
+        defaults={
+            "user_uid": user_uid,
+            "preference": preference,
+            "city_id": city_id,
+            "topics_dirty": True,
+        },
+    )
+    _set_interests(
+        segment, normalize_interests(preference.interests if preference else None)
+    )
+    return segment
+
+
+@transaction.atomic
+def refresh_interests(preference):
+    """
+    Copy a user's interests to every device segment linked to them, linking
+    devices registered before the preference existed.
+    """
+    DeviceSegment.objects.filter(
+        user_uid=preference.user_uid, preference__isnull=True
+    ).update(preference=preference)
+
+    interests = normalize_interests(preference.interests)
+    segments = DeviceSegment.objects.filter(preference=preference)
+    for segment in segments:
+        _set_interests(segment, interests)
+    segments.update(topics_dirty=True)
+
+
+@transaction.atomic
+def forget_user(preference):
+    """
+    Stop targeting a user's devices by their interests. Called before the
+    preference is deleted, while the segments still point at it.
+    """
+    segments = DeviceSegment.objects.filter(
+        Q(preference=preference) | Q(user_uid=preference.user_uid)
+    )
+    DeviceInterest.objects.filter(segment__in=segments).delete()
+    segments.update(preference=None, user_uid=None, topics_dirty=True)
+
+
+def content_interests(kind, instance):
+    interests = {KIND_INTERESTS[kind]}
+    category = getattr(instance, "category", None)
+    if category is not None:
+        name = getattr(category, "name_en", None) or category.name
+        interests |= normalize_interests([name])
+    return interests
+
+
+def target_devices(devices, city_id=None, interests=()):
+    """
+    Narrow a queryset of FCM devices to the segment matching some content.
+
+    Devices registered without a segment keep receiving every notification.
+    """
+    if city_id is not None:
+        devices = devices.filter(
+            Q(segment__isnull=True)
+            | Q(segment__city__isnull=True)
+            | Q(segment__city_id=city_id)
+        )
+    if interests:
+        any_interest = DeviceInterest.objects.filter(segment=OuterRef("segment"))
+        devices = devices.filter(
+            Q(segment__isnull=True)
+            | ~Exists(any_interest)
+            | Exists(any_interest.filter(interest__in=interests))
+        )
+    return devices
+
+
+ALL_CITIES_TOPIC = "all-cities"
+ALL_INTERESTS_TOPIC = "all-interests"
+
+
+def city_topic(city_id):
+    return f"city-{city_id}"
+
+
+def interest_topic(interest):
+    return f"interest-{interest}"
+
+
+def segment_topics(segment):
+    """FCM topics a device must be subscribed to for its segment."""
+    topics = {city_topic(segment.city_id) if segment.city_id else ALL_CITIES_TOPIC}
+    interests = [row.interest for row in segment.interests.all()]
+    if interests:
+        topics.update(interest_topic(interest) for interest in interests)
+    else:
+        topics.add(ALL_INTERESTS_TOPIC)
+    return topics
+
+
+def topic_condition(interests, city_id=None):
+    """
+    FCM condition reaching the same devices as ``target_devices``.
+
+    FCM allows at most five topics per condition: two for the city, and
+    three for a kind and a category interest.
+    """
+    clauses = [
+        [ALL_INTERESTS_TOPIC]
+        + [interest_topic(interest) for interest in sorted(interests)]
+    ]
+    if city_id is not None:
+        clauses.append([ALL_CITIES_TOPIC, city_topic(city_id)])
+    return " && ".join(
+        "(" + " || ".join(f"'{topic}' in topics" for topic in topics) + ")"
+        for topics in clauses
+    )
@@ -1,5 +1,5 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete
 from cities_light.signals import city_items_pre_import
 import logging
 
@@ -61,41 +61,48 @@ def filter_cities(sender, items, **kwargs):
         raise InvalidItems()
 
 
-# Import models and notification service at the end to avoid circular imports
+# Import models and the outbox at the end to avoid circular imports
 def register_notification_signals():
-    """Register signals for sending push notifications"""
-    from guard.models import Location, Event, Hiking
-    from guard.notifications import NotificationService
+    """Queue push notifications for new content.
+
+    The outbox row is written in the saving transaction, so the
+    ``send_notifications`` worker only picks it up once the content and its
+    images are committed.
+    """
+    from guard.models import Location, Event, Hiking, NotificationOutbox
+    from guard import outbox, segments
+    from shared.models import UserPreference
 
     @receiver(post_save, sender=Location)
     def location_created(sender, instance, created, **kwargs):
-        """Send notification when a new location is created"""
+        """Queue a notification when a new location is created"""
         if created:
-            try:
-                logger.info(f"Sending notification for new location: {instance.id}")
-                NotificationService.send_new_location_notification(instance)
-            except Exception as e:
-                logger.error(f"Error in location_created signal: {e}", exc_info=True)
+            logger.info(f"Queueing notification for new location: {instance.id}")
+            outbox.enqueue(NotificationOutbox.Kind.LOCATION, instance.id)
 
     @receiver(post_save, sender=Event)
     def event_created(sender, instance, created, **kwargs):
-        """Send notification when a new event is created"""
+        """Queue a notification when a new event is created"""
         if created:
-            try:
-                logger.info(f"Sending notification for new event: {instance.id}")
-                NotificationService.send_new_event_notification(instance)
-            except Exception as e:
-                logger.error(f"Error in event_created signal: {e}", exc_info=True)
+            logger.info(f"Queueing notification for new event: {instance.id}")
+            outbox.enqueue(NotificationOutbox.Kind.EVENT, instance.id)
 
     @receiver(post_save, sender=Hiking)
     def hiking_created(sender, instance, created, **kwargs):
-        """Send notification when a new hiking trail is created"""
+        """Queue a notification when a new hiking trail is created"""
         if created:
-            try:
-                logger.info(f"Sending notification for new hiking: {instance.id}")
-                NotificationService.send_new_hiking_notification(instance)
-            except Exception as e:
-                logger.error(f"Error in hiking_created signal: {e}", exc_info=True)
+            logger.info(f"Queueing notification for new hiking: {instance.id}")
+            outbox.enqueue(NotificationOutbox.Kind.HIKING, instance.id)
+
+    @receiver(post_save, sender=UserPreference)
+    def preference_saved(sender, instance, created, **kwargs):
+        """Link the user's devices and keep their interests in sync"""
+        segments.refresh_interests(instance)
+
+    @receiver(pre_delete, sender=UserPreference)
+    def preference_deleted(sender, instance, **kwargs):
+        """Forget the interests of the user's devices"""
+        segments.forget_user(instance)
 
 
 # Register notification signals
@@ -1,3 +1,598 @@
-from django.test import TestCase
+import datetime
+import uuid
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from cities_light.models import City, Country
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from fcm_django.models import FCMDevice
+from firebase_admin import exceptions, messaging
+
+from api.models import ContentVersion
+from shared import link_stats
+from shared.models import LinkDailyClicks, LinkStatistics, UserPreference
+from shared.short_io import ShortIOService
+
+from . import outbox
+from .models import (
+    Ad,
+    DeviceSegment,
+    Event,
+    EventCategory,
+    Location,
+    LocationCategory,
+    NotificationOutbox,
+)
+from .notifications import (
+    MAX_MULTICAST_TOKENS,
+    MAX_TOPIC_TOKENS,
+    FanoutResult,
+    NotificationService,
+    batched,
+    dead_tokens,
+)
+from .segments import (
+    ALL_CITIES_TOPIC,
+    ALL_INTERESTS_TOPIC,
+    content_interests,
+    target_devices,
+    topic_condition,
+    update_segment,
+)
+
+
+def batch_response(errors):
+    """A multicast response with one entry per error (None for success)."""
+    return SimpleNamespace(
+        responses=[SimpleNamespace(exception=error) for error in errors],
+        success_count=sum(error is None for error in errors),
+        failure_count=sum(error is not None for error in errors),
+    )
+
+
+class BatchedTests(SimpleTestCase):
+    def test_splits_into_bounded_batches(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched(iter(()), 2)), [])
+
+
+class FanoutResultTests(SimpleTestCase):
+    def test_add_counts_responses_and_failed_batches(self):
+        result = FanoutResult()
+        result.add(["a", "b"], batch_response([None, messaging.UnregisteredError("x")]))
+        result.add(["c", "d", "e"], None)
+        self.assertEqual(result.batches, 2)
+        self.assertEqual(result.success_count, 1)
+        self.assertEqual(result.failure_count, 4)
+        self.assertEqual(result.failed_batches, 1)
+
+
+class DeadTokensTests(SimpleTestCase):
+    def test_message_fault_keeps_a_single_token(self):
+        response = batch_response(
+            [exceptions.InvalidArgumentError("Invalid notification image URL")]
+        )
+        self.assertEqual(dead_tokens(["a"], response), [])
+
+    def test_token_named_invalid_argument_is_pruned(self):
+        response = batch_response(
+            [
+                exceptions.InvalidArgumentError(
+                    "The registration token is not a valid FCM registration token"
+                )
+            ]
+        )
+        self.assertEqual(dead_tokens(["a"], response), ["a"])
+
+    def test_mixed_batch(self):
+        tokens = ["ok", "unregistered", "mismatch", "bad-token", "message-fault"]
+        response = batch_response(
+            [
+                None,
+                messaging.UnregisteredError("gone"),
+                messaging.SenderIdMismatchError("other sender"),
+                exceptions.InvalidArgumentError("Invalid registration token"),
+                exceptions.InvalidArgumentError("Message payload too big"),
+            ]
+        )
+        self.assertEqual(
+            dead_tokens(tokens, response), ["unregistered", "mismatch", "bad-token"]
+        )
+
+
+class FanOutTests(SimpleTestCase):
+    def test_sends_every_batch_and_prunes_dead_tokens(self):
+        class Transport:
+            def __init__(self):
+                self.batches = []
+
+            def send_multicast(self, tokens):
+                self.batches.append(tokens)
+                return batch_response(
+                    [
+                        messaging.UnregisteredError("gone")
+                        if token.startswith("dead")
+                        else None
+                        for token in tokens
+                    ]
+                )
+
+        transport = Transport()
+        tokens = [f"token-{i}" for i in range(1200)] + ["dead-1", "dead-2"]
+        with mock.patch(
+            "guard.notifications.get_transport", return_value=transport
+        ), mock.patch.object(
+            NotificationService, "deactivate_tokens", side_effect=len
+        ) as deactivate:
+            result = NotificationService.fan_out(iter(tokens), lambda batch: batch)
+
+        self.assertEqual(result.batches, 3)
+        self.assertTrue(
+            all(len(batch) <= MAX_MULTICAST_TOKENS for batch in transport.batches)
+        )
+        self.assertEqual(
+            sorted(token for batch in transport.batches for token in batch),
+            sorted(tokens),
+        )
+        self.assertEqual(result.success_count, 1200)
+        self.assertEqual(result.failure_count, 2)
+        self.assertEqual(result.pruned_count, 2)
+        deactivate.assert_called_once_with(["dead-1", "dead-2"])
+
+    def test_failed_batches_are_counted(self):
+        transport = mock.Mock()
+        transport.send_multicast.side_effect = RuntimeError("FCM unavailable")
+        with mock.patch("guard.notifications.get_transport", return_value=transport):
+            result = NotificationService.fan_out(iter(["a", "b"]), lambda batch: batch)
+        self.assertEqual(result.batches, 1)
+        self.assertEqual(result.failed_batches, 1)
+        self.assertEqual(result.failure_count, 2)
+
+
+class OutboxTests(TestCase):
+    def create_location(self):
+        return Location.objects.create(
+            name="Ribat", latitude=Decimal("35.8"), longitude=Decimal("10.6"), story=""
+        )
+
+    def test_rolled_back_content_leaves_no_row(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.create_location()
+            raise RuntimeError("form invalid")
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def failing_send(self):
+        return mock.patch.object(
+            NotificationService,
+            "send_new_location_notification",
+            side_effect=RuntimeError("FCM unavailable"),
+        )
+
+    def at(self, moment):
+        return mock.patch("guard.outbox.timezone.now", return_value=moment)
+
+    def test_failed_delivery_backs_off(self):
+        location = self.create_location()
+        now = timezone.now()
+        with self.at(now), self.failing_send():
+            (entry,) = outbox.claim(10)
+            self.assertFalse(outbox.deliver(entry))
+            entry.refresh_from_db()
+            self.assertEqual(entry.object_id, location.pk)
+            self.assertEqual(entry.status, NotificationOutbox.Status.PENDING)
+            self.assertEqual(entry.available_at, now + datetime.timedelta(minutes=1))
+            self.assertEqual(entry.last_error, "FCM unavailable")
+            # Not due again until the backoff has passed
+            self.assertEqual(outbox.claim(10), [])
+
+        later = entry.available_at
+        with self.at(later), self.failing_send():
+            (entry,) = outbox.claim(10)
+            outbox.deliver(entry)
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(entry.available_at, later + datetime.timedelta(minutes=2))
+
+    def test_delivered_row_is_not_claimed_again(self):
+        self.create_location()
+        with mock.patch.object(
+            NotificationService,
+            "send_new_location_notification",
+            return_value=FanoutResult(batches=1, success_count=3, pruned_count=1),
+        ):
+            (entry,) = outbox.claim(10)
+            self.assertTrue(outbox.deliver(entry))
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, NotificationOutbox.Status.SENT)
+        self.assertEqual(entry.success_count, 3)
+        self.assertEqual(entry.pruned_count, 1)
+        with self.at(timezone.now() + outbox.STALE_AFTER * 2):
+            self.assertEqual(outbox.claim(10), [])
+
+    @override_settings(NOTIFICATION_TRANSPORT="stub")
+    def test_send_notifications_command_drains_due_rows(self):
+        self.create_location()
+        call_command("send_notifications", "--once", stdout=StringIO())
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.status, NotificationOutbox.Status.SENT)
+        self.assertEqual(entry.attempts, 1)
+
+
+class SegmentTests(TestCase):
+    def setUp(self):
+        country = Country.objects.create(name="Tunisia")
+        self.sousse = City.objects.create(name="Sousse", country=country)
+        self.tunis = City.objects.create(name="Tunis", country=country)
+
+    def device(self, name, city=None, interests=None):
+        device = FCMDevice.objects.create(registration_id=name, type="android")
+        if interests is not None:
+            preference = UserPreference.objects.create(
+                first_visit=False, traveling_with="solo", interests=interests
+            )
+            update_segment(device, preference.user_uid, city.pk if city else None)
+        return device
+
+    def test_targets_city_and_interests(self):
+        expected = {
+            self.device("sousse-events", self.sousse, ["Events"]),
+            self.device("sousse-museums", self.sousse, ["Museum", "Hikings"]),
+            self.device("any-city-no-interests", None, []),
+            # Registered without a segment: still gets everything
+            self.device("legacy"),
+        }
+        self.device("tunis-events", self.tunis, ["Events"])
+        self.device("sousse-hikings", self.sousse, ["Hikings"])
+
+        devices = target_devices(
+            FCMDevice.objects.all(), self.sousse.pk, {"events", "museum"}
+        )
+        self.assertEqual(set(devices), expected)
+
+    def test_device_registered_before_preference_sync_is_linked(self):
+        user_uid = uuid.uuid4()
+        device = self.device("early")
+        segment = update_segment(device, user_uid, self.sousse.pk)
+        self.assertIsNone(segment.preference)
+
+        preference = UserPreference.objects.create(
+            user_uid=user_uid,
+            first_visit=True,
+            traveling_with="solo",
+            interests=["Events"],
+        )
+        segment.refresh_from_db()
+        self.assertEqual(segment.preference, preference)
+        self.assertEqual(
+            {row.interest for row in segment.interests.all()}, {"events"}
+        )
+        self.assertEqual(
+            list(target_devices(FCMDevice.objects.all(), self.sousse.pk, {"hikings"})),
+            [],
+        )
+
+    def test_forget_user_unlinks_devices(self):
+        device = self.device("forgotten", self.sousse, ["Events"])
+        device.segment.preference.delete()
+
+        segment = device.segment
+        segment.refresh_from_db()
+        self.assertIsNone(segment.preference)
+        self.assertIsNone(segment.user_uid)
+        self.assertFalse(segment.interests.exists())
+        self.assertTrue(segment.topics_dirty)
+
+    def test_topic_condition_stays_within_five_topics(self):
+        category = LocationCategory.objects.create(name="Museum")
+        location = Location(name="Ribat", category=category)
+        condition = topic_condition(
+            content_interests("location", location), self.sousse.pk
+        )
+        self.assertEqual(condition.count(" in topics"), 5)
+        self.assertIn("'interest-museum' in topics", condition)
+        self.assertIn(f"'city-{self.sousse.pk}' in topics", condition)
+
+
+class FakeShortIO:
+    """Stands in for ShortIOService; ``clicks`` maps short ids to totals."""
+
+    max_concurrency = 2
+
+    def __init__(self, clicks):
+        self.clicks = clicks
+        self.calls = []
+
+    def get_link_statistics(self, short_id, period):
+        self.calls.append((short_id, period))
+        if short_id not in self.clicks:
+            return None
+        clicks = self.clicks[short_id]
+        return {
+            "totalClicks": clicks + 1,
+            "humanClicks": clicks,
+            "clickStatistics": {
+                "datasets": [
+                    {"data": [{"x": "2026-10-01T00:00:00Z", "y": str(clicks)}]}
+                ]
+            },
+        }
+
+
+class LinkStatsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("client", password="secret")
+        self.profile = user.profile
+        self.client.force_login(user)
+        self.ad = Ad.objects.create(
+            client=self.profile, link="https://example.com/ad", short_id="ad1"
+        )
+        self.event = Event.objects.create(
+            client=self.profile,
+            category=EventCategory.objects.create(name="Music"),
+            name="Concert",
+            startDate=datetime.date(2026, 10, 1),
+            endDate=datetime.date(2026, 10, 2),
+            time=datetime.time(20),
+            price=Decimal("10"),
+            link="https://example.com/event",
+            short_id="ev1",
+        )
+
+    def sync(self, clicks):
+        service = FakeShortIO(clicks)
+        with mock.patch.object(link_stats, "ShortIOService", return_value=service):
+            call_command("sync_link_stats", stdout=StringIO())
+        return service
+
+    def test_sync_stores_snapshots_and_daily_clicks(self):
+        service = self.sync({"ad1": 7, "ev1": 3})
+
+        self.assertEqual(len(service.calls), 2 * len(link_stats.PERIODS))
+        total = LinkStatistics.objects.get(short_id="ad1", period="total")
+        self.assertEqual((total.total_clicks, total.human_clicks), (8, 7))
+        self.assertEqual(
+            set(LinkStatistics.objects.values_list("period", flat=True)),
+            set(link_stats.PERIODS),
+        )
+        self.assertEqual(
+            set(LinkDailyClicks.objects.values_list("short_id", "date", "clicks")),
+            {
+                ("ad1", datetime.date(2026, 10, 1), 7),
+                ("ev1", datetime.date(2026, 10, 1), 3),
+            },
+        )
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.clicks, 7)
+
+    def test_rerun_updates_rows_in_place(self):
+        self.sync({"ad1": 7, "ev1": 3})
+        self.sync({"ad1": 9, "ev1": 3})
+        self.sync({"ad1": 9, "ev1": 3})
+
+        self.assertEqual(LinkStatistics.objects.count(), 2 * len(link_stats.PERIODS))
+        self.assertEqual(LinkDailyClicks.objects.count(), 2)
+        self.assertEqual(
+            LinkStatistics.objects.get(short_id="ad1", period="month").human_clicks,
+            9,
+        )
+        self.assertEqual(LinkDailyClicks.objects.get(short_id="ad1").clicks, 9)
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.clicks, 9)
+
+    def test_failed_fetch_keeps_the_previous_snapshot(self):
+        self.sync({"ad1": 7, "ev1": 3})
+        self.sync({"ev1": 4})
+
+        total = LinkStatistics.objects.get(short_id="ad1", period="total")
+        self.assertEqual(total.human_clicks, 7)
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.clicks, 7)
+
+    def test_pages_read_the_local_store(self):
+        self.sync({"ad1": 7, "ev1": 3})
+        with mock.patch.object(ShortIOService, "get_link_statistics") as fetch:
+            for url in (
+                reverse("guard:adsList"),
+                reverse("guard:ad_track", args=[self.ad.pk]) + "?period=total",
+                reverse("guard:event_track", args=[self.event.pk]) + "?period=total",
+            ):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+        fetch.assert_not_called()
+        self.assertEqual(response.context["stats"]["humanClicks"], 3)
+
+
+class TranslateMissingTests(TestCase):
+    def setUp(self):
+        self.untranslated = Location.objects.create(
+            name_en="Ribat",
+            name_fr="",
+            story_en="<p>A <b>fort</b></p>",
+            story_fr="",
+            latitude=Decimal("35.8"),
+            longitude=Decimal("10.6"),
+        )
+        self.translated = Location.objects.create(
+            name_en="Medina",
+            name_fr="Médina",
+            story_en="<p>Old town</p>",
+            story_fr="<p>Vieille ville</p>",
+            latitude=Decimal("35.8"),
+            longitude=Decimal("10.6"),
+        )
+        self.translator = mock.Mock()
+        self.translator.translate.side_effect = (
+            lambda text, source, target, preserve_html: f"[{target}] {text}"
+        )
+        patcher = mock.patch(
+            "guard.management.commands.translate_missing.get_translator",
+            return_value=self.translator,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def translate(self, *args):
+        out = StringIO()
+        call_command(
+            "translate_missing", "--model", "guard.Location", *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_dry_run_writes_nothing(self):
+        with mock.patch("api.signals.response_cache.invalidate") as invalidate:
+            output = self.translate("--dry-run")
+        self.assertIn("2 value(s) would be translated", output)
+        self.translator.translate.assert_not_called()
+        invalidate.assert_not_called()
+        self.untranslated.refresh_from_db()
+        self.assertEqual(self.untranslated.name_fr, "")
+        self.assertEqual(self.untranslated.story_fr, "")
+
+    def test_fills_only_empty_fields(self):
+        self.translate("--batch-size", "1")
+
+        self.untranslated.refresh_from_db()
+        self.assertEqual(self.untranslated.name_fr, "[fr] Ribat")
+        self.assertEqual(self.untranslated.story_fr, "[fr] <p>A <b>fort</b></p>")
+        self.translated.refresh_from_db()
+        self.assertEqual(self.translated.name_fr, "Médina")
+        self.assertEqual(self.translated.story_fr, "<p>Vieille ville</p>")
+        self.translator.translate.assert_any_call(
+            "<p>A <b>fort</b></p>", "en", "fr", True
+        )
+        self.translator.translate.assert_any_call("Ribat", "en", "fr", False)
+        self.assertEqual(self.translator.translate.call_count, 2)
+
+        # Everything is filled: a second run has nothing to do
+        self.assertIn("Translated 0 value(s)", self.translate())
+        self.assertEqual(self.translator.translate.call_count, 2)
+
+    def test_writes_invalidate_cached_responses(self):
+        version = ContentVersion.current()
+        with mock.patch("api.signals.response_cache.invalidate") as invalidate:
+            self.translate()
+        invalidate.assert_called_once_with()
+        self.assertEqual(ContentVersion.current(), version + 1)
+
+        with mock.patch("api.signals.response_cache.invalidate") as invalidate:
+            self.translate()
+        invalidate.assert_not_called()
+
+    def test_failed_translation_is_left_empty(self):
+        self.translator.translate.side_effect = (
+            lambda text, source, target, preserve_html: None if preserve_html else text
+        )
+        self.assertIn("1 failed", self.translate())
+        self.untranslated.refresh_from_db()
+        self.assertEqual(self.untranslated.name_fr, "Ribat")
+        self.assertEqual(self.untranslated.story_fr, "")
+
+
+class TopicDeliveryTests(TestCase):
+    def setUp(self):
+        self.transport = mock.Mock()
+        self.transport.subscribe.return_value = messaging.TopicManagementResponse(
+            {"results": []}
+        )
+        patcher = mock.patch(
+            "guard.notifications.get_transport", return_value=self.transport
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def devices(self, count):
+        devices = FCMDevice.objects.bulk_create(
+            FCMDevice(registration_id=f"token-{i}", type="android")
+            for i in range(count)
+        )
+        DeviceSegment.objects.bulk_create(
+            DeviceSegment(device=device) for device in devices
+        )
+        return devices
+
+    def subscriptions(self, topic):
+        return [
+            call.args[0]
+            for call in self.transport.subscribe.call_args_list
+            if call.args[1] == topic
+        ]
+
+    @override_settings(NOTIFICATION_DELIVERY="topics")
+    def test_broadcast_publishes_to_the_topic_condition(self):
+        self.devices(3)
+        with self.assertNumQueries(0):
+            result = NotificationService.broadcast(
+                "New", "Body", None, {}, "events", city_id=7, interests={"events"}
+            )
+
+        self.transport.send_multicast.assert_not_called()
+        (call,) = self.transport.send.call_args_list
+        message = call.args[0]
+        self.assertEqual(message.condition, topic_condition({"events"}, 7))
+        self.assertIsNone(message.token)
+        self.assertEqual(message.notification.title, "New")
+        self.assertEqual(result.batches, 1)
+
+    def test_subscriptions_are_batched_per_topic(self):
+        self.devices(MAX_TOPIC_TOKENS * 2 + 500)
+
+        out = StringIO()
+        call_command("sync_notification_topics", stdout=out)
+        self.assertIn(f"Synced {MAX_TOPIC_TOKENS * 2 + 500} device(s)", out.getvalue())
+
+        for topic in (ALL_CITIES_TOPIC, ALL_INTERESTS_TOPIC):
+            batches = self.subscriptions(topic)
+            self.assertEqual(
+                [len(batch) for batch in batches], [MAX_TOPIC_TOKENS] * 2 + [500]
+            )
+            self.assertEqual(len(set().union(*batches)), MAX_TOPIC_TOKENS * 2 + 500)
+        self.transport.unsubscribe.assert_not_called()
+        self.assertFalse(DeviceSegment.objects.filter(topics_dirty=True).exists())
+
+    def test_per_token_errors(self):
+        self.devices(4)
+        errors = {"token-1": "NOT_FOUND", "token-2": "INTERNAL"}
+        self.transport.subscribe.side_effect = (
+            lambda tokens, topic: messaging.TopicManagementResponse(
+                {
+                    "results": [
+                        {"error": errors[token]} if token in errors else {}
+                        for token in tokens
+                    ]
+                }
+            )
+        )
+
+        with self.assertLogs("guard.notifications", "WARNING"):
+            call_command("sync_notification_topics", stdout=StringIO())
+
+        # Dead tokens are deactivated; transient failures are retried later
+        inactive = FCMDevice.objects.filter(active=False)
+        self.assertEqual(
+            set(inactive.values_list("registration_id", flat=True)), {"token-1"}
+        )
+        retried = DeviceSegment.objects.get(device__registration_id="token-2")
+        self.assertTrue(retried.topics_dirty)
+        self.assertEqual(retried.topics, [])
+        synced = DeviceSegment.objects.get(device__registration_id="token-0")
+        self.assertFalse(synced.topics_dirty)
+        self.assertEqual(set(synced.topics), {ALL_CITIES_TOPIC, ALL_INTERESTS_TOPIC})
+
+    def test_failed_call_leaves_segments_dirty(self):
+        self.devices(2)
+        self.transport.subscribe.side_effect = exceptions.UnavailableError(
+            "FCM unavailable"
+        )
+
+        with self.assertLogs("guard.notifications", "ERROR"):
+            self.assertEqual(NotificationService.sync_topic_subscriptions(), 0)
+        self.assertEqual(DeviceSegment.objects.filter(topics_dirty=True).count(), 2)
+        self.assertFalse(FCMDevice.objects.filter(active=False).exists())
@@ -18,7 +18,7 @@ from django.urls import reverse_lazy
 # from django.contrib import messages
 from django.utils.translation import gettext as _
 from django.http import JsonResponse
-from django.core.cache import cache
+from django.db import transaction
 
 
 from .forms import (
@@ -54,6 +54,8 @@ from .models import (
 )
 
 # from shared.translator import get_translator
+from shared import link_stats
+from shared.cache import get_or_refresh
 from shared.short_io import ShortIOService
 
 
@@ -62,15 +64,11 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        service = ShortIOService()
+        profile = self.request.user.profile
 
-        # Try to get stats from cache
-        cache_key = "dashboard_analytics_stats"
-        stats = cache.get(cache_key)
-
-        if not stats:
+        def aggregate_stats():
+            service = ShortIOService()
             # Fetch active Ads and Events with short_id, filtered by user profile
-            profile = self.request.user.profile
             ad_ids = list(
                 Ad.objects.filter(
                     client=profile, is_active=True, short_id__isnull=False
@@ -84,17 +82,17 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
             # Aggregate stats for the last 7 days (week)
             period = "week"
-            ads_stats = service.get_aggregated_link_statistics(ad_ids, period)
-            events_stats = service.get_aggregated_link_statistics(event_ids, period)
-
-            stats = {
-                "ads": ads_stats,
-                "events": events_stats,
+            return {
+                "ads": service.get_aggregated_link_statistics(ad_ids, period),
+                "events": service.get_aggregated_link_statistics(event_ids, period),
             }
-            # Cache for 15 minutes - include user ID in cache key for isolation
-            cache.set(f"{cache_key}_{self.request.user.id}", stats, 60 * 15)
 
-        context["stats"] = stats
+        # Served from cache per user; refreshed in the background after 15 minutes
+        context["stats"] = get_or_refresh(
+            f"dashboard_analytics_stats:{self.request.user.id}",
+            aggregate_stats,
+            ttl=60 * 15,
+        )
         return context
 
 
@@ -149,9 +147,12 @@ class LocationCreateView(
                 form.add_error(None, _("Please upload at least one image."))
                 return self.form_invalid(form)
 
-            self.object = form.save()
-            image_formset.instance = self.object
-            image_formset.save()
+            # Commit the location with its images so the queued notification
+            # never sees it without them
+            with transaction.atomic():
+                self.object = form.save()
+                image_formset.instance = self.object
+                image_formset.save()
             return super().form_valid(form)
         else:
             return self.form_invalid(form)
@@ -481,9 +482,10 @@ class EventCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
 
                 logging.getLogger(__name__).error(f"Short.io error: {e}")
 
-            self.object.save()
-            image_formset.instance = self.object
-            image_formset.save()
+            with transaction.atomic():
+                self.object.save()
+                image_formset.instance = self.object
+                image_formset.save()
             messages.success(self.request, self.success_message)
             return HttpResponseRedirect(self.get_success_url())
         else:
@@ -599,9 +601,8 @@ class EventTrackingView(LoginRequiredMixin, DetailView):
         context["period"] = period
         context["page_title"] = self.object.name
 
-        if self.object.short_id:
-            service = ShortIOService()
-            context["stats"] = service.get_link_statistics(self.object.short_id, period)
+        # Stored by the sync_link_stats command
+        context["stats"] = link_stats.get_statistics(self.object.short_id, period)
 
         return context
 
@@ -732,11 +733,12 @@ class HikingCreateView(
                 form.add_error(None, _("Please upload at least one image."))
                 return self.form_invalid(form)
 
-            self.object = form.save()
-            image_formset.instance = self.object
-            image_formset.save()
-            location_formset.instance = self.object
-            location_formset.save()
+            with transaction.atomic():
+                self.object = form.save()
+                image_formset.instance = self.object
+                image_formset.save()
+                location_formset.instance = self.object
+                location_formset.save()
             return super().form_valid(form)
         else:
             return self.form_invalid(form)
@@ -836,23 +838,10 @@ class AdListView(LoginRequiredMixin, ListView):
     # paginate_by = 10
     ordering = ["-created_at"]
 
+    # Ad.clicks is refreshed by the sync_link_stats command
     def get_queryset(self):
         return super().get_queryset().filter(client=self.request.user.profile)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        service = ShortIOService()
-        for ad in context["ads"]:
-            if ad.short_id:
-                try:
-                    clicks = service.get_clicks(ad.short_id)
-                    if clicks != ad.clicks:
-                        ad.clicks = clicks
-                        ad.save(update_fields=["clicks"])
-                except Exception:
-                    pass  # Ignore errors during stats fetch
-        return context
-
 
 class AdCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
     model = Ad
@@ -950,9 +939,8 @@ class AdTrackingView(LoginRequiredMixin, DetailView):
         context["period"] = period
         context["page_title"] = self.object.link
 
-        if self.object.short_id:
-            service = ShortIOService()
-            context["stats"] = service.get_link_statistics(self.object.short_id, period)
+        # Stored by the sync_link_stats command
+        context["stats"] = link_stats.get_statistics(self.object.short_id, period)
 
         return context
 
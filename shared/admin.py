@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from modeltranslation.admin import TranslationAdmin
-from .models import Page, UserProfile, UserPreference
+from .models import ImageBlob, Page, TranslationMemory, UserProfile, UserPreference
 
 
 @admin.register(Page)
@@ -48,3 +48,33 @@ class UserPreferenceAdmin(admin.ModelAdmin):
     )
     list_filter = ("first_visit", "traveling_with")
     search_fields = ("user_uid", "traveling_with")
+
+
+@admin.register(TranslationMemory)
+class TranslationMemoryAdmin(admin.ModelAdmin):
+    list_display = (
+        "source_text",
+        "source_lang",
+        "target_lang",
+        "preserve_html",
+        "model",
+        "created_at",
+    )
+    list_filter = ("source_lang", "target_lang", "preserve_html", "model")
+    search_fields = ("source_text", "translated_text")
+    readonly_fields = ("key", "created_at")
+
+
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = ("digest", "refcount", "image", "created_at")
+    search_fields = ("digest", "image")
+    readonly_fields = (
+        "digest",
+        "refcount",
+        "image",
+        "image_mobile",
+        "variants",
+        "metadata",
+        "created_at",
+    )
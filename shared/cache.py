@@ -0,0 +1,91 @@
+"""
+Stale-while-revalidate caching on top of Django's cache.
+
+A value older than its TTL is still returned at once while one background
+thread recomputes it. A lock kept in the cache makes sure only one refresh
+per key runs at a time, across requests and worker processes.
+"""
+
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+# How long a value is kept after it went stale
+STALE_TIMEOUT = 60 * 60 * 24
+
+# Upper bound for one refresh; the lock expires after it even if the
+# refreshing process died
+LOCK_TIMEOUT = 60
+
+# How long a request without any cached value waits for another request
+# that is already computing it
+WAIT_TIMEOUT = 10
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def _store(key, value):
+    cache.set(key, {"value": value, "refreshed_at": time.time()}, STALE_TIMEOUT)
+
+
+def _refresh(key, compute):
+    try:
+        _store(key, compute())
+    except Exception as e:
+        logger.error(f"Error refreshing cached value {key}: {e}", exc_info=True)
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def _refresh_in_background(key, compute):
+    def run():
+        close_old_connections()
+        try:
+            _refresh(key, compute)
+        finally:
+            # The thread's connection is never reused; close it rather than
+            # leaving it open until the server drops it
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_or_refresh(key, compute, ttl):
+    """
+    Return the cached value of ``key``, computing it with ``compute()``.
+
+    A value older than ``ttl`` seconds is returned as is and refreshed in
+    the background. Without any cached value the caller computes it, unless
+    another request already does, in which case it waits for that result.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() - entry["refreshed_at"] > ttl and cache.add(
+            _lock_key(key), 1, LOCK_TIMEOUT
+        ):
+            _refresh_in_background(key, compute)
+        return entry["value"]
+
+    if not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry["value"]
+        # The other request is taking too long; compute our own copy
+        return compute()
+
+    try:
+        value = compute()
+        _store(key, value)
+        return value
+    finally:
+        cache.delete(_lock_key(key))
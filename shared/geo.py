@@ -0,0 +1,214 @@
+"""
+Geographic helpers: great-circle distances and a k-d tree over points on the
+unit sphere.
+
+Points are stored as 3D unit vectors, where the straight-line (chord)
+distance grows monotonically with the great-circle distance. This lets a
+plain Euclidean k-d tree answer nearest-neighbour queries on the globe.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def unit_vector(lat, lon):
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    return (
+        math.cos(phi) * math.cos(lam),
+        math.cos(phi) * math.sin(lam),
+        math.sin(phi),
+    )
+
+
+def km_to_chord(distance_km):
+    angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+class KDTree:
+    """
+    Static 3D k-d tree of ``(vector, value)`` pairs.
+
+    Nodes are ``(vector, value, axis, left, right)`` tuples.
+    """
+
+    def __init__(self, points):
+        self.size = len(points)
+        self.root = self._build(list(points), 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda point: point[0][axis])
+        median = len(points) // 2
+        vector, value = points[median]
+        return (
+            vector,
+            value,
+            axis,
+            self._build(points[:median], depth + 1),
+            self._build(points[median + 1 :], depth + 1),
+        )
+
+    def nearest(self, vector, max_distance=None):
+        """
+        Return ``(value, distance)`` of the point closest to ``vector``, or
+        None if no point lies within ``max_distance`` (chord length).
+        """
+        best_value = None
+        best_sq = math.inf if max_distance is None else max_distance**2
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, value, axis, left, right = node
+
+            dist_sq = sum((a - b) ** 2 for a, b in zip(point, vector))
+            if dist_sq <= best_sq:
+                best_sq = dist_sq
+                best_value = value
+
+            diff = vector[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Visit the far side only if the splitting plane is within reach.
+            # It is pushed first so the near side is explored first.
+            if diff**2 <= best_sq:
+                stack.append(far)
+            stack.append(near)
+
+        if best_value is None:
+            return None
+        return best_value, math.sqrt(best_sq)
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Approximate (width, height) of a geohash cell at the equator, in km, per
+# precision. Cell width shrinks with cos(latitude).
+GEOHASH_CELL_KM = {
+    1: (5009.4, 4992.6),
+    2: (1252.3, 624.1),
+    3: (156.5, 156.0),
+    4: (39.1, 19.5),
+    5: (4.89, 4.87),
+    6: (1.22, 0.61),
+    7: (0.153, 0.152),
+    8: (0.038, 0.019),
+}
+
+
+def geohash_encode(lat, lon, precision=9):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        value, bounds = (lon, lon_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_bounds(geohash):
+    """Return ``(min_lat, min_lon, max_lat, max_lon)`` of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lon_range if even else lat_range
+            mid = (bounds[0] + bounds[1]) / 2
+            if (value >> shift) & 1:
+                bounds[0] = mid
+            else:
+                bounds[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def geohash_cells_for_radius(lat, lon, radius_km):
+    """
+    Return the geohash prefixes covering a circle: the cell containing the
+    centre and its eight neighbours, at the finest precision whose cells are
+    still larger than the radius. Returns an empty list when the circle is
+    too large for any precision to help.
+    """
+    # Cells narrow towards the poles: size them at the circle's poleward edge
+    edge_lat = min(abs(lat) + math.degrees(radius_km / EARTH_RADIUS_KM), 90)
+    cos_lat = max(math.cos(math.radians(edge_lat)), 0.01)
+    precision = 0
+    for candidate, (width, height) in sorted(GEOHASH_CELL_KM.items()):
+        if min(width * cos_lat, height) >= radius_km:
+            precision = candidate
+    if precision == 0:
+        return []
+
+    center = geohash_encode(lat, lon, precision)
+    min_lat, min_lon, max_lat, max_lon = geohash_bounds(center)
+    cell_lat = max_lat - min_lat
+    cell_lon = max_lon - min_lon
+    mid_lat = (min_lat + max_lat) / 2
+    mid_lon = (min_lon + max_lon) / 2
+
+    cells = set()
+    for dlat in (-1, 0, 1):
+        neighbour_lat = mid_lat + dlat * cell_lat
+        if not -90 <= neighbour_lat <= 90:
+            continue
+        for dlon in (-1, 0, 1):
+            neighbour_lon = (mid_lon + dlon * cell_lon + 180) % 360 - 180
+            cells.add(geohash_encode(neighbour_lat, neighbour_lon, precision))
+    return sorted(cells)
+
+
+def bounding_box(lat, lon, radius_km):
+    """Return ``(min_lat, min_lon, max_lat, max_lon)`` enclosing a circle."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6 or abs(lat) + dlat >= 90:
+        return max(lat - dlat, -90), -180.0, min(lat + dlat, 90), 180.0
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if dlon >= 180:
+        return lat - dlat, -180.0, lat + dlat, 180.0
+    # Wrap into [-180, 180); a box crossing the antimeridian ends up with
+    # min_lon > max_lon
+    min_lon = (lon - dlon + 180) % 360 - 180
+    max_lon = (lon + dlon + 180) % 360 - 180
+    return lat - dlat, min_lon, lat + dlat, max_lon
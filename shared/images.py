@@ -0,0 +1,127 @@
+"""
+Background derivative generation for ``OptimizedImageModel`` uploads.
+
+With ``IMAGE_PROCESSING_MODE = "async"`` uploads are stored untouched and
+marked pending; the rows themselves form the queue. The ``process_images``
+worker claims them, resizes and encodes in a process pool, and points the
+rows at the resulting ``ImageBlob``. Rows left processing by a crashed
+worker are claimed again after ``STALE_AFTER``.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ImageBlob, OptimizedImageModel
+from .utils import build_derivatives, variant_formats
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER = timedelta(minutes=10)
+
+State = OptimizedImageModel.ProcessingState
+
+
+def image_models():
+    return [
+        model for model in apps.get_models() if issubclass(model, OptimizedImageModel)
+    ]
+
+
+def claim(model, limit):
+    """Mark up to ``limit`` due rows of ``model`` as processing and return them."""
+    now = timezone.now()
+    due = Q(processing_state=State.PENDING) | Q(
+        processing_state=State.PROCESSING,
+        processing_claimed_at__lt=now - STALE_AFTER,
+    )
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("pk")[:limit]
+        )
+        model.objects.filter(pk__in=[row.pk for row in rows]).update(
+            processing_state=State.PROCESSING, processing_claimed_at=now
+        )
+    return rows
+
+
+def link(instance, blob):
+    """
+    Swap the processed files of ``blob`` in for the original upload. The
+    reference taken on ``blob`` for the row is dropped if the row changed.
+    """
+    original = instance.image.name
+    # The row may have been deleted or given a new upload meanwhile
+    updated = type(instance).objects.filter(pk=instance.pk, image=original).update(
+        blob=blob,
+        **blob.columns(),
+        processing_state=State.READY,
+        processing_claimed_at=None,
+        processing_error="",
+    )
+    if not updated:
+        ImageBlob.release(blob.pk)
+        return
+    try:
+        instance.image.storage.delete(original)
+    except Exception:
+        logger.exception(f"Error deleting original upload {original}")
+
+
+def fail(instance, error):
+    logger.error(f"Error processing {instance._meta.label} {instance.pk}: {error}")
+    type(instance).objects.filter(pk=instance.pk).update(
+        processing_state=State.FAILED,
+        processing_claimed_at=None,
+        processing_error=str(error),
+    )
+
+
+def process(executor, limit=20):
+    """
+    Process one batch of pending images per model.
+
+    Decoding and encoding run in ``executor`` (a process pool); reading and
+    writing files and rows stays in the calling process. Returns the number
+    of rows handled.
+    """
+    handled = 0
+    formats = variant_formats()
+    for model in image_models():
+        rows = claim(model, limit)
+        jobs = []
+        for row in rows:
+            try:
+                with row.image.open("rb") as source:
+                    data = source.read()
+                digest = ImageBlob.digest_of(data)
+                # Content processed since the upload needs no new work
+                blob = ImageBlob.acquire(digest)
+                if blob is not None:
+                    link(row, blob)
+                    continue
+            except Exception as e:
+                fail(row, e)
+                continue
+            jobs.append(
+                (
+                    row,
+                    digest,
+                    executor.submit(build_derivatives, data, formats=formats),
+                )
+            )
+
+        for row, digest, job in jobs:
+            try:
+                main, mobile = job.result()
+                link(row, ImageBlob.store(digest, main, mobile))
+            except Exception as e:
+                fail(row, e)
+        handled += len(rows)
+    return handled
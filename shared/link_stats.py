@@ -0,0 +1,108 @@
+"""
+Local store of Short.io link statistics.
+
+``sync`` pulls statistics for many links at once and saves one snapshot per
+link and period, plus a per-day click series. Pages read the snapshots, so
+rendering them never waits on Short.io.
+"""
+
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.utils import timezone
+
+from .models import LinkDailyClicks, LinkStatistics
+from .short_io import ShortIOService, parse_timeline
+
+logger = logging.getLogger(__name__)
+
+# Periods offered by the tracking pages
+PERIODS = ("today", "yesterday", "week", "month", "lastmonth", "total")
+
+# Period whose timeline has one point per day
+DAILY_PERIOD = "month"
+
+
+def _parse_date(moment):
+    try:
+        return datetime.date.fromisoformat(str(moment)[:10])
+    except ValueError:
+        return None
+
+
+def sync(short_ids, periods=PERIODS):
+    """
+    Fetch and store statistics for ``short_ids``.
+
+    Returns ``{short_id: human clicks}`` for the "total" period.
+    """
+    short_ids = sorted({short_id for short_id in short_ids if short_id})
+    if not short_ids:
+        return {}
+
+    service = ShortIOService()
+    jobs = [(short_id, period) for short_id in short_ids for period in periods]
+    with ThreadPoolExecutor(max_workers=service.max_concurrency) as executor:
+        results = executor.map(
+            lambda job: (job, service.get_link_statistics(*job)), jobs
+        )
+
+        now = timezone.now()
+        snapshots = []
+        daily = {}
+        for (short_id, period), stats in results:
+            if not stats:
+                continue
+            snapshots.append(
+                LinkStatistics(
+                    short_id=short_id,
+                    period=period,
+                    total_clicks=stats.get("totalClicks", 0),
+                    human_clicks=stats.get("humanClicks", 0),
+                    payload=stats,
+                    fetched_at=now,
+                )
+            )
+            if period == DAILY_PERIOD:
+                for point in parse_timeline(stats):
+                    date = _parse_date(point.get("moment"))
+                    if date:
+                        daily[short_id, date] = point.get("clicks", 0)
+
+    LinkStatistics.objects.bulk_create(
+        snapshots,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["short_id", "period"],
+        update_fields=["total_clicks", "human_clicks", "payload", "fetched_at"],
+    )
+    LinkDailyClicks.objects.bulk_create(
+        [
+            LinkDailyClicks(short_id=short_id, date=date, clicks=clicks)
+            for (short_id, date), clicks in daily.items()
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["short_id", "date"],
+        update_fields=["clicks"],
+    )
+    logger.info(
+        f"Synced {len(snapshots)} statistics snapshots for {len(short_ids)} links"
+    )
+    return {
+        snapshot.short_id: snapshot.human_clicks
+        for snapshot in snapshots
+        if snapshot.period == "total"
+    }
+
+
+def get_statistics(short_id, period):
+    """Return the stored Short.io statistics of a link, or None."""
+    if not short_id:
+        return None
+    return (
+        LinkStatistics.objects.filter(short_id=short_id, period=period)
+        .values_list("payload", flat=True)
+        .first()
+    )
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.9 on 2026-10-16 13:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shared", "0003_userpreference"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LinkStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "short_id",
+                    models.CharField(max_length=50, verbose_name="Short ID"),
+                ),
+                ("period", models.CharField(max_length=20, verbose_name="Period")),
+                (
+                    "total_clicks",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Total clicks"
+                    ),
+                ),
+                (
+                    "human_clicks",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Human clicks"
+                    ),
+                ),
+                ("payload", models.JSONField(default=dict, verbose_name="Payload")),
+                (
+                    "fetched_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Fetched at"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Link statistics",
+                "verbose_name_plural": "Link statistics",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("short_id", "period"),
+                        name="unique_link_statistics_period",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="LinkDailyClicks",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "short_id",
+                    models.CharField(max_length=50, verbose_name="Short ID"),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                ("clicks", models.PositiveIntegerField(default=0, verbose_name="Clicks")),
+            ],
+            options={
+                "verbose_name": "Link daily clicks",
+                "verbose_name_plural": "Link daily clicks",
+                "ordering": ["date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("short_id", "date"), name="unique_link_daily_clicks"
+                    )
+                ],
+            },
+        ),
+    ]
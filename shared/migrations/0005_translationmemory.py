@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-16 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shared", "0004_linkstatistics_linkdailyclicks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranslationMemory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(max_length=64, unique=True, verbose_name="Key"),
+                ),
+                (
+                    "source_lang",
+                    models.CharField(max_length=10, verbose_name="Source language"),
+                ),
+                (
+                    "target_lang",
+                    models.CharField(max_length=10, verbose_name="Target language"),
+                ),
+                (
+                    "preserve_html",
+                    models.BooleanField(default=False, verbose_name="Preserve HTML"),
+                ),
+                ("model", models.CharField(max_length=100, verbose_name="Model")),
+                ("source_text", models.TextField(verbose_name="Source text")),
+                ("translated_text", models.TextField(verbose_name="Translated text")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Translation memory",
+                "verbose_name_plural": "Translation memory",
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-16 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shared", "0005_translationmemory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "digest",
+                    models.CharField(max_length=64, unique=True, verbose_name="Digest"),
+                ),
+                (
+                    "refcount",
+                    models.PositiveIntegerField(default=0, verbose_name="References"),
+                ),
+                ("image", models.CharField(max_length=255, verbose_name="Image")),
+                (
+                    "image_mobile",
+                    models.CharField(max_length=255, verbose_name="Mobile image"),
+                ),
+                ("variants", models.JSONField(default=dict, verbose_name="Variants")),
+                ("metadata", models.JSONField(default=dict, verbose_name="Metadata")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Image blob",
+                "verbose_name_plural": "Image blobs",
+            },
+        ),
+    ]
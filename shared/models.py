@@ -1,11 +1,14 @@
+import hashlib
+import logging
 import os
 import uuid
 from datetime import timedelta
 from django.contrib.auth import get_user_model
-from io import BytesIO
-from PIL import Image as PilImage
 from django.core.files.base import ContentFile
-from django.db import models
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, ProtectedError
 from django.db.models.signals import post_delete, post_save
 from django.urls import reverse
 from django.utils import timezone
@@ -13,68 +16,337 @@ from django.dispatch import receiver
 from tinymce.models import HTMLField
 from django.utils.translation import gettext_lazy as _
 
+from .utils import build_derivatives, image_metadata, variant_formats
 
-class OptimizedImageModel(models.Model):
-    image = models.ImageField(upload_to="images/")
-    image_mobile = models.ImageField(upload_to="images/", blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+logger = logging.getLogger(__name__)
 
-    class Meta:
-        abstract = True
 
-    def save(self, *args, **kwargs):
-        if self.image and (not self.pk or hasattr(self.image, "file")):
-            try:
-                img = PilImage.open(self.image)
+IMAGE_METADATA = ("width", "height", "size", "mime", "placeholder")
 
-                if img.mode != "RGB":
-                    img = img.convert("RGB")
 
-                img_main = img.copy()
-                if img_main.width > 1920:
-                    ratio = 1920 / float(img_main.width)
-                    height = int((float(img_main.height) * float(ratio)))
-                    img_main = img_main.resize(
-                        (1920, height), PilImage.Resampling.LANCZOS
-                    )
+def image_metadata_fields(field_name):
+    """Names of the columns holding the metadata of image field ``field_name``."""
+    return [f"{field_name}_{key}" for key in IMAGE_METADATA]
 
-                output_main = BytesIO()
-                img_main.save(output_main, format="JPEG", quality=80)
-                output_main.seek(0)
 
-                original_name = os.path.basename(self.image.name)
-                name_base, _ = os.path.splitext(original_name)
-                filename = f"{name_base}.jpg"
+def image_metadata_columns(field_name, file):
+    """Column values describing ``file``, or clearing them when it is empty."""
+    if file:
+        metadata = image_metadata(file)
+    else:
+        metadata = {
+            "width": None,
+            "height": None,
+            "size": None,
+            "mime": "",
+            "placeholder": "",
+        }
+    return {f"{field_name}_{key}": value for key, value in metadata.items()}
+
+
+def update_image_metadata(instance, *field_names):
+    """
+    Refresh the metadata columns of newly assigned or cleared images, so API
+    responses never read image files to describe them.
+    """
+    for field_name in field_names:
+        file = getattr(instance, field_name)
+        if file and file._committed:
+            continue
+        try:
+            columns = image_metadata_columns(field_name, file)
+        except Exception:
+            logger.exception(f"Error reading metadata of {field_name}")
+            continue
+        for column, value in columns.items():
+            setattr(instance, column, value)
+
+
+def processing_async():
+    return getattr(settings, "IMAGE_PROCESSING_MODE", "sync") == "async"
+
+
+class ImageBlob(models.Model):
+    """
+    Processed files of one original image, addressed by the SHA-256 of the
+    upload. Rows uploading identical content share the files, which are
+    deleted when the last row referencing them goes away.
+    """
+
+    digest = models.CharField(max_length=64, unique=True, verbose_name=_("Digest"))
+    refcount = models.PositiveIntegerField(default=0, verbose_name=_("References"))
+    image = models.CharField(max_length=255, verbose_name=_("Image"))
+    image_mobile = models.CharField(max_length=255, verbose_name=_("Mobile image"))
+    # {"image": {"webp": name}, "image_mobile": {...}}
+    variants = models.JSONField(default=dict, verbose_name=_("Variants"))
+    # Metadata column values of the image and image_mobile fields
+    metadata = models.JSONField(default=dict, verbose_name=_("Metadata"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created at"))
 
-                self.image = ContentFile(output_main.read(), name=filename)
+    class Meta:
+        verbose_name = _("Image blob")
+        verbose_name_plural = _("Image blobs")
 
-                img_mobile = img.copy()
-                if img_mobile.width > 500:
-                    ratio = 500 / float(img_mobile.width)
-                    height = int((float(img_mobile.height) * float(ratio)))
-                    img_mobile = img_mobile.resize(
-                        (500, height), PilImage.Resampling.LANCZOS
-                    )
+    def __str__(self):
+        return f"{self.digest} ({self.refcount})"
+
+    @staticmethod
+    def digest_of(data):
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def path(digest, suffix):
+        return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+    def names(self):
+        names = [self.image, self.image_mobile]
+        for encoded in self.variants.values():
+            names.extend(encoded.values())
+        return names
+
+    def columns(self):
+        """Field values of an OptimizedImageModel row using this blob."""
+        return {
+            "image": self.image,
+            "image_mobile": self.image_mobile,
+            "variants": self.variants,
+            **self.metadata,
+        }
+
+    @classmethod
+    def store(cls, digest, main, mobile):
+        """
+        Save derivatives from ``build_derivatives`` under content-addressed
+        names and return their blob, with a reference taken for the caller.
+        If another process stored the same content meanwhile, its blob wins
+        and these files are dropped.
+        """
+        existing = cls.acquire(digest)
+        if existing is not None:
+            return existing
+
+        def save(suffix, data):
+            return default_storage.save(cls.path(digest, suffix), ContentFile(data))
+
+        blob = cls(
+            digest=digest,
+            refcount=1,
+            image=save(".jpg", main["jpeg"]),
+            image_mobile=save("_mobile.jpg", mobile["jpeg"]),
+            variants={
+                "image": {
+                    fmt: save(f".{fmt}", data)
+                    for fmt, data in main.items()
+                    if fmt != "jpeg"
+                },
+                "image_mobile": {
+                    fmt: save(f"_mobile.{fmt}", data)
+                    for fmt, data in mobile.items()
+                    if fmt != "jpeg"
+                },
+            },
+            metadata={
+                **image_metadata_columns("image", ContentFile(main["jpeg"])),
+                **image_metadata_columns("image_mobile", ContentFile(mobile["jpeg"])),
+            },
+        )
+        try:
+            with transaction.atomic():
+                blob.save()
+        except IntegrityError:
+            blob.delete_files()
+            return cls.store(digest, main, mobile)
+        return blob
+
+    @classmethod
+    def acquire(cls, digest):
+        """
+        Take a reference to the blob of ``digest`` and return it, or None if
+        there is none. The row stays locked until the surrounding transaction
+        ends, so a concurrent release of its last reference cannot delete it.
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(digest=digest).first()
+            if blob is None:
+                return None
+            cls.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+            blob.refcount += 1
+        return blob
+
+    @classmethod
+    def release(cls, pk):
+        """Drop one reference, deleting the blob and its files with the last."""
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(pk=pk).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                cls.objects.filter(pk=pk).update(refcount=F("refcount") - 1)
+                return
+            try:
+                blob.delete()
+            except ProtectedError:
+                # A miscounted blob still in use keeps its files
+                return
+            # Files go only once the deletion is committed
+            transaction.on_commit(blob.delete_files)
+
+    def delete_files(self):
+        for name in self.names():
+            try:
+                default_storage.delete(name)
+            except Exception:
+                pass
+
+
+class OptimizedImageModel(models.Model):
+    class ProcessingState(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        PROCESSING = "processing", _("Processing")
+        READY = "ready", _("Ready")
+        FAILED = "failed", _("Failed")
 
-                output_mobile = BytesIO()
-                img_mobile.save(output_mobile, format="JPEG", quality=80)
-                output_mobile.seek(0)
+    image = models.ImageField(upload_to="images/")
+    image_mobile = models.ImageField(upload_to="images/", blank=True, null=True)
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image width")
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image height")
+    )
+    image_size = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Image size")
+    )
+    image_mime = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Image MIME type"),
+    )
+    image_placeholder = models.TextField(
+        blank=True, default="", editable=False, verbose_name=_("Image placeholder")
+    )
+    image_mobile_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Mobile image width")
+    )
+    image_mobile_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Mobile image height")
+    )
+    image_mobile_size = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, verbose_name=_("Mobile image size")
+    )
+    image_mobile_mime = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Mobile image MIME type"),
+    )
+    image_mobile_placeholder = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name=_("Mobile image placeholder"),
+    )
+    processing_state = models.CharField(
+        max_length=20,
+        choices=ProcessingState.choices,
+        default=ProcessingState.READY,
+        db_index=True,
+        verbose_name=_("Processing state"),
+    )
+    processing_claimed_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Processing claimed at")
+    )
+    processing_error = models.TextField(
+        blank=True, default="", verbose_name=_("Processing error")
+    )
+    # Other encodings of the derivatives: {"image": {"webp": name}, ...}
+    variants = models.JSONField(default=dict, blank=True, verbose_name=_("Variants"))
+    blob = models.ForeignKey(
+        "shared.ImageBlob",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+        verbose_name=_("Blob"),
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
 
-                self.image_mobile = ContentFile(
-                    output_mobile.read(), name=f"mobile_{filename}"
-                )
+    class Meta:
+        abstract = True
 
+    def delete_variants(self, variants):
+        for field_name, names in (variants or {}).items():
+            storage = self._meta.get_field(field_name).storage
+            for name in names.values():
                 try:
-                    if self.image.storage.exists(self.image.name):
-                        self.image.storage.delete(self.image.name)
+                    storage.delete(name)
                 except Exception:
-                    pass
+                    logger.exception(f"Error deleting image variant {name}")
 
-            except Exception as e:
-                print(f"Error processing image: {e}")
-                pass
+    def use_blob(self, blob):
+        """Point this row at the processed files of ``blob``."""
+        self.blob = blob
+        for field, value in blob.columns().items():
+            setattr(self, field, value)
+        self.processing_state = self.ProcessingState.READY
+        self.processing_claimed_at = None
+        self.processing_error = ""
 
-        super().save(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        previous_blob_id = self.blob_id
+        uploaded = bool(self.image) and not self.image._committed
+        data = digest = None
+        if uploaded:
+            try:
+                self.image.open()
+                data = self.image.read()
+                digest = ImageBlob.digest_of(data)
+            except Exception:
+                logger.exception("Error reading uploaded image")
+
+        with transaction.atomic():
+            if uploaded:
+                blob = None
+                try:
+                    if digest is not None:
+                        # Identical content processed before shares its files
+                        blob = ImageBlob.acquire(digest)
+                        if blob is None and not processing_async():
+                            main, mobile = build_derivatives(
+                                data, formats=variant_formats()
+                            )
+                            blob = ImageBlob.store(digest, main, mobile)
+                except Exception:
+                    logger.exception("Error processing image")
+
+                if previous_blob_id is None:
+                    # Files of a row without blob are its own
+                    self.delete_variants(self.variants)
+                    self.variants = {}
+
+                if blob is not None:
+                    self.use_blob(blob)
+                else:
+                    self.blob = None
+                    self.image_mobile = None
+                    self.variants = {}
+                    if processing_async():
+                        # Keep the upload as is; the process_images worker
+                        # builds the derivatives and clients use the original
+                        # meanwhile
+                        self.processing_state = self.ProcessingState.PENDING
+                        self.processing_claimed_at = None
+                        self.processing_error = ""
+
+            update_image_metadata(self, "image", "image_mobile")
+            # The new reference was taken above; a failing save rolls it back
+            super().save(*args, **kwargs)
+            if uploaded and previous_blob_id is not None:
+                ImageBlob.release(previous_blob_id)
 
 
 @receiver(post_delete)
@@ -82,6 +354,11 @@ def cleanup_optimized_image_files(sender, instance, **kwargs):
     if not issubclass(sender, OptimizedImageModel):
         return
 
+    if instance.blob_id is not None:
+        # Shared files go away with their last reference
+        ImageBlob.release(instance.blob_id)
+        return
+
     if (
         hasattr(instance, "image")
         and instance.image
@@ -96,6 +373,8 @@ def cleanup_optimized_image_files(sender, instance, **kwargs):
     ):
         os.remove(instance.image_mobile.path)
 
+    instance.delete_variants(instance.variants)
+
     try:
         if hasattr(instance, "image") and instance.image:
             directory = os.path.dirname(instance.image.path)
@@ -257,3 +536,73 @@ class Package(models.Model):
 
     def get_absolute_url(self):
         return reverse("package_detail", kwargs={"pk": self.pk})
+
+
+class LinkStatistics(models.Model):
+    """Last Short.io statistics fetched for a short link over one period."""
+
+    short_id = models.CharField(max_length=50, verbose_name=_("Short ID"))
+    period = models.CharField(max_length=20, verbose_name=_("Period"))
+    total_clicks = models.PositiveIntegerField(
+        default=0, verbose_name=_("Total clicks")
+    )
+    human_clicks = models.PositiveIntegerField(
+        default=0, verbose_name=_("Human clicks")
+    )
+    payload = models.JSONField(default=dict, verbose_name=_("Payload"))
+    fetched_at = models.DateTimeField(
+        default=timezone.now, verbose_name=_("Fetched at")
+    )
+
+    class Meta:
+        verbose_name = _("Link statistics")
+        verbose_name_plural = _("Link statistics")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["short_id", "period"], name="unique_link_statistics_period"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.short_id} ({self.period})"
+
+
+class LinkDailyClicks(models.Model):
+    """Clicks on a short link for one day."""
+
+    short_id = models.CharField(max_length=50, verbose_name=_("Short ID"))
+    date = models.DateField(verbose_name=_("Date"))
+    clicks = models.PositiveIntegerField(default=0, verbose_name=_("Clicks"))
+
+    class Meta:
+        verbose_name = _("Link daily clicks")
+        verbose_name_plural = _("Link daily clicks")
+        ordering = ["date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["short_id", "date"], name="unique_link_daily_clicks"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.short_id} {self.date}: {self.clicks}"
+
+
+class TranslationMemory(models.Model):
+    """A translation already returned by the LLM, reused for identical requests."""
+
+    key = models.CharField(max_length=64, unique=True, verbose_name=_("Key"))
+    source_lang = models.CharField(max_length=10, verbose_name=_("Source language"))
+    target_lang = models.CharField(max_length=10, verbose_name=_("Target language"))
+    preserve_html = models.BooleanField(default=False, verbose_name=_("Preserve HTML"))
+    model = models.CharField(max_length=100, verbose_name=_("Model"))
+    source_text = models.TextField(verbose_name=_("Source text"))
+    translated_text = models.TextField(verbose_name=_("Translated text"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created at"))
+
+    class Meta:
+        verbose_name = _("Translation memory")
+        verbose_name_plural = _("Translation memory")
+
+    def __str__(self):
+        return f"{self.source_lang} → {self.target_lang}: {self.source_text[:50]}"
@@ -0,0 +1,205 @@
+"""
+On-demand resizing of uploaded images for the ``/img/<path>`` endpoint.
+
+Only the widths, qualities and formats allowed in the settings can be
+requested, which bounds the number of derivatives per image. Derivatives
+are written once to a sharded directory tree and evicted least recently
+used first when the tree grows over ``IMAGE_RESIZE_CACHE_MAX_BYTES``.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image as PilImage
+
+from .utils import FORMAT_OPTIONS, displayed_size, upright, variant_formats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = [320, 480, 640, 768, 1024, 1280, 1600, 1920]
+DEFAULT_QUALITY = 80
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif"}
+
+# A hit refreshes the file's mtime, the LRU clock, at most this often
+TOUCH_INTERVAL = 60 * 60
+# Minimum seconds between two eviction scans
+EVICT_INTERVAL = 60 * 5
+
+# Formats able to keep an alpha channel
+ALPHA_FORMATS = {"webp", "avif"}
+
+
+class ResizeError(ValueError):
+    pass
+
+
+class ImageNotFound(ResizeError):
+    pass
+
+
+def allowed_widths():
+    return sorted(getattr(settings, "IMAGE_RESIZE_WIDTHS", DEFAULT_WIDTHS))
+
+
+def allowed_qualities():
+    return getattr(settings, "IMAGE_RESIZE_QUALITIES", [DEFAULT_QUALITY])
+
+
+def allowed_formats():
+    return ["jpeg", *variant_formats()]
+
+
+def cache_dir():
+    return Path(
+        getattr(settings, "IMAGE_RESIZE_CACHE_DIR", settings.BASE_DIR / "image_cache")
+    )
+
+
+def negotiate_format(accept):
+    """Best allowed format announced in an ``Accept`` header."""
+    formats = allowed_formats()
+    for fmt in ("avif", "webp"):
+        if fmt in formats and f"image/{fmt}" in accept:
+            return fmt
+    return "jpeg"
+
+
+def source_path(name):
+    """Resolve a media-relative name, refusing anything outside MEDIA_ROOT."""
+    root = Path(settings.MEDIA_ROOT).resolve()
+    path = (root / name).resolve()
+    if (
+        root not in path.parents
+        or cache_dir().resolve() in path.parents
+        or path.suffix.lower() not in SOURCE_EXTENSIONS
+        or not path.is_file()
+    ):
+        raise ImageNotFound("Image not found")
+    return path
+
+
+def _cache_path(source, width, quality, fmt):
+    stat = source.stat()
+    digest = hashlib.sha256(
+        f"{source}|{stat.st_mtime_ns}|{width}|{quality}|{fmt}".encode()
+    ).hexdigest()
+    return cache_dir() / digest[:2] / digest[2:4] / f"{digest}.{fmt}"
+
+
+def _convert(img, fmt):
+    """Convert to a mode ``fmt`` can encode, keeping transparency if it can."""
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (
+        img.mode == "P" and "transparency" in img.info
+    )
+    if not has_alpha:
+        return img if img.mode == "RGB" else img.convert("RGB")
+    img = img if img.mode == "RGBA" else img.convert("RGBA")
+    if fmt in ALPHA_FORMATS:
+        return img
+    # JPEG: flatten transparent areas onto white instead of black
+    background = PilImage.new("RGB", img.size, (255, 255, 255))
+    background.paste(img, mask=img.getchannel("A"))
+    return background
+
+
+def _render(source, width, quality, fmt):
+    with PilImage.open(source) as img:
+        shown_width, shown_height = displayed_size(img)
+        if shown_width > width:
+            height = max(1, round(shown_height * width / shown_width))
+            img = _convert(upright(img, (width, height)), fmt).resize(
+                (width, height), PilImage.Resampling.LANCZOS, reducing_gap=3.0
+            )
+        else:
+            img = _convert(upright(img), fmt)
+
+        output = BytesIO()
+        img.save(output, **{"quality": quality, **FORMAT_OPTIONS[fmt]})
+        return output.getvalue()
+
+
+def get_derivative(name, width, quality=DEFAULT_QUALITY, fmt="jpeg"):
+    """
+    ``name`` resized to ``width`` (never upscaled), as an open binary file,
+    created on first use. Raises ResizeError for parameters outside the
+    allow-lists.
+
+    The file is opened here, so an eviction running meanwhile cannot remove
+    it between the lookup and the response.
+    """
+    if width not in allowed_widths():
+        raise ResizeError("Width not allowed")
+    if quality not in allowed_qualities():
+        raise ResizeError("Quality not allowed")
+    if fmt not in allowed_formats():
+        raise ResizeError("Format not allowed")
+
+    source = source_path(name)
+    path = _cache_path(source, width, quality, fmt)
+    try:
+        derivative = open(path, "rb")
+    except FileNotFoundError:
+        pass
+    else:
+        try:
+            if time.time() - os.fstat(derivative.fileno()).st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except FileNotFoundError:
+            # Evicted since it was opened; the open file stays readable
+            pass
+        return derivative
+
+    data = _render(source, width, quality, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent requests for the same derivative each write a temporary file
+    # and the last rename wins
+    fd, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as output:
+        output.write(data)
+    os.replace(temporary, path)
+
+    if cache.add("image_resize_evict", 1, EVICT_INTERVAL):
+        threading.Thread(target=evict, daemon=True).start()
+    return BytesIO(data)
+
+
+def evict(max_bytes=None):
+    """Delete least recently used derivatives until the cache fits in 90%."""
+    if max_bytes is None:
+        max_bytes = getattr(settings, "IMAGE_RESIZE_CACHE_MAX_BYTES", 1024**3)
+
+    entries = []
+    total = 0
+    for directory, _, files in os.walk(cache_dir()):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    target = max_bytes * 0.9
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed += 1
+    logger.info(f"Evicted {removed} resized image(s)")
+    return removed
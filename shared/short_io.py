@@ -1,9 +1,64 @@
 import requests
 from django.conf import settings
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide Short.io session.
+
+    Connections are kept alive and pooled per host (api.short.io and
+    statistics.short.io), so repeated calls skip the TCP and TLS handshakes.
+    GET requests are retried on connection errors, rate limiting and 5xx
+    responses; POSTs only when the connection could not be opened.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = getattr(settings, "SHORT_IO_MAX_CONCURRENCY", 8)
+                retry = Retry(
+                    total=3,
+                    backoff_factor=0.5,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset({"GET"}),
+                    respect_retry_after_header=True,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=2, pool_maxsize=pool_size, max_retries=retry
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def parse_timeline(stats):
+    """
+    Return the click timeline of a statistics response as
+    ``[{"moment": ..., "clicks": ...}]``, whichever of the two Short.io
+    response formats it uses.
+    """
+    click_stats = stats.get("clickStatistics", {})
+    if "datasets" in click_stats and click_stats["datasets"]:
+        data = click_stats["datasets"][0].get("data", [])
+        # Convert {x: date, y: value} to {moment: date, clicks: value}
+        return [
+            {"moment": p["x"], "clicks": int(p["y"])}
+            for p in data
+            if "x" in p and "y" in p
+        ]
+    return click_stats.get("timeline", [])
+
 
 class ShortIOService:
     """Service to interact with Short.io API"""
@@ -11,6 +66,9 @@ class ShortIOService:
     BASE_URL = "https://api.short.io"
 
     def __init__(self):
+        self.session = get_session()
+        self.timeout = getattr(settings, "SHORT_IO_TIMEOUT", 10)
+        self.max_concurrency = getattr(settings, "SHORT_IO_MAX_CONCURRENCY", 8)
         self.api_key = getattr(settings, "PUBLIC_SHORT_API", None) or getattr(
             settings, "SHORT_IO_API_KEY", None
         )
@@ -66,7 +124,9 @@ class ShortIOService:
         logger.info(f"Short.io payload: {payload}")
 
         try:
-            response = requests.post(endpoint, json=payload, headers=headers)
+            response = self.session.post(
+                endpoint, json=payload, headers=headers, timeout=self.timeout
+            )
             logger.info(f"Short.io response status: {response.status_code}")
             logger.info(f"Short.io response body: {response.text}")
             response.raise_for_status()
@@ -79,8 +139,8 @@ class ShortIOService:
             }
         except requests.exceptions.RequestException as e:
             logger.error(f"Error shortening URL: {e}")
-            if response:
-                logger.error(f"Response: {response.text}")
+            if e.response is not None:
+                logger.error(f"Response: {e.response.text}")
             return None
 
     def get_clicks(self, link_id):
@@ -100,7 +160,9 @@ class ShortIOService:
         params = {"period": "total", "tzOffset": 0}
 
         try:
-            response = requests.get(endpoint, headers=headers, params=params)
+            response = self.session.get(
+                endpoint, headers=headers, params=params, timeout=self.timeout
+            )
             response.raise_for_status()
             data = response.json()
             return data.get("humanClicks", 0)
@@ -134,7 +196,9 @@ class ShortIOService:
         try:
             # According to Short.io API, updating a link uses POST to /links/{id}
             # Reference: https://developers.short.io/reference/post_links-linkid
-            response = requests.post(endpoint, json=payload, headers=headers)
+            response = self.session.post(
+                endpoint, json=payload, headers=headers, timeout=self.timeout
+            )
             response.raise_for_status()
             data = response.json()
 
@@ -145,8 +209,8 @@ class ShortIOService:
             }
         except requests.exceptions.RequestException as e:
             logger.error(f"Error updating link {link_id}: {e}")
-            if response:
-                logger.error(f"Response: {response.text}")
+            if e.response is not None:
+                logger.error(f"Response: {e.response.text}")
             return None
 
     def get_link_statistics(self, link_id, period="total"):
@@ -168,7 +232,9 @@ class ShortIOService:
         params = {"period": period, "tzOffset": 0}
 
         try:
-            response = requests.get(endpoint, headers=headers, params=params)
+            response = self.session.get(
+                endpoint, headers=headers, params=params, timeout=self.timeout
+            )
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -195,10 +261,18 @@ class ShortIOService:
         timeline_map = {}  # date -> clicks
 
         # Ensure we only count each Short.io link once
-        unique_link_ids = set(link_ids)
-
-        for lid in unique_link_ids:
-            stats = self.get_link_statistics(lid, period)
+        unique_link_ids = list(set(link_ids))
+
+        # Fetch the links concurrently over the pooled session
+        workers = max(1, min(self.max_concurrency, len(unique_link_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            all_stats = list(
+                executor.map(
+                    lambda lid: self.get_link_statistics(lid, period), unique_link_ids
+                )
+            )
+
+        for stats in all_stats:
             if not stats:
                 continue
 
@@ -206,21 +280,7 @@ class ShortIOService:
             aggregated["humanClicks"] += stats.get("humanClicks", 0)
 
             # Aggregate timeline (handle both Short.io response formats)
-            click_stats = stats.get("clickStatistics", {})
-            timeline = []
-
-            if "datasets" in click_stats and click_stats["datasets"]:
-                data = click_stats["datasets"][0].get("data", [])
-                # Convert {x: date, y: value} to {moment: date, clicks: value}
-                timeline = [
-                    {"moment": p["x"], "clicks": int(p["y"])}
-                    for p in data
-                    if "x" in p and "y" in p
-                ]
-            elif "timeline" in click_stats:
-                timeline = click_stats.get("timeline", [])
-
-            for point in timeline:
+            for point in parse_timeline(stats):
                 moment = point.get("moment")
                 clicks = point.get("clicks", 0)
                 if moment:
@@ -1,3 +1,724 @@
-from django.test import TestCase
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PilImage
+from PIL import JpegImagePlugin
+
+from guard.models import ImageLocation, Location
+
+from .geo import (
+    KDTree,
+    chord_to_km,
+    geohash_cells_for_radius,
+    geohash_encode,
+    haversine_km,
+    km_to_chord,
+    unit_vector,
+)
+from . import cache as stale_cache
+from . import images, resizer, short_io
+from .models import ImageBlob, OptimizedImageModel, TranslationMemory
+from .translator import TAG_RE, LRUCache, TranslationService, split_html
+from .utils import build_derivatives, variant_formats
+
+
+class GeoTests(SimpleTestCase):
+    def test_haversine_one_degree_on_equator(self):
+        self.assertAlmostEqual(haversine_km(0, 0, 0, 1), 111.19, places=1)
+        self.assertEqual(haversine_km(36.8, 10.18, 36.8, 10.18), 0)
+
+    def test_chord_round_trip(self):
+        for distance in (0, 1, 250, 5000):
+            self.assertAlmostEqual(chord_to_km(km_to_chord(distance)), distance)
+
+    def test_kdtree_nearest_matches_brute_force(self):
+        rng = random.Random(42)
+        points = [
+            (rng.uniform(-80, 80), rng.uniform(-180, 180), index)
+            for index in range(300)
+        ]
+        tree = KDTree([(unit_vector(lat, lon), index) for lat, lon, index in points])
+        for _ in range(50):
+            lat, lon = rng.uniform(-80, 80), rng.uniform(-180, 180)
+            expected = min(
+                points, key=lambda point: haversine_km(lat, lon, point[0], point[1])
+            )
+            value, chord = tree.nearest(unit_vector(lat, lon))
+            self.assertEqual(value, expected[2])
+            self.assertAlmostEqual(
+                chord_to_km(chord),
+                haversine_km(lat, lon, expected[0], expected[1]),
+                places=3,
+            )
+
+    def test_kdtree_nearest_respects_max_distance(self):
+        tree = KDTree([(unit_vector(36.8, 10.18), "tunis")])
+        origin = unit_vector(34.74, 10.76)  # Sfax, about 230 km away
+        self.assertIsNone(tree.nearest(origin, km_to_chord(100)))
+        self.assertEqual(tree.nearest(origin, km_to_chord(300))[0], "tunis")
+        self.assertIsNone(KDTree([]).nearest(origin))
+
+    def test_geohash_cells_cover_the_circle(self):
+        lat, lon, radius_km = 36.8, 10.18, 3
+        cells = geohash_cells_for_radius(lat, lon, radius_km)
+        self.assertTrue(cells)
+        for step in range(36):
+            bearing = math.radians(step * 10)
+            # Points just inside the radius, around the centre
+            distance = radius_km * 0.99 / 6371
+            dlat = math.degrees(distance * math.cos(bearing))
+            dlon = math.degrees(
+                distance * math.sin(bearing) / math.cos(math.radians(lat))
+            )
+            geohash = geohash_encode(lat + dlat, lon + dlon)
+            self.assertTrue(any(geohash.startswith(cell) for cell in cells))
+
+    def test_geohash_cells_give_up_on_huge_radius(self):
+        self.assertEqual(geohash_cells_for_radius(0, 0, 10000), [])
+
+
+def jpeg(color, size=(64, 48)):
+    output = BytesIO()
+    PilImage.new("RGB", size, color).save(output, "JPEG")
+    return output.getvalue()
+
+
+class BuildDerivativesTests(SimpleTestCase):
+    def sizes(self, data, **kwargs):
+        return [
+            PilImage.open(BytesIO(derivative["jpeg"])).size
+            for derivative in build_derivatives(data, **kwargs)
+        ]
+
+    def drafts(self, data, **kwargs):
+        """The boxes passed to Image.draft while building derivatives."""
+        jpeg_file = JpegImagePlugin.JpegImageFile
+        with mock.patch.object(
+            jpeg_file, "draft", autospec=True, side_effect=jpeg_file.draft
+        ) as spy:
+            build_derivatives(data, **kwargs)
+        return [call.args[2] for call in spy.call_args_list]
+
+    def test_keeps_the_aspect_ratio_and_never_upscales(self):
+        data = jpeg("red", (2000, 1000))
+        for fast in (True, False):
+            self.assertEqual(
+                self.sizes(data, widths=(1000, 500, 4000), fast=fast),
+                [(1000, 500), (500, 250), (2000, 1000)],
+            )
+
+    def test_encodes_every_requested_format(self):
+        formats = variant_formats()
+        (derivative,) = build_derivatives(
+            jpeg("red", (100, 50)), widths=(50,), formats=formats
+        )
+        self.assertEqual(set(derivative), {"jpeg", *formats})
+        for fmt, data in derivative.items():
+            img = PilImage.open(BytesIO(data))
+            self.assertEqual(img.format, fmt.upper())
+            self.assertEqual(img.size, (50, 25))
+
+    def test_jpeg_is_drafted_to_the_largest_width(self):
+        data = jpeg("red", (4000, 2000))
+        self.assertEqual(self.drafts(data, widths=(1000, 500)), [(1000, 500)])
+        self.assertEqual(self.drafts(data, widths=(1000,), fast=False), [])
+        # Already small enough: no draft
+        self.assertEqual(self.drafts(data, widths=(4000,)), [])
+        # Not a JPEG: nothing to draft
+        output = BytesIO()
+        PilImage.new("RGB", (4000, 2000)).save(output, "PNG")
+        self.assertEqual(self.drafts(output.getvalue(), widths=(1000,)), [])
+
+    def test_sideways_portrait_is_drafted_and_turned_upright(self):
+        # A phone portrait: stored landscape, shown rotated by 90 degrees
+        exif = PilImage.Exif()
+        exif[0x0112] = 6
+        output = BytesIO()
+        PilImage.new("RGB", (4000, 2000), "red").save(output, "JPEG", exif=exif)
+        data = output.getvalue()
+
+        # The box bounds both stored sides, so libjpeg still decodes at 1/2
+        self.assertEqual(self.drafts(data, widths=(1000, 500)), [(2000, 1000)])
+        for fast in (True, False):
+            self.assertEqual(
+                self.sizes(data, widths=(1000, 500), fast=fast),
+                [(1000, 2000), (500, 1000)],
+            )
+
+
+class StaleCacheTests(SimpleTestCase):
+    key = "tests:stats"
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(stale_cache.threading, "Thread")
+        self.thread = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def store(self, value, age):
+        cache.set(self.key, {"value": value, "refreshed_at": time.time() - age})
+
+    def run_refresh(self):
+        """Run the background refresh the last get_or_refresh() started."""
+        target = self.thread.call_args.kwargs["target"]
+        with mock.patch.object(stale_cache, "connection") as connection:
+            target()
+        connection.close.assert_called_once_with()
+
+    def test_fresh_hit(self):
+        self.store("cached", age=10)
+        compute = mock.Mock()
+        value = stale_cache.get_or_refresh(self.key, compute, ttl=60)
+        self.assertEqual(value, "cached")
+        compute.assert_not_called()
+        self.thread.assert_not_called()
+
+    def test_stale_hit_refreshes_once_in_the_background(self):
+        self.store("old", age=120)
+        compute = mock.Mock(return_value="new")
+
+        self.assertEqual(stale_cache.get_or_refresh(self.key, compute, ttl=60), "old")
+        # The lock is held until the refresh finishes: no second thread
+        self.assertEqual(stale_cache.get_or_refresh(self.key, compute, ttl=60), "old")
+        self.assertEqual(self.thread.call_count, 1)
+        compute.assert_not_called()
+
+        self.run_refresh()
+        compute.assert_called_once_with()
+        self.assertIsNone(cache.get(stale_cache._lock_key(self.key)))
+        self.assertEqual(stale_cache.get_or_refresh(self.key, compute, ttl=60), "new")
+
+    def test_cold_miss_computes_inline(self):
+        compute = mock.Mock(return_value="computed")
+        value = stale_cache.get_or_refresh(self.key, compute, ttl=60)
+        self.assertEqual(value, "computed")
+        self.thread.assert_not_called()
+        self.assertEqual(cache.get(self.key)["value"], "computed")
+        self.assertIsNone(cache.get(stale_cache._lock_key(self.key)))
+
+    def test_failed_refresh_keeps_the_stale_value(self):
+        self.store("old", age=120)
+        compute = mock.Mock(side_effect=RuntimeError("database down"))
+        stale_cache.get_or_refresh(self.key, compute, ttl=60)
+
+        with self.assertLogs("shared.cache", "ERROR"):
+            self.run_refresh()
+        self.assertEqual(cache.get(self.key)["value"], "old")
+        self.assertIsNone(cache.get(stale_cache._lock_key(self.key)))
+        # The next request retries the refresh
+        stale_cache.get_or_refresh(self.key, compute, ttl=60)
+        self.assertEqual(self.thread.call_count, 2)
+
+
+@override_settings(PUBLIC_SHORT_API="key", SHORT_IO_TIMEOUT=3)
+class ShortIOTests(SimpleTestCase):
+    def service(self, responses):
+        """A service whose session answers each link id from ``responses``."""
+
+        def get(url, **kwargs):
+            answer = responses[url.rsplit("/", 1)[-1]]
+            if isinstance(answer, Exception):
+                raise answer
+            response = mock.Mock()
+            response.json.return_value = answer
+            return response
+
+        session = mock.Mock()
+        session.get.side_effect = get
+        with mock.patch.object(short_io, "get_session", return_value=session):
+            return short_io.ShortIOService()
+
+    @override_settings(SHORT_IO_MAX_CONCURRENCY=5)
+    def test_session_is_pooled_and_retries_gets(self):
+        with mock.patch.object(short_io, "_session", None):
+            session = short_io.get_session()
+            self.assertIs(short_io.get_session(), session)
+
+        adapter = session.get_adapter("https://statistics.short.io/statistics")
+        self.assertIs(adapter, session.get_adapter("https://api.short.io/links"))
+        self.assertEqual(adapter._pool_maxsize, 5)
+        retry = adapter.max_retries
+        self.assertEqual(retry.total, 3)
+        self.assertEqual(set(retry.status_forcelist), {429, 500, 502, 503, 504})
+        self.assertEqual(retry.allowed_methods, {"GET"})
+        self.assertTrue(retry.respect_retry_after_header)
+
+    def test_requests_use_the_configured_timeout(self):
+        service = self.service({"a": {"humanClicks": 1}})
+        self.assertEqual(service.get_link_statistics("a"), {"humanClicks": 1})
+        self.assertEqual(service.session.get.call_args.kwargs["timeout"], 3)
+
+    def test_aggregate_skips_links_that_failed(self):
+        error = requests.HTTPError("503 Service Unavailable")
+        error.response = None
+        service = self.service(
+            {
+                "a": {
+                    "totalClicks": 5,
+                    "humanClicks": 4,
+                    "clickStatistics": {
+                        "timeline": [{"moment": "2026-10-01", "clicks": 4}]
+                    },
+                },
+                "b": requests.ConnectionError("reset by peer"),
+                "c": error,
+                "d": {
+                    "totalClicks": 2,
+                    "humanClicks": 1,
+                    "clickStatistics": {
+                        "datasets": [{"data": [{"x": "2026-10-01", "y": "1"}]}]
+                    },
+                },
+            }
+        )
+
+        with self.assertLogs("shared.short_io", "ERROR") as logs:
+            stats = service.get_aggregated_link_statistics(["a", "b", "c", "d", "a"])
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(stats["totalClicks"], 7)
+        self.assertEqual(stats["humanClicks"], 5)
+        self.assertEqual(
+            stats["clickStatistics"]["timeline"],
+            [{"moment": "2026-10-01", "clicks": 5}],
+        )
+        # Each link is fetched once
+        self.assertEqual(service.session.get.call_count, 4)
+
+
+class MediaTestCase(TestCase):
+    """Runs with a throwaway MEDIA_ROOT."""
+
+    processing_mode = "sync"
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(
+            MEDIA_ROOT=media_root.name,
+            IMAGE_PROCESSING_MODE=self.processing_mode,
+            IMAGE_VARIANT_FORMATS=["webp"],
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+        self.location = Location.objects.create(
+            name="Ribat", latitude=Decimal("35.8"), longitude=Decimal("10.6"), story=""
+        )
+
+    def upload(self, data, name="photo.jpg"):
+        return SimpleUploadedFile(name, data, content_type="image/jpeg")
+
+
+class ImageBlobTests(MediaTestCase):
+    def create(self, data):
+        return ImageLocation.objects.create(
+            location=self.location, image=self.upload(data)
+        )
+
+    def assertFilesExist(self, blob, exist=True):
+        for name in blob.names():
+            self.assertEqual(default_storage.exists(name), exist, name)
+
+    def test_identical_uploads_share_one_blob(self):
+        data = jpeg("red")
+        first, second = self.create(data), self.create(data)
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(ImageBlob.objects.count(), 1)
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(second.image.name, blob.image)
+        self.assertEqual(set(blob.variants["image"]), {"webp"})
+        self.assertFilesExist(blob)
+
+    def test_files_go_with_the_last_reference(self):
+        data = jpeg("red")
+        first, second = self.create(data), self.create(data)
+        blob = ImageBlob.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        self.assertFilesExist(blob)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFilesExist(blob, exist=False)
+
+    def test_reupload_releases_the_old_blob(self):
+        row = self.create(jpeg("red"))
+        kept = self.create(jpeg("green"))
+        old = row.blob
+
+        with self.captureOnCommitCallbacks(execute=True):
+            row.image = self.upload(jpeg("blue"))
+            row.save()
+        self.assertFalse(ImageBlob.objects.filter(pk=old.pk).exists())
+        self.assertFilesExist(old, exist=False)
+        self.assertNotEqual(row.blob_id, old.pk)
+        self.assertEqual(row.blob.refcount, 1)
+
+        # Switching to content another row uses takes a shared reference
+        new = row.blob
+        with self.captureOnCommitCallbacks(execute=True):
+            row.image = self.upload(jpeg("green"))
+            row.save()
+        self.assertEqual(row.blob_id, kept.blob_id)
+        self.assertEqual(ImageBlob.objects.get(pk=kept.blob_id).refcount, 2)
+        self.assertFalse(ImageBlob.objects.filter(pk=new.pk).exists())
+
+
+class SyncExecutor:
+    """Runs jobs in the calling thread, in place of the process pool."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ImageWorkerTests(MediaTestCase):
+    processing_mode = "async"
+    State = OptimizedImageModel.ProcessingState
+
+    def pending(self, data):
+        return ImageLocation.objects.create(
+            location=self.location, image=self.upload(data)
+        )
+
+    def test_pending_upload_is_processed(self):
+        row = self.pending(jpeg("red"))
+        original = row.image.name
+        self.assertEqual(row.processing_state, self.State.PENDING)
+        self.assertIsNone(row.blob)
+        self.assertTrue(default_storage.exists(original))
+
+        self.assertEqual(images.process(SyncExecutor()), 1)
+        row.refresh_from_db()
+        self.assertEqual(row.processing_state, self.State.READY)
+        self.assertEqual(row.image.name, row.blob.image)
+        self.assertFalse(default_storage.exists(original))
+        self.assertEqual(images.process(SyncExecutor()), 0)
+
+    def test_processing_invalidates_cached_responses(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        shared_cache = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": cache_dir.name,
+                }
+            },
+            GRAPHQL_RESPONSE_CACHE_TIMEOUT=60 * 15,
+        )
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+
+        row = self.pending(jpeg("red"))
+        query = {"query": "{ locations { images { image { url } } } }"}
+        before = self.client.post("/graphql", query, content_type="application/json")
+        self.assertEqual(before["X-Cache"], "MISS")
+        self.assertIn(row.image.name.encode(), before.content)
+
+        with mock.patch(
+            "guard.management.commands.process_images.ProcessPoolExecutor",
+            SyncExecutor,
+        ):
+            call_command("process_images", "--once", stdout=StringIO())
+        row.refresh_from_db()
+
+        # The original is gone; the cached response pointing at it must be too
+        after = self.client.post("/graphql", query, content_type="application/json")
+        self.assertEqual(after["X-Cache"], "MISS")
+        self.assertIn(row.blob.image.encode(), after.content)
+
+    def test_stale_processing_rows_are_claimed_again(self):
+        row = self.pending(jpeg("red"))
+        self.assertEqual(images.claim(ImageLocation, 10), [row])
+        # Still held by a live worker
+        self.assertEqual(images.claim(ImageLocation, 10), [])
+
+        claimed_at = timezone.now() - images.STALE_AFTER - timedelta(minutes=1)
+        ImageLocation.objects.filter(pk=row.pk).update(
+            processing_claimed_at=claimed_at
+        )
+        self.assertEqual(images.claim(ImageLocation, 10), [row])
+
+    def test_link_releases_the_blob_of_a_replaced_upload(self):
+        data = jpeg("red")
+        self.pending(data)
+        (row,) = images.claim(ImageLocation, 10)
+        # A new upload lands while the worker encodes the old one
+        ImageLocation.objects.filter(pk=row.pk).update(image="images/replaced.jpg")
+        blob = ImageBlob.store(ImageBlob.digest_of(data), *build_derivatives(data))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            images.link(row, blob)
+        self.assertFalse(ImageBlob.objects.filter(pk=blob.pk).exists())
+        for name in blob.names():
+            self.assertFalse(default_storage.exists(name))
+        row.refresh_from_db()
+        self.assertIsNone(row.blob)
+        self.assertEqual(row.image.name, "images/replaced.jpg")
+
+
+def completion(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+
+
+def shout(text):
+    """Upper-case the text of an HTML fragment, leaving its tags alone."""
+    parts = TAG_RE.split(text)
+    return "".join(part if i % 2 else part.upper() for i, part in enumerate(parts))
+
+
+def shouting_llm(messages, **kwargs):
+    """Fake Groq completion translating by upper-casing the text."""
+    text = messages[-1]["content"]
+    if kwargs.get("response_format"):
+        segments = json.loads(text)["segments"]
+        return completion(json.dumps({"translations": [shout(s) for s in segments]}))
+    return completion(shout(text))
+
+
+class TranslationServiceTests(TestCase):
+    def setUp(self):
+        memory = mock.patch("shared.translator._memory", LRUCache(100))
+        memory.start()
+        self.addCleanup(memory.stop)
+        self.service = TranslationService()
+        self.service.client = mock.Mock()
+        self.create = self.service.client.chat.completions.create
+        self.create.side_effect = shouting_llm
+
+    def test_memory_hit_skips_the_llm(self):
+        self.assertEqual(self.service.translate("hello", "en", "fr"), "HELLO")
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(TranslationMemory.objects.count(), 1)
+
+        self.assertEqual(self.service.translate("hello", "en", "fr"), "HELLO")
+        # Also from the table, once the in-process cache is gone
+        with mock.patch("shared.translator._memory", LRUCache(100)):
+            self.assertEqual(self.service.translate("hello", "en", "fr"), "HELLO")
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_translate_html_keeps_markup(self):
+        markup = (
+            '<p class="lead">Hello <a href="/medina">old town</a>!</p>\n'
+            "<script>var x = 'not text';</script><p>Hello</p>"
+        )
+        translated = self.service.translate(markup, "en", "fr", preserve_html=True)
+        self.assertEqual(
+            translated,
+            '<p class="lead">HELLO <a href="/medina">OLD TOWN</a>!</p>\n'
+            "<script>var x = 'not text';</script><p>HELLO</p>",
+        )
+        # "Hello" is translated once; the segments go out in one batch
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_splits_only_at_block_level_tags(self):
+        parts, text_indexes = split_html(
+            "<h2>The <em>old</em> town</h2><ul><li>A <span>fort</span></li></ul>"
+            "<p>Fish &amp; chips<br>at <b>the port</b></p>"
+        )
+        self.assertEqual(
+            [parts[index] for index in text_indexes],
+            [
+                "The <em>old</em> town",
+                "A <span>fort</span>",
+                "Fish &amp; chips<br>at <b>the port</b>",
+            ],
+        )
+
+    def test_inline_markup_is_translated_with_its_sentence(self):
+        markup = '<div><p>Visit <a href="/ribat">the <b>Ribat</b></a> today</p></div>'
+        translated = self.service.translate(markup, "en", "fr", preserve_html=True)
+        self.assertEqual(
+            translated,
+            '<div><p>VISIT <a href="/ribat">THE <b>RIBAT</b></a> TODAY</p></div>',
+        )
+        (call,) = self.create.call_args_list
+        self.assertEqual(
+            call.kwargs["messages"][-1]["content"],
+            'Visit <a href="/ribat">the <b>Ribat</b></a> today',
+        )
+        segment = TranslationMemory.objects.get(
+            source_text=call.kwargs["messages"][-1]["content"]
+        )
+        self.assertTrue(segment.preserve_html)
+
+    def test_translation_dropping_inline_tags_fails_the_document(self):
+        self.create.side_effect = lambda messages, **kwargs: completion(
+            "VISIT THE RIBAT"
+        )
+        with self.assertLogs("shared.translator", "WARNING"):
+            translated = self.service.translate(
+                "<p>Visit <b>the Ribat</b></p>", "en", "fr", preserve_html=True
+            )
+        self.assertEqual(translated, "")
+        self.assertFalse(TranslationMemory.objects.exists())
+
+    def test_failed_segment_fails_the_document(self):
+        self.create.side_effect = RuntimeError("Groq unavailable")
+        with self.assertLogs("shared.translator", "ERROR"):
+            self.assertEqual(
+                self.service.translate("<p>Hello</p>", "en", "fr", preserve_html=True),
+                "",
+            )
+        self.assertFalse(TranslationMemory.objects.exists())
+
+
+class ResizeImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        directories = override_settings(
+            MEDIA_ROOT=media_root.name,
+            IMAGE_RESIZE_CACHE_DIR=os.path.join(media_root.name, "image_cache"),
+            IMAGE_RESIZE_WIDTHS=[320, 640],
+            IMAGE_RESIZE_QUALITIES=[80],
+            IMAGE_VARIANT_FORMATS=["webp"],
+        )
+        directories.enable()
+        self.addCleanup(directories.disable)
+
+    def save(self, name, img, **options):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        img.save(path, **options)
+        return name
+
+    def get(self, name, accept="", **params):
+        return self.client.get(
+            reverse("shared:resize_image", args=[name]), params, HTTP_ACCEPT=accept
+        )
+
+    def decode(self, response):
+        return PilImage.open(BytesIO(b"".join(response.streaming_content)))
+
+    def test_resizes_and_keeps_aspect_ratio(self):
+        name = self.save("images/wide.jpg", PilImage.new("RGB", (1000, 500)))
+        response = self.get(name, w=320)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(self.decode(response).size, (320, 160))
+
+    def test_refuses_paths_outside_media_root(self):
+        secret = os.path.join(os.path.dirname(self.media_root), "secret.jpg")
+        for name in ("../secret.jpg", "images/../../secret.jpg", secret):
+            with self.assertRaises(resizer.ImageNotFound):
+                resizer.source_path(name)
+        self.assertEqual(self.get("images/../../secret.jpg", w=320).status_code, 404)
+        # Derivatives and non-image files are not sources either
+        self.save("notes.txt.jpg", PilImage.new("RGB", (10, 10)))
+        os.rename(
+            os.path.join(self.media_root, "notes.txt.jpg"),
+            os.path.join(self.media_root, "notes.txt"),
+        )
+        self.assertEqual(self.get("notes.txt", w=320).status_code, 404)
+
+    def test_parameters_outside_the_allow_lists(self):
+        name = self.save("images/photo.jpg", PilImage.new("RGB", (1000, 500)))
+        for params in (
+            {"w": 321},
+            {"w": 320, "q": 95},
+            {"w": 320, "fmt": "png"},
+            {"w": "wide"},
+            {},
+        ):
+            self.assertEqual(self.get(name, **params).status_code, 400, params)
+
+    def test_accept_negotiation(self):
+        name = self.save("images/photo.jpg", PilImage.new("RGB", (1000, 500)))
+        response = self.get(name, accept="image/avif,image/webp,*/*", w=320)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("Accept", response["Vary"].split(", "))
+        self.assertEqual(self.decode(response).format, "WEBP")
+
+        response = self.get(name, accept="image/webp", w=320, fmt="jpeg")
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertNotIn("Accept", response["Vary"].split(", "))
+
+    def test_cache_hit_skips_rendering(self):
+        name = self.save("images/photo.jpg", PilImage.new("RGB", (1000, 500)))
+        with mock.patch.object(resizer, "_render", wraps=resizer._render) as render:
+            first = resizer.get_derivative(name, 320).read()
+            second = resizer.get_derivative(name, 320)
+            # An eviction after the lookup does not break the response
+            os.remove(second.name)
+            self.assertEqual(second.read(), first)
+            second.close()
+        self.assertEqual(render.call_count, 1)
+
+    def test_evicts_least_recently_used(self):
+        name = self.save("images/photo.jpg", PilImage.new("RGB", (1000, 500)))
+        old = resizer.get_derivative(name, 640)
+        new = resizer.get_derivative(name, 320, fmt="webp")
+        old_path = resizer._cache_path(resizer.source_path(name), 640, 80, "jpeg")
+        new_path = resizer._cache_path(resizer.source_path(name), 320, 80, "webp")
+        os.utime(old_path, (1, 1))
+        old.close()
+        new.close()
+
+        # Eviction trims to 90% of the budget; leave room for the newer file
+        budget = math.ceil(new_path.stat().st_size / 0.9)
+        self.assertEqual(resizer.evict(max_bytes=budget), 1)
+        self.assertFalse(old_path.exists())
+        self.assertTrue(new_path.exists())
+        self.assertEqual(resizer.evict(max_bytes=10**9), 0)
+
+    def test_applies_exif_orientation(self):
+        exif = PilImage.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees: stored sideways
+        name = self.save(
+            "images/phone.jpg", PilImage.new("RGB", (1000, 500)), exif=exif
+        )
+        self.assertEqual(self.decode(self.get(name, w=320)).size, (320, 640))
+
+    def test_keeps_transparency_when_the_format_can(self):
+        img = PilImage.new("RGBA", (1000, 500), (255, 0, 0, 0))
+        name = self.save("images/logo.png", img)
+
+        webp = self.decode(self.get(name, w=320, fmt="webp"))
+        self.assertEqual(webp.mode, "RGBA")
+        self.assertEqual(webp.getpixel((10, 10))[3], 0)
+
+        jpeg = self.decode(self.get(name, w=320, fmt="jpeg"))
+        self.assertEqual(jpeg.mode, "RGB")
+        self.assertTrue(all(value > 240 for value in jpeg.getpixel((10, 10))))
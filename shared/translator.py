@@ -1,7 +1,142 @@
+import hashlib
+import html
+import json
+import logging
 import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from groq import Groq
 from django.conf import settings
 
+from .models import TranslationMemory
+
+logger = logging.getLogger(__name__)
+
+
+def memory_key(
+    text: str, source_lang: str, target_lang: str, preserve_html: bool, model: str
+) -> str:
+    """Hash identifying a translation request in the translation memory."""
+    raw = "\x00".join(
+        [source_lang, target_lang, "html" if preserve_html else "text", model, text]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Small thread-safe least-recently-used mapping."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# In-process front of the TranslationMemory table
+_memory = LRUCache(getattr(settings, "TRANSLATION_MEMORY_SIZE", 2048))
+
+# Limits of one batched segment request; the answer must fit in max_tokens
+BATCH_MAX_CHARS = 2500
+BATCH_MAX_SEGMENTS = 40
+
+TAG_RE = re.compile(r"(<!--.*?-->|<[^>]*>)", re.DOTALL)
+TAG_NAME_RE = re.compile(r"<\s*/?\s*([a-zA-Z][a-zA-Z0-9]*)")
+RAW_TEXT_TAG_RE = re.compile(r"<\s*(/?)\s*(script|style)\b", re.IGNORECASE)
+LETTER_RE = re.compile(r"[^\W\d_]")
+
+# Tags that end a sentence; every other tag (<b>, <a>, <em>, <span>...)
+# stays inside the text segment around it
+BLOCK_TAGS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "body", "caption",
+        "dd", "details", "div", "dl", "dt", "fieldset", "figcaption",
+        "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+        "head", "header", "hr", "html", "li", "main", "nav", "ol", "p",
+        "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th",
+        "thead", "title", "tr", "ul",
+    }
+)
+
+
+def is_inline_tag(tag: str) -> bool:
+    match = TAG_NAME_RE.match(tag)
+    return (
+        match is not None
+        and match.group(1).lower() not in BLOCK_TAGS
+        and not RAW_TEXT_TAG_RE.match(tag)
+    )
+
+
+def split_html(markup: str):
+    """
+    Split HTML into block-level tags and the runs of text between them.
+
+    Inline tags stay in their run, so a sentence is translated whole with
+    its formatting. Returns the list of parts and the indexes of the runs
+    holding translatable text (outside <script>/<style>, with a letter).
+    """
+    parts, text_indexes, run = [], [], []
+    raw_text = False
+
+    def end_run():
+        text = "".join(run)
+        run.clear()
+        if not raw_text and LETTER_RE.search(html.unescape(TAG_RE.sub("", text))):
+            text_indexes.append(len(parts))
+        parts.append(text)
+
+    for index, token in enumerate(TAG_RE.split(markup)):
+        if index % 2 == 0 or (not raw_text and is_inline_tag(token)):
+            run.append(token)
+            continue
+        end_run()
+        parts.append(token)
+        match = RAW_TEXT_TAG_RE.match(token)
+        if match:
+            raw_text = not match.group(1)
+    end_run()
+    return parts, text_indexes
+
+
+def same_tags(source: str, translated: str) -> bool:
+    """Whether a translated HTML segment kept every tag of its source."""
+    return sorted(TAG_RE.findall(source)) == sorted(TAG_RE.findall(translated))
+
+
+def batch_segments(segments, length=len):
+    """Group segments into requests bounded by size and count."""
+    batch, size = [], 0
+    for segment in segments:
+        if batch and (
+            size + length(segment) > BATCH_MAX_CHARS
+            or len(batch) >= BATCH_MAX_SEGMENTS
+        ):
+            yield batch
+            batch, size = [], 0
+        batch.append(segment)
+        size += length(segment)
+    if batch:
+        yield batch
+
 
 class TranslationService:
     def __init__(self):
@@ -21,6 +156,219 @@ class TranslationService:
         if not text or not text.strip():
             return ""
 
+        key = memory_key(text, source_lang, target_lang, preserve_html, self.model)
+        cached = self.recall(key)
+        if cached is not None:
+            return cached
+
+        if preserve_html:
+            translated_text = self.translate_html(text, source_lang, target_lang)
+        else:
+            translated_text = self.complete(text, source_lang, target_lang, False)
+        if translated_text:
+            self.remember(
+                key, text, translated_text, source_lang, target_lang, preserve_html
+            )
+        return translated_text
+
+    def recall(self, key: str):
+        """Look up a translation in the in-process cache, then in the database."""
+        cached = _memory.get(key)
+        if cached is not None:
+            return cached
+
+        cached = (
+            TranslationMemory.objects.filter(key=key)
+            .values_list("translated_text", flat=True)
+            .first()
+        )
+        if cached is not None:
+            _memory.set(key, cached)
+        return cached
+
+    def recall_many(self, keys):
+        """Like ``recall`` for many keys, with a single database query."""
+        found = {}
+        for key in keys:
+            cached = _memory.get(key)
+            if cached is not None:
+                found[key] = cached
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            rows = TranslationMemory.objects.filter(key__in=missing).values_list(
+                "key", "translated_text"
+            )
+            for key, translated_text in rows:
+                _memory.set(key, translated_text)
+                found[key] = translated_text
+        return found
+
+    def remember(
+        self,
+        key: str,
+        text: str,
+        translated_text: str,
+        source_lang: str,
+        target_lang: str,
+        preserve_html: bool,
+    ) -> None:
+        TranslationMemory.objects.update_or_create(
+            key=key,
+            defaults={
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "preserve_html": preserve_html,
+                "model": self.model,
+                "source_text": text,
+                "translated_text": translated_text,
+            },
+        )
+        _memory.set(key, translated_text)
+
+    def translate_html(self, markup: str, source_lang: str, target_lang: str) -> str:
+        """
+        Translate the text of an HTML document segment by segment.
+
+        The document is cut at block-level tags; a segment keeps its inline
+        tags and is rejected if the translation loses any of them. Block
+        markup never goes through the LLM and long documents are not cut at
+        the completion token limit. Repeated segments are translated once,
+        known ones come from the translation memory and the rest are sent
+        in concurrent batches. Returns "" if any segment fails.
+        """
+        parts, text_indexes = split_html(markup)
+        keys, segments, with_markup = {}, {}, set()
+        for index in text_indexes:
+            # Runs with inline tags are translated as HTML, others as text
+            has_tags = TAG_RE.search(parts[index]) is not None
+            if has_tags:
+                source = parts[index].strip()
+            else:
+                source = html.unescape(parts[index]).strip()
+            key = memory_key(source, source_lang, target_lang, has_tags, self.model)
+            keys[index] = key
+            segments[key] = source
+            if has_tags:
+                with_markup.add(key)
+
+        translations = self.recall_many(list(segments))
+        pending = [key for key in segments if key not in translations]
+        if pending:
+            batches = list(
+                batch_segments(pending, length=lambda key: len(segments[key]))
+            )
+            workers = min(
+                len(batches), getattr(settings, "TRANSLATION_MAX_CONCURRENCY", 4)
+            )
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(
+                    lambda batch: self.complete_batch(
+                        [segments[key] for key in batch],
+                        source_lang,
+                        target_lang,
+                        [key in with_markup for key in batch],
+                    ),
+                    batches,
+                )
+                translated = [text for result in results for text in result]
+
+            entries = []
+            for key, text in zip(pending, translated):
+                if not text:
+                    continue
+                if key in with_markup and not same_tags(segments[key], text):
+                    logger.warning(f"Translation dropped markup of {segments[key]!r}")
+                    continue
+                translations[key] = text
+                _memory.set(key, text)
+                entries.append(
+                    TranslationMemory(
+                        key=key,
+                        source_lang=source_lang,
+                        target_lang=target_lang,
+                        preserve_html=key in with_markup,
+                        model=self.model,
+                        source_text=segments[key],
+                        translated_text=text,
+                    )
+                )
+            TranslationMemory.objects.bulk_create(entries, ignore_conflicts=True)
+
+        if len(translations) < len(segments):
+            return ""
+
+        for index, key in keys.items():
+            part = parts[index]
+            leading = part[: len(part) - len(part.lstrip())]
+            trailing = part[len(part.rstrip()) :]
+            text = translations[key]
+            if key not in with_markup:
+                text = html.escape(text, quote=False)
+            parts[index] = leading + text + trailing
+        return "".join(parts)
+
+    def complete_batch(
+        self, texts, source_lang: str, target_lang: str, preserve_html=None
+    ):
+        """
+        Translate a list of text segments in one request.
+
+        ``preserve_html`` flags the segments holding inline HTML. Falls back
+        to one request per segment when the answer is not a list of the
+        same length. Failed segments are returned as "".
+        """
+        preserve_html = preserve_html or [False] * len(texts)
+        if len(texts) == 1:
+            return [self.complete(texts[0], source_lang, target_lang, preserve_html[0])]
+
+        source_name = dict(settings.LANGUAGES).get(source_lang, source_lang)
+        target_name = dict(settings.LANGUAGES).get(target_lang, target_lang)
+        system_prompt = (
+            f"You are a highly efficient, expert professional translator. You receive a JSON object whose \"segments\" list holds text fragments of one document, in order. Translate each fragment from {source_name} to {target_name}. "
+            f"Some fragments contain inline HTML tags such as <b> or <a href=\"...\">: keep every tag and attribute EXACTLY as it is and only translate the text around and inside them. "
+            f"Your translation MUST be natural, idiomatic, and culturally appropriate, reflecting how a native speaker would say it. "
+            f"Do NOT add any trailing punctuation (like a period or comma) unless it was explicitly present in the source fragment. "
+            f"Reply ONLY with a JSON object {{\"translations\": [...]}} holding exactly one translated string per fragment, in the same order."
+        )
+
+        try:
+            chat_completion = self.client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {
+                        "role": "user",
+                        "content": json.dumps({"segments": texts}, ensure_ascii=False),
+                    },
+                ],
+                model=self.model,
+                temperature=0.0,
+                max_tokens=2048,
+                response_format={"type": "json_object"},
+            )
+            translations = json.loads(chat_completion.choices[0].message.content)[
+                "translations"
+            ]
+            if len(translations) == len(texts) and all(
+                isinstance(text, str) for text in translations
+            ):
+                return [text.strip() for text in translations]
+            logger.warning(
+                "Batch translation returned a mismatched list, retrying one by one"
+            )
+
+        except Exception as e:
+            logger.error(f"Batch translation failed: {e}", exc_info=True)
+
+        return [
+            self.complete(text, source_lang, target_lang, markup)
+            for text, markup in zip(texts, preserve_html)
+        ]
+
+    def complete(
+        self, text: str, source_lang: str, target_lang: str, preserve_html: bool
+    ) -> str:
+        """Ask the LLM for a translation, bypassing the translation memory."""
         source_name = dict(settings.LANGUAGES).get(source_lang, source_lang)
         target_name = dict(settings.LANGUAGES).get(target_lang, target_lang)
 
@@ -55,8 +403,8 @@ class TranslationService:
             translated_text = chat_completion.choices[0].message.content.strip()
             return translated_text
 
-        except Exception as e:
-            print(f"Translation failed: {str(e)}")
+        except Exception:
+            logger.exception("Translation failed")
             return ""
 
     def translate_en_to_fr(self, text: str, preserve_html: bool = False) -> str:
@@ -15,6 +15,7 @@ from .views import (
     PageUpdateView,
     PageDeleteView,
     translate_text,
+    resize_image,
 )
 
 app_name = "shared"
@@ -24,6 +25,7 @@ urlpatterns = [
     path("pages/<int:pk>/update/", PageUpdateView.as_view(), name="page_update"),
     path("pages/<int:pk>/delete/", PageDeleteView.as_view(), name="page_delete"),
     path("api/translate/", translate_text, name="translate_text"),
+    path("img/<path:path>", resize_image, name="resize_image"),
     path("auth/login/", CustomLoginView.as_view(), name="login"),
     path("auth/logout/", CustomLogoutView.as_view(), name="logout"),
     path("auth/register/", RegisterView.as_view(), name="register"),
@@ -1,6 +1,9 @@
+import base64
 import os
 from io import BytesIO
+from PIL import ExifTags, ImageOps
 from PIL import Image as PilImage
+from django.conf import settings
 from django.core.files.base import ContentFile
 
 
@@ -57,3 +60,161 @@ def optimize_image(image_field, resize_width=None):
         # In case of error (e.g. invalid image file), return None
         print(f"Error optimizing image: {e}")
         return None
+
+
+# Pillow save options per derivative format; "quality" defaults to the
+# ``quality`` argument of ``build_derivatives``
+FORMAT_OPTIONS = {
+    "jpeg": {"format": "JPEG"},
+    "webp": {"format": "WEBP", "method": 4},
+    # AVIF reaches JPEG-like quality at a lower setting
+    "avif": {"format": "AVIF", "quality": 60},
+}
+
+
+def variant_formats():
+    """Formats of IMAGE_VARIANT_FORMATS this Pillow build can encode."""
+    PilImage.init()
+    return [
+        fmt
+        for fmt in getattr(settings, "IMAGE_VARIANT_FORMATS", ["webp"])
+        if fmt in FORMAT_OPTIONS and FORMAT_OPTIONS[fmt]["format"] in PilImage.SAVE
+    ]
+
+
+# EXIF orientations of images stored rotated by 90 degrees
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _is_transposed(img):
+    return img.getexif().get(ExifTags.Base.Orientation, 1) in TRANSPOSED_ORIENTATIONS
+
+
+def displayed_size(img):
+    """Width and height of ``img`` once its EXIF orientation is applied."""
+    return (img.height, img.width) if _is_transposed(img) else img.size
+
+
+def upright(img, size=None):
+    """
+    ``img`` with its EXIF orientation applied.
+
+    For a JPEG, ``size`` (displayed width and height) lets libjpeg decode
+    at the smallest scale still at least that large on both sides. Phone
+    photos are often stored sideways, so the box is turned to the stored
+    orientation first.
+    """
+    if size and img.format == "JPEG":
+        width, height = size
+        img.draft("RGB", (height, width) if _is_transposed(img) else (width, height))
+    return ImageOps.exif_transpose(img)
+
+
+def _encode(img, fmt, quality):
+    output = BytesIO()
+    img.save(output, **{"quality": quality, **FORMAT_OPTIONS[fmt]})
+    return output.getvalue()
+
+
+def build_derivatives(data, widths=(1920, 500), quality=80, fast=True, formats=()):
+    """
+    Decode an image and encode one derivative per target width.
+
+    The EXIF orientation is applied and widths are those of the upright
+    image. Images narrower than a width are only re-encoded. Works on raw
+    bytes so it can run in a worker process.
+
+    The fast path lets libjpeg decode JPEGs at the smallest power-of-two
+    scale still wider than the largest target (``draft``), resizes with a
+    ``reduce`` step first, and derives each smaller width from the previous
+    result instead of the original. ``fast=False`` keeps the full decode
+    and full-resolution resizes, for comparison (see ``benchmark_images``).
+
+    Args:
+        data: Bytes of the original image
+        widths: Maximum width of each derivative
+        fast: Use the draft/reduce fast path
+        formats: Formats encoded besides JPEG, e.g. ("webp", "avif")
+
+    Returns:
+        list of {format: bytes} dicts, in the order of ``widths``, each
+        holding "jpeg" and every requested format
+    """
+    formats = ["jpeg", *(fmt for fmt in formats if fmt != "jpeg")]
+    img = PilImage.open(BytesIO(data))
+    if not fast:
+        return _build_derivatives_full(img, widths, quality, formats)
+
+    original_width, original_height = displayed_size(img)
+    largest = max(widths)
+    if original_width > largest:
+        img = upright(
+            img, (largest, max(1, original_height * largest // original_width))
+        )
+    else:
+        img = upright(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    derivatives = {}
+    current = img
+    for width in sorted(set(widths), reverse=True):
+        if original_width > width:
+            height = int((float(original_height) * float(width / original_width)))
+            current = current.resize(
+                (width, height), PilImage.Resampling.LANCZOS, reducing_gap=3.0
+            )
+        derivatives[width] = {fmt: _encode(current, fmt, quality) for fmt in formats}
+    return [derivatives[width] for width in widths]
+
+
+def _build_derivatives_full(img, widths, quality, formats):
+    img = upright(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    derivatives = []
+    for width in widths:
+        resized = img.copy()
+        if resized.width > width:
+            ratio = width / float(resized.width)
+            height = int((float(resized.height) * float(ratio)))
+            resized = resized.resize((width, height), PilImage.Resampling.LANCZOS)
+
+        derivatives.append({fmt: _encode(resized, fmt, quality) for fmt in formats})
+    return derivatives
+
+
+# Longest side of the inline placeholder thumbnail
+PLACEHOLDER_SIZE = 16
+
+
+def image_metadata(file):
+    """
+    Width, height, byte size, MIME type and placeholder of an image file,
+    as displayed once its EXIF orientation is applied.
+
+    The placeholder is a tiny blurred-looking JPEG as a ``data:`` URI that
+    clients show while the real image downloads. JPEGs are decoded at 1/8
+    scale for it, so the full-size pixels are never decoded.
+    """
+    file.seek(0)
+    with PilImage.open(file) as img:
+        width, height = displayed_size(img)
+        mime = PilImage.MIME.get(img.format, "")
+        thumbnail = upright(img, (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE)).convert("RGB")
+        thumbnail.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    file.seek(0)
+
+    output = BytesIO()
+    thumbnail.save(output, format="JPEG", quality=40, optimize=True)
+    placeholder = "data:image/jpeg;base64," + base64.b64encode(
+        output.getvalue()
+    ).decode("ascii")
+    return {
+        "width": width,
+        "height": height,
+        "size": file.size,
+        "mime": mime,
+        "placeholder": placeholder,
+    }
@@ -10,9 +10,16 @@ from django.views.generic import (
     ListView,
     TemplateView,
 )
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.http import require_GET, require_POST
 import json
+from .resizer import (
+    DEFAULT_QUALITY,
+    ImageNotFound,
+    ResizeError,
+    get_derivative,
+    negotiate_format,
+)
 from .translator import get_translator
 from django.contrib.auth.views import (
     LoginView,
@@ -246,3 +253,36 @@ def translate_text(request):
 
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
+
+
+@require_GET
+def resize_image(request, path):
+    """
+    Serve an uploaded image resized to an allowed width.
+
+    ``w`` is required; ``q`` and ``fmt`` are optional. Without ``fmt`` the
+    best format announced in the Accept header is used.
+    """
+    try:
+        width = int(request.GET["w"])
+        quality = int(request.GET.get("q", DEFAULT_QUALITY))
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest("w and q must be integers")
+    fmt = request.GET.get("fmt")
+    negotiated = not fmt
+    if negotiated:
+        fmt = negotiate_format(request.headers.get("Accept", ""))
+
+    try:
+        derivative = get_derivative(path, width, quality, fmt)
+    except ImageNotFound as e:
+        raise Http404(str(e))
+    except ResizeError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = FileResponse(derivative, content_type=f"image/{fmt}")
+    # The path changes whenever an image is replaced
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    if negotiated:
+        response["Vary"] = "Accept"
+    return response